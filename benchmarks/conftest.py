@@ -0,0 +1,83 @@
+"""Shared fixtures for the pyargus benchmark suite.
+
+Run the benchmarks using `tox -e benchmark`, or `pytest benchmarks` in an
+environment that has the `benchmark` dependency group installed.
+"""
+
+import pytest
+from fake_server import FakeArgusServer
+
+
+def make_incident_records(count: int, sources: int = 5) -> list:
+    """Returns a list of `count` incident records shaped like the ones served by the
+    Argus incident listing endpoint, spread across `sources` source systems.
+    """
+    source_records = [
+        {
+            "pk": pk,
+            "name": f"source-{pk}",
+            "type": {"name": "nav"},
+            "user": pk + 100,
+            "base_url": f"https://source-{pk}.example.org/",
+        }
+        for pk in range(1, sources + 1)
+    ]
+    return [
+        {
+            "pk": pk,
+            "start_time": f"2024-03-{pk % 28 + 1:02d}T12:{pk % 60:02d}:07.123456+01:00",
+            "end_time": "infinity" if pk % 3 else "2024-04-01T08:00:00.654321+02:00",
+            "source": dict(source_records[pk % sources]),
+            "source_incident_id": str(pk * 7),
+            "details_url": f"https://nav.example.org/event/{pk * 7}",
+            "description": f"Link DOWN on Gi0/{pk % 48} at switch-{pk % 200}",
+            "level": pk % 5 + 1,
+            "ticket_url": "",
+            "tags": [
+                {"added_by": 3, "added_time": None, "tag": f"host=switch-{pk % 200}"},
+                {"added_by": 3, "added_time": None, "tag": f"interface=Gi0/{pk % 48}"},
+                {"added_by": 3, "added_time": None, "tag": "event_type=linkState"},
+                {"added_by": 3, "added_time": None, "tag": "location=Teknobyen"},
+            ],
+            "stateful": True,
+            "open": bool(pk % 3),
+            "acked": not pk % 4,
+            "metadata": {},
+            "search_text": "",
+        }
+        for pk in range(1, count + 1)
+    ]
+
+
+@pytest.fixture(scope="session")
+def incident_records():
+    """A page sized list of incident records"""
+    return make_incident_records(1000)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("argus", "fake Argus server")
+    group.addoption(
+        "--argus-latency",
+        type=float,
+        default=0.0,
+        help="Seconds the fake Argus server delays each response by (default: 0)",
+    )
+    group.addoption(
+        "--argus-incidents",
+        type=int,
+        default=1000,
+        help="Number of incidents served by the fake Argus server (default: 1000)",
+    )
+
+
+@pytest.fixture(scope="session")
+def argus_server(request):
+    """A local stand-in Argus server, configured by the --argus-latency and
+    --argus-incidents options.
+    """
+    incidents = make_incident_records(request.config.getoption("--argus-incidents"))
+    with FakeArgusServer(
+        incidents, latency=request.config.getoption("--argus-latency")
+    ) as server:
+        yield server
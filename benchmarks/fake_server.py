@@ -0,0 +1,167 @@
+"""A minimal, in-process stand-in for an Argus API server, for benchmarking clients.
+
+Only the endpoints exercised by the benchmarks are implemented, with just enough
+fidelity for the client to work: cursor paginated incident listings, posting
+incidents and events, and source system heartbeats. Every response can be delayed
+by a fixed latency to mimic a remote server.
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+API_PREFIX = "/api/v2/"
+DEFAULT_PAGE_SIZE = 100
+
+_EVENTS_PATH = re.compile(r"incidents/(\d+)/events/$")
+
+
+class FakeArgusServer:
+    """Serves a fixed list of incident records over HTTP from a background thread.
+
+    Example:
+
+        >>> with FakeArgusServer(incidents, latency=0.01) as server:
+        ...     client = Client(server.api_root_url, "token")
+
+    :param incidents: The incident records served by the listing endpoints.
+    :param latency: The number of seconds every response is delayed by.
+    :param page_size: The default number of incidents per result page.
+    """
+
+    def __init__(
+        self,
+        incidents: List[dict],
+        latency: float = 0.0,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ):
+        self.incidents = incidents
+        self.latency = latency
+        self.page_size = page_size
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._next_pk = len(incidents) + 1
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def api_root_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self) -> None:
+        """Starts serving requests on a free local port"""
+        handler = type("Handler", (_Handler,), {"server_state": self})
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="fake-argus", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops serving requests"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def allocate_pk(self) -> int:
+        with self._lock:
+            pk, self._next_pk = self._next_pk, self._next_pk + 1
+            return pk
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def get_page(self, path: str, query: dict) -> dict:
+        """Returns a cursor paginated result page of the served incidents"""
+        offset = int(query.get("cursor", ["0"])[0])
+        page_size = int(query.get("page_size", [self.page_size])[0])
+        end = offset + page_size
+        next_url = None
+        if end < len(self.incidents):
+            params = {key: values[0] for key, values in query.items()}
+            params["cursor"] = end
+            next_url = f"{self.api_root_url}{path}?{urlencode(params)}"
+        return {
+            "next": next_url,
+            "previous": None,
+            "results": self.incidents[offset:end],
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and bodies are written separately, which would otherwise add
+    # delayed ACK stalls to every response on a keep-alive connection
+    disable_nagle_algorithm = True
+    server_state: FakeArgusServer
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+    def do_GET(self):
+        state = self.server_state
+        url = urlparse(self.path)
+        path = url.path[len(API_PREFIX) :]
+        if path in ("incidents/", "incidents/mine/"):
+            self._respond(200, state.get_page(path, parse_qs(url.query)))
+        else:
+            self._respond(404, {"detail": "Not found."})
+
+    def do_POST(self):
+        state = self.server_state
+        path = urlparse(self.path).path[len(API_PREFIX) :]
+        body = self._read_body()
+        if path == "incidents/":
+            # Posted incidents are echoed back, completed by the attributes that
+            # Argus fills in itself
+            template = state.incidents[0] if state.incidents else {}
+            record = {**template, **body, "pk": state.allocate_pk()}
+            record["source"] = template.get("source")
+            self._respond(201, record)
+        elif _EVENTS_PATH.match(path):
+            incident = int(_EVENTS_PATH.match(path).group(1))
+            self._respond(
+                201,
+                {
+                    "pk": state.allocate_pk(),
+                    "incident": incident,
+                    "actor": {"pk": 1, "username": "benchmark"},
+                    "timestamp": body.get("timestamp") or "2024-03-01T12:00:00+00:00",
+                    "received": "2024-03-01T12:00:00.123456+00:00",
+                    "type": {"value": body.get("type"), "display": ""},
+                    "description": body.get("description", ""),
+                },
+            )
+        elif path == "incidents/sources/heartbeat/":
+            self._respond(200, {})
+        else:
+            self._respond(404, {"detail": "Not found."})
+
+    def _read_body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _respond(self, status: int, body) -> None:
+        self.server_state.count_request()
+        if self.server_state.latency:
+            time.sleep(self.server_state.latency)
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
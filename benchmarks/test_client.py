@@ -0,0 +1,133 @@
+"""Benchmarks of client operations against a local fake Argus server.
+
+Use the `--argus-latency` and `--argus-incidents` options to change the response
+latency and the number of incidents of the fake server, e.g.
+`tox -e benchmark -- --argus-latency=0.005 --argus-incidents=5000`.
+"""
+
+import asyncio
+
+import pytest
+
+from pyargus import models
+from pyargus.async_client import AsyncClient, async_paginated_query
+from pyargus.client import Client, paginated_query
+
+# The number of operations of the bulk benchmarks
+BULK_SIZE = 50
+
+
+@pytest.fixture
+def client(argus_server):
+    client = Client(argus_server.api_root_url, "token")
+    yield client
+    client.api.close_client()
+
+
+@pytest.fixture
+def async_client(argus_server):
+    """An AsyncClient along with the event loop to run it in, so that neither is
+    recreated for every benchmark round.
+    """
+    loop = asyncio.new_event_loop()
+    client = AsyncClient(argus_server.api_root_url, "token")
+    yield loop, client
+    loop.run_until_complete(client.api.aclose_client())
+    loop.close()
+
+
+def new_incident(number: int) -> models.Incident:
+    return models.Incident(
+        source_incident_id=f"benchmark-{number}",
+        description=f"Benchmark incident {number}",
+        level=3,
+        tags={"host": f"switch-{number}"},
+    )
+
+
+@pytest.mark.benchmark(group="paginated-query")
+def test_paginated_query(benchmark, client, argus_server):
+    def query():
+        return sum(
+            len(results)
+            for _response, results in paginated_query(client.api.incidents.list)
+        )
+
+    assert benchmark(query) == len(argus_server.incidents)
+
+
+@pytest.mark.benchmark(group="paginated-query")
+def test_paginated_query_with_prefetch(benchmark, client, argus_server):
+    def query():
+        return sum(
+            len(results)
+            for _response, results in paginated_query(
+                client.api.incidents.list, prefetch=2
+            )
+        )
+
+    assert benchmark(query) == len(argus_server.incidents)
+
+
+@pytest.mark.benchmark(group="paginated-query")
+def test_async_paginated_query(benchmark, async_client, argus_server):
+    loop, client = async_client
+
+    async def query():
+        count = 0
+        async for _response, results in async_paginated_query(
+            client.api.incidents.list
+        ):
+            count += len(results)
+        return count
+
+    count = benchmark(lambda: loop.run_until_complete(query()))
+    assert count == len(argus_server.incidents)
+
+
+@pytest.mark.benchmark(group="get-incidents")
+def test_get_incidents(benchmark, client, argus_server):
+    count = benchmark(lambda: sum(1 for _ in client.get_incidents()))
+    assert count == len(argus_server.incidents)
+
+
+@pytest.mark.benchmark(group="get-incidents")
+def test_get_incidents_streamed(benchmark, client, argus_server):
+    count = benchmark(lambda: sum(1 for _ in client.get_incidents(stream=True)))
+    assert count == len(argus_server.incidents)
+
+
+@pytest.mark.benchmark(group="bulk-post")
+def test_post_incidents_sequentially(benchmark, client):
+    incidents = [new_incident(number) for number in range(BULK_SIZE)]
+    benchmark(lambda: [client.post_incident(incident) for incident in incidents])
+
+
+@pytest.mark.benchmark(group="bulk-post")
+def test_post_incidents_concurrently(benchmark, async_client):
+    loop, client = async_client
+    incidents = [new_incident(number) for number in range(BULK_SIZE)]
+
+    async def post():
+        results = [result async for result in client.post_incidents(incidents)]
+        assert all(result.ok for result in results)
+
+    benchmark(lambda: loop.run_until_complete(post()))
+
+
+@pytest.mark.benchmark(group="bulk-post")
+def test_post_incident_events_threaded(benchmark, client):
+    events = [
+        (number + 1, models.Event(type="OTH", description="benchmark"))
+        for number in range(BULK_SIZE)
+    ]
+
+    def post():
+        assert all(result.ok for result in client.post_incident_events(events))
+
+    benchmark(post)
+
+
+@pytest.mark.benchmark(group="heartbeat")
+def test_heartbeat_loop(benchmark, client):
+    benchmark(lambda: [client.send_heartbeat() for _ in range(BULK_SIZE)])
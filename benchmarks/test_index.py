@@ -0,0 +1,39 @@
+"""Benchmarks of indexed incident queries"""
+
+import pytest
+from conftest import make_incident_records
+
+from pyargus.index import IncidentIndex
+from pyargus.models import Incident, SourceRegistry
+
+
+@pytest.fixture(scope="module")
+def incidents():
+    sources = SourceRegistry()
+    return [Incident.from_json(r, sources) for r in make_incident_records(20_000)]
+
+
+def linear_scan(incidents):
+    return [
+        incident
+        for incident in incidents
+        if incident.tags.get("host") == "switch-17"
+        and incident.source.name == "source-2"
+        and incident.open
+    ]
+
+
+@pytest.mark.benchmark(group="incident-query")
+def test_linear_scan_query(benchmark, incidents):
+    benchmark(linear_scan, incidents)
+
+
+@pytest.mark.benchmark(group="incident-query")
+def test_indexed_query(benchmark, incidents):
+    index = IncidentIndex(incidents)
+    assert index.query(
+        tags={"host": "switch-17"}, source="source-2", open=True
+    ) == linear_scan(incidents)
+    benchmark(
+        lambda: index.query(tags={"host": "switch-17"}, source="source-2", open=True)
+    )
@@ -0,0 +1,54 @@
+"""Benchmarks of the memory footprint of large in-memory incident sets"""
+
+import tracemalloc
+
+import pytest
+from conftest import make_incident_records
+
+from pyargus.models import COMPACT_MODELS, DEFAULT_MODELS, SourceRegistry
+
+INCIDENT_COUNT = 100_000
+
+
+@pytest.fixture(scope="module")
+def many_incident_records():
+    return make_incident_records(INCIDENT_COUNT)
+
+
+def measure_decoded_size(model_set, records, intern_sources=False) -> int:
+    """Returns the number of bytes allocated to keep `records` decoded in memory"""
+    tracemalloc.start()
+    try:
+        sources = SourceRegistry(model_set.source_system) if intern_sources else None
+        incidents = [
+            model_set.incident.from_json(record, sources) for record in records
+        ]
+        size, _peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del incidents
+    return size
+
+
+@pytest.mark.parametrize(
+    "model_set, intern_sources",
+    [(DEFAULT_MODELS, False), (COMPACT_MODELS, False), (COMPACT_MODELS, True)],
+    ids=["default", "compact", "compact-interned"],
+)
+@pytest.mark.benchmark(group="incident-memory")
+def test_memory_of_100k_incidents(
+    benchmark, model_set, intern_sources, many_incident_records
+):
+    size = benchmark.pedantic(
+        measure_decoded_size,
+        args=(model_set, many_incident_records, intern_sources),
+        rounds=1,
+    )
+    benchmark.extra_info["bytes"] = size
+    benchmark.extra_info["bytes_per_incident"] = size // INCIDENT_COUNT
+
+
+def test_compact_models_should_use_less_memory(many_incident_records):
+    default = measure_decoded_size(DEFAULT_MODELS, many_incident_records)
+    compact = measure_decoded_size(COMPACT_MODELS, many_incident_records)
+    assert compact < default
@@ -0,0 +1,71 @@
+"""Benchmarks of model (de)serialization"""
+
+import inspect
+
+import pytest
+from iso8601 import parse_date
+
+from pyargus.models import STATELESS, Incident, LazyIncident, SourceSystem
+from pyargus.time import LOCAL_INFINITY
+
+
+def legacy_incident_from_json(data: dict) -> Incident:
+    """The Incident.from_json() implementation of pyargus 0.7.0, kept as a baseline"""
+    kwargs = data.copy()
+    if kwargs["start_time"]:
+        kwargs["start_time"] = parse_date(kwargs["start_time"])
+    if kwargs["end_time"]:
+        kwargs["end_time"] = (
+            parse_date(kwargs["end_time"])
+            if kwargs["end_time"] != "infinity"
+            else LOCAL_INFINITY
+        )
+    else:
+        kwargs["end_time"] = STATELESS
+    kwargs["source"] = SourceSystem.from_json(kwargs["source"])
+
+    tags = [tag["tag"] for tag in kwargs["tags"]]
+    tags = dict(tag.split("=", maxsplit=1) for tag in tags)
+    kwargs["tags"] = tags
+
+    return Incident(
+        **{
+            key: value
+            for key, value in kwargs.items()
+            if key in inspect.signature(Incident).parameters
+        }
+    )
+
+
+def test_incident_from_json_should_match_legacy_output(incident_records):
+    for record in incident_records:
+        assert Incident.from_json(record) == legacy_incident_from_json(record)
+
+
+@pytest.mark.benchmark(group="incident-decode")
+def test_legacy_incident_from_json(benchmark, incident_records):
+    benchmark(lambda: [legacy_incident_from_json(r) for r in incident_records])
+
+
+@pytest.mark.benchmark(group="incident-decode")
+def test_incident_from_json(benchmark, incident_records):
+    benchmark(lambda: [Incident.from_json(r) for r in incident_records])
+
+
+@pytest.mark.benchmark(group="incident-decode")
+def test_lazy_incident_scan(benchmark, incident_records):
+    """Decodes lazily, touching only the attributes a typical scan looks at"""
+
+    def scan():
+        return [
+            (incident.pk, incident.level, incident.open)
+            for incident in map(LazyIncident.from_json, incident_records)
+        ]
+
+    benchmark(scan)
+
+
+@pytest.mark.benchmark(group="incident-encode")
+def test_incident_to_json(benchmark, incident_records):
+    incidents = [Incident.from_json(r) for r in incident_records]
+    benchmark(lambda: [incident.to_json() for incident in incidents])
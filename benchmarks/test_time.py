@@ -0,0 +1,53 @@
+"""Micro-benchmarks of timestamp parsing"""
+
+import pytest
+from iso8601 import parse_date
+
+from pyargus.time import parse_timestamp, parse_timestamps
+
+ARGUS_TIMESTAMPS = [
+    f"2024-03-{day % 28 + 1:02d}T12:{day % 60:02d}:07.{day:06d}+01:00"
+    for day in range(1000)
+]
+REPEATED_TIMESTAMPS = ["2024-04-01T08:00:00.654321+02:00"] * 1000
+
+
+def uncached_parse_timestamp(value: str):
+    return parse_timestamp.__wrapped__(value)
+
+
+@pytest.mark.benchmark(group="timestamp-distinct")
+def test_iso8601_parse_date(benchmark):
+    benchmark(lambda: [parse_date(value) for value in ARGUS_TIMESTAMPS])
+
+
+@pytest.mark.benchmark(group="timestamp-distinct")
+def test_parse_timestamp_uncached(benchmark):
+    benchmark(lambda: [uncached_parse_timestamp(value) for value in ARGUS_TIMESTAMPS])
+
+
+@pytest.mark.benchmark(group="timestamp-distinct")
+def test_parse_timestamps_column(benchmark):
+    # Every round starts from a cold cache, as the timestamps would otherwise only
+    # be parsed in the first one
+    benchmark.pedantic(
+        parse_timestamps,
+        args=(ARGUS_TIMESTAMPS,),
+        setup=parse_timestamp.cache_clear,
+        rounds=100,
+    )
+
+
+@pytest.mark.benchmark(group="timestamp-repeated")
+def test_iso8601_parse_date_repeated(benchmark):
+    benchmark(lambda: [parse_date(value) for value in REPEATED_TIMESTAMPS])
+
+
+@pytest.mark.benchmark(group="timestamp-repeated")
+def test_parse_timestamp_cached_repeated(benchmark):
+    benchmark(lambda: [parse_timestamp(value) for value in REPEATED_TIMESTAMPS])
+
+
+@pytest.mark.benchmark(group="timestamp-repeated")
+def test_parse_timestamps_column_repeated(benchmark):
+    benchmark(lambda: parse_timestamps(REPEATED_TIMESTAMPS))
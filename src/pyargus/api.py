@@ -1,12 +1,128 @@
 """Defines a low-level API interface for Argus using simple_rest_client"""
 
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MethodType
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
 from simple_rest_client.api import API
-from simple_rest_client.resource import Resource
+from simple_rest_client.decorators import handle_request_error
+from simple_rest_client.exceptions import AuthError
+from simple_rest_client.models import Request, Response
+from simple_rest_client.resource import BaseResource, Resource
+
+from .codec import JSONCodec, get_codec
+from .instrumentation import RequestInfo, RequestObserver
+from .ratelimit import RateLimiter
+from .resilience import CircuitBreaker, RetryPolicy, was_never_sent
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TransportConfig:
+    """Configures the HTTP connection pool used to talk to an Argus API.
+
+    By default, every resource of every connected API object maintains its own
+    connection pool. Passing the same TransportConfig to several `connect()` or
+    `async_connect()` calls (or `Client`/`AsyncClient` instances) makes all of them
+    share a single pool instead, so that connections (and their TLS handshakes) are
+    reused across clients.
+
+    The pool is created on first use. As it is shared, it must be closed using the
+    `close()` (or `aclose()`) method of this object rather than through any single
+    API object. Like any `httpx.AsyncClient`, the async pool must only be used from
+    a single event loop.
+
+    :param max_connections: The maximum number of concurrent connections.
+    :param max_keepalive_connections: The maximum number of idle connections to
+        keep alive for reuse.
+    :param keepalive_expiry: How many seconds an idle connection is kept alive.
+    :param http2: Whether to negotiate HTTP/2 with the server. This requires the
+        optional `h2` package (`pip install argus-api-client[http2]`).
+    """
+
+    max_connections: Optional[int] = 100
+    max_keepalive_connections: Optional[int] = 20
+    keepalive_expiry: Optional[float] = 5.0
+    http2: bool = False
 
+    _client: Optional[httpx.Client] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _async_client: Optional[httpx.AsyncClient] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    @property
+    def limits(self) -> httpx.Limits:
+        """Returns the connection pool limits of this configuration"""
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def get_client(self) -> httpx.Client:
+        """Returns the shared synchronous HTTP client, creating it if necessary"""
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(limits=self.limits, http2=self.http2)
+            return self._client
 
-def connect(api_root_url: str, token: str, timeout: float = 2.0) -> API:
+    def get_async_client(self) -> httpx.AsyncClient:
+        """Returns the shared async HTTP client, creating it if necessary"""
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = httpx.AsyncClient(
+                    limits=self.limits, http2=self.http2
+                )
+            return self._async_client
+
+    def close(self) -> None:
+        """Closes the shared synchronous connection pool, if it was ever opened"""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Closes the shared async connection pool, if it was ever opened"""
+        with self._lock:
+            client, self._async_client = self._async_client, None
+        if client is not None:
+            await client.aclose()
+
+
+def connect(
+    api_root_url: str,
+    token: str,
+    timeout: float = 2.0,
+    transport: Optional[TransportConfig] = None,
+    json_codec: Optional[JSONCodec] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    observer: Optional[RequestObserver] = None,
+) -> API:
     """Connects to an Argus API instance.
 
+    :param transport: An optional connection pool configuration. API objects
+        connected with the same TransportConfig share a single connection pool.
+    :param json_codec: The codec used to encode and decode JSON bodies. Defaults to
+        the fastest codec available, see `pyargus.codec.get_codec()`.
+    :param retry_policy: An optional policy for retrying failed requests.
+    :param circuit_breaker: An optional circuit breaker, which stops requests to the
+        server for a while after repeated server failures.
+    :param rate_limiter: An optional rate limiter, which throttles requests to the
+        server.
+    :param observer: An optional observer, which is told about every request made.
     :returns: A connected simple_rest_client API object
     """
     headers = {"Authorization": "Token " + token}
@@ -24,10 +140,375 @@ def connect(api_root_url: str, token: str, timeout: float = 2.0) -> API:
     )
     argusapi.add_resource(resource_name="sources", resource_class=SourceSystemResource)
     argusapi.add_resource(resource_name="tokens", resource_class=ExpiringTokenResource)
+    json_codec = json_codec or get_codec()
+    for resource in get_resources(argusapi):
+        resource.json_codec = json_codec
+        resource.retry_policy = retry_policy
+        resource.circuit_breaker = circuit_breaker
+        resource.rate_limiter = rate_limiter
+        resource.observer = observer
+        if transport:
+            resource.close_client()
+            resource.client = transport.get_client()
     return argusapi
 
 
-class IncidentResource(Resource):
+def get_resources(argusapi: API) -> List[BaseResource]:
+    """Returns all the resource objects that have been added to an API object"""
+    return [
+        getattr(argusapi, argusapi.correct_attribute_name(name))
+        for name in argusapi.get_resource_list()
+    ]
+
+
+class ArgusResource(Resource):
+    """A simple_rest_client Resource that encodes and decodes JSON bodies using a
+    pluggable JSON codec, rather than always using the standard library, and that
+    optionally throttles requests, retries failed requests, guards them by a
+    circuit breaker and reports them to an observer.
+
+    Besides the usual arguments, actions take an `authorization` keyword argument:
+    the live headers the Authorization header of a request comes from, when these
+    are not the headers of the resource.
+    """
+
+    json_codec: JSONCodec = get_codec("json")
+    retry_policy: Optional[RetryPolicy] = None
+    circuit_breaker: Optional[CircuitBreaker] = None
+    rate_limiter: Optional[RateLimiter] = None
+    observer: Optional[RequestObserver] = None
+    # Maps non-idempotent actions to a (list action name, filter function) pair,
+    # used to find out whether a failed attempt took effect after all. The filter
+    # function returns the list filters that match the request body, or None if
+    # there are none.
+    duplicate_lookups: Dict[str, Tuple[str, Callable[[dict], Optional[dict]]]] = {}
+
+    def add_action(self, action_name):
+        def action_method(
+            self,
+            *args,
+            body=None,
+            params=None,
+            headers=None,
+            authorization=None,
+            action_name=action_name,
+            **kwargs,
+        ):
+            request = build_request(
+                self, action_name, args, body, params, headers, kwargs
+            )
+            if not is_guarded(self):
+                try:
+                    return make_request(self.client, request, self.json_codec)
+                except AuthError:
+                    if not reauthorize(self, request, authorization):
+                        raise
+                    return make_request(self.client, request, self.json_codec)
+            return perform_request(self, action_name, request, authorization)
+
+        setattr(self, action_name, MethodType(action_method, self))
+
+
+def is_guarded(resource: BaseResource) -> bool:
+    """Returns True if requests of a resource are subject to rate limiting, retries,
+    a circuit breaker or an observer, and must therefore be performed by
+    `perform_request()`.
+    """
+    return (
+        resource.retry_policy is not None
+        or resource.circuit_breaker is not None
+        or resource.rate_limiter is not None
+        or resource.observer is not None
+    )
+
+
+def perform_request(
+    resource: ArgusResource,
+    action_name: str,
+    request: Request,
+    authorization: Optional[Dict[str, str]] = None,
+) -> Response:
+    """Performs the request of a resource action, subject to the rate limiter, retry
+    policy, circuit breaker and observer of the resource.
+
+    :param authorization: The live headers the Authorization header of the request
+        was taken from, if not those of the resource (see `reauthorize()`).
+    """
+    policy, breaker = resource.retry_policy, resource.circuit_breaker
+    limiter = resource.rate_limiter
+    attempt = 1
+    while True:
+        if limiter is not None:
+            limiter.acquire(resource.resource_name, action_name, request.method)
+        trial = breaker.before_request() if breaker is not None else False
+        try:
+            response = attempt_request(resource, action_name, request)
+        except Exception as error:
+            if breaker is not None:
+                breaker.record(error)
+            if isinstance(error, AuthError) and reauthorize(
+                resource, request, authorization
+            ):
+                continue
+            if not may_retry(policy, resource, action_name, request, attempt, error):
+                raise
+            if not policy.is_idempotent(request.method) and not was_never_sent(error):
+                duplicate = find_duplicate(resource, action_name, request)
+                if duplicate is not None:
+                    return duplicate
+            time.sleep(policy.get_delay(attempt, error))
+            attempt += 1
+        except BaseException:
+            # Cancelled or interrupted before there was an outcome to record
+            if trial:
+                breaker.abandon_trial()
+            raise
+        else:
+            if breaker is not None:
+                breaker.record(None)
+            return response
+
+
+def attempt_request(
+    resource: ArgusResource, action_name: str, request: Request
+) -> Response:
+    """Makes a single attempt at performing a request, reporting it to the observer
+    of the resource, if any.
+    """
+    if resource.observer is None:
+        return make_request(resource.client, request, resource.json_codec)
+    info = make_request_info(resource, action_name, request)
+    try:
+        return make_request(resource.client, request, resource.json_codec, info)
+    except Exception as error:
+        info.error = error
+        raise
+    finally:
+        resource.observer.request_finished(info)
+
+
+def make_request_info(
+    resource: BaseResource, action_name: str, request: Request
+) -> RequestInfo:
+    """Returns a record for measuring a request of a resource action"""
+    return RequestInfo(
+        resource=resource.resource_name,
+        action=action_name,
+        method=request.method,
+        url=request.url,
+    )
+
+
+def start_measuring(info: RequestInfo, options: dict) -> float:
+    """Records what is known about a request before it is sent, returning the
+    performance counter value it was sent at.
+    """
+    info.request_bytes = len(options.get("content") or b"")
+    info.started = time.time()
+    return time.perf_counter()
+
+
+def reauthorize(
+    resource: BaseResource,
+    request: Request,
+    authorization: Optional[Dict[str, str]] = None,
+) -> bool:
+    """Prepares a request that was rejected as unauthorized to be sent again, if the
+    token of its resource has been replaced since the request was built (e.g. by a
+    `tokens.TokenManager`), so that the old token may have been revoked while the
+    request was in flight.
+
+    :param authorization: The live headers holding the current token, if they are
+        not those of the resource, like the headers of a `pool.TokenAPI`, whose
+        clients share resources that carry no token at all.
+    :returns: True if the request has been given the new token
+    """
+    headers = resource.headers if authorization is None else authorization
+    current = headers.get("Authorization")
+    if current is None or current == request.headers.get("Authorization"):
+        return False
+    request.headers["Authorization"] = current
+    return True
+
+
+def find_duplicate(
+    resource: ArgusResource, action_name: str, request: Request
+) -> Optional[Response]:
+    """Looks up whether a failed attempt at a non-idempotent request took effect
+    after all, returning a response describing the created object if it did.
+    """
+    list_action, get_filters = resource.duplicate_lookups[action_name]
+    # The lookup must be authenticated just like the request
+    response = getattr(resource, list_action)(
+        params=get_filters(request.body), headers=dict(request.headers)
+    )
+    return make_duplicate_response(request, response)
+
+
+def may_retry(
+    policy: Optional[RetryPolicy],
+    resource: ArgusResource,
+    action_name: str,
+    request: Request,
+    attempt: int,
+    error: Exception,
+) -> bool:
+    """Decides whether a failed request can be retried"""
+    if policy is None or attempt >= policy.max_attempts:
+        return False
+    if not policy.is_retryable(error):
+        return False
+    if policy.is_idempotent(request.method) or was_never_sent(error):
+        return True
+    # A non-idempotent request that may have reached the server can only be
+    # retried if it can be checked whether it took effect
+    lookup = resource.duplicate_lookups.get(action_name)
+    return (
+        lookup is not None
+        and isinstance(request.body, dict)
+        and (lookup[1](request.body) is not None)
+    )
+
+
+def make_duplicate_response(request: Request, listing: Response) -> Optional[Response]:
+    """Turns the listing of an object found by a duplicate lookup into the response
+    that creating it would have produced, or None if nothing was found.
+    """
+    body = listing.body
+    results = body.get("results", []) if isinstance(body, dict) else body
+    if not results:
+        return None
+    return Response(
+        url=request.url,
+        method=request.method,
+        body=results[0],
+        headers=listing.headers,
+        status_code=201,
+        client_response=listing.client_response,
+    )
+
+
+def _source_incident_id_filter(body: dict) -> Optional[dict]:
+    source_incident_id = body.get("source_incident_id")
+    if not source_incident_id:
+        return None
+    return {"source_incident_id": source_incident_id}
+
+
+def build_request(
+    resource: BaseResource,
+    action_name: str,
+    args: tuple,
+    body=None,
+    params: Optional[dict] = None,
+    headers: Optional[dict] = None,
+    kwargs: Optional[dict] = None,
+) -> Request:
+    """Builds the request of a resource action call, just like a simple_rest_client
+    action would.
+    """
+    request = Request(
+        url=resource.get_action_full_url(action_name, *args),
+        method=resource.get_action_method(action_name),
+        params=params or {},
+        body=body,
+        headers=headers or {},
+        timeout=resource.timeout,
+        kwargs=kwargs or {},
+    )
+    request.params.update(resource.params)
+    request.headers.update(resource.headers)
+    return request
+
+
+def get_client_options(request: Request, json_codec: JSONCodec) -> dict:
+    """Returns the httpx request options needed to perform a request"""
+    options = {
+        "params": request.params,
+        "headers": request.headers,
+        "timeout": request.timeout,
+        **request.kwargs,
+    }
+    if request.method.lower() in ("post", "put", "patch"):
+        if request.headers.get("Content-Type") == "application/json":
+            if request.body is not None:
+                options["content"] = json_codec.encode(request.body)
+        else:
+            options["data"] = request.body
+    return options
+
+
+def make_response(
+    request: Request,
+    client_response: httpx.Response,
+    json_codec: JSONCodec,
+    info: Optional[RequestInfo] = None,
+) -> Response:
+    """Wraps an httpx response in a simple_rest_client Response, decoding its body.
+
+    If `info` is given, the status, size and decoding time of the response are
+    recorded in it.
+    """
+    content_type = client_response.headers.get("Content-Type", "")
+    if "text" in content_type:
+        body = client_response.text
+    elif "json" in content_type:
+        body = client_response.content
+        if info is None:
+            body = json_codec.decode(body) if body else ""
+        else:
+            start = time.perf_counter()
+            body = json_codec.decode(body) if body else ""
+            info.decode_time = time.perf_counter() - start
+    else:
+        body = client_response.content
+    if info is not None:
+        info.status_code = client_response.status_code
+        info.response_bytes = len(client_response.content)
+
+    return Response(
+        url=str(client_response.url),
+        method=request.method,
+        body=body,
+        headers=client_response.headers,
+        status_code=client_response.status_code,
+        client_response=client_response,
+    )
+
+
+@handle_request_error
+def make_request(
+    client: httpx.Client,
+    request: Request,
+    json_codec: JSONCodec,
+    info: Optional[RequestInfo] = None,
+) -> Response:
+    """Performs a request, the same way as simple_rest_client.request.make_request(),
+    except for encoding and decoding JSON bodies using `json_codec`.
+
+    If `info` is given, measurements of the request are recorded in it.
+    """
+    logger.debug("operation=request_started, request=%r", request)
+    options = get_client_options(request, json_codec)
+    if info is None:
+        client_response = client.request(request.method, request.url, **options)
+    else:
+        start = start_measuring(info, options)
+        try:
+            client_response = client.request(request.method, request.url, **options)
+        finally:
+            info.elapsed = time.perf_counter() - start
+    response = make_response(request, client_response, json_codec, info)
+    logger.debug(
+        "operation=request_finished, request=%r, response=%r", request, response
+    )
+    return response
+
+
+class IncidentResource(ArgusResource):
+    # Argus requires the source_incident_id of a source's incidents to be unique,
+    # so a posted incident can be found among the source's incidents by it
+    duplicate_lookups = {"create": ("list_mine", _source_incident_id_filter)}
     actions = {
         "list": {"method": "GET", "url": "incidents"},
         "list_mine": {"method": "GET", "url": "incidents/mine"},
@@ -40,7 +521,7 @@ class IncidentResource(Resource):
     }
 
 
-class IncidentEventResource(Resource):
+class IncidentEventResource(ArgusResource):
     actions = {
         "list": {"method": "GET", "url": "incidents/{}/events"},
         "create": {"method": "POST", "url": "incidents/{}/events"},
@@ -48,7 +529,7 @@ class IncidentEventResource(Resource):
     }
 
 
-class IncidentAcknowledgementResource(Resource):
+class IncidentAcknowledgementResource(ArgusResource):
     actions = {
         "list": {"method": "GET", "url": "incidents/{}/acks"},
         "create": {"method": "POST", "url": "incidents/{}/acks"},
@@ -56,7 +537,7 @@ class IncidentAcknowledgementResource(Resource):
     }
 
 
-class SourceSystemResource(Resource):
+class SourceSystemResource(ArgusResource):
     actions = {
         # The Argus source system endpoints are served under the incident app,
         # hence the "incidents/" URL prefix.
@@ -68,7 +549,7 @@ class SourceSystemResource(Resource):
     }
 
 
-class ExpiringTokenResource(Resource):
+class ExpiringTokenResource(ArgusResource):
     actions = {
         "refresh": {"method": "POST", "url": "auth/token/login/"},
     }
@@ -1,6 +1,16 @@
 """Defines an async low-level API interface for Argus using simple_rest_client"""
 
+import asyncio
+import logging
+import time
+from types import MethodType
+from typing import Dict, Optional
+
+import httpx
 from simple_rest_client.api import API
+from simple_rest_client.decorators import handle_async_request_error
+from simple_rest_client.exceptions import AuthError
+from simple_rest_client.models import Request, Response
 from simple_rest_client.resource import AsyncResource
 
 from .api import (
@@ -9,12 +19,49 @@ from .api import (
     IncidentEventResource,
     IncidentResource,
     SourceSystemResource,
+    TransportConfig,
+    build_request,
+    get_client_options,
+    get_resources,
+    is_guarded,
+    make_duplicate_response,
+    make_request_info,
+    make_response,
+    may_retry,
+    reauthorize,
+    start_measuring,
 )
+from .codec import JSONCodec, get_codec
+from .instrumentation import RequestInfo, RequestObserver
+from .ratelimit import RateLimiter
+from .resilience import CircuitBreaker, RetryPolicy, was_never_sent
+
+logger = logging.getLogger(__name__)
 
 
-def async_connect(api_root_url: str, token: str, timeout: float = 2.0) -> API:
+def async_connect(
+    api_root_url: str,
+    token: str,
+    timeout: float = 2.0,
+    transport: Optional[TransportConfig] = None,
+    json_codec: Optional[JSONCodec] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    observer: Optional[RequestObserver] = None,
+) -> API:
     """Connects to an Argus API instance using async resources.
 
+    :param transport: An optional connection pool configuration. API objects
+        connected with the same TransportConfig share a single connection pool.
+    :param json_codec: The codec used to encode and decode JSON bodies. Defaults to
+        the fastest codec available, see `pyargus.codec.get_codec()`.
+    :param retry_policy: An optional policy for retrying failed requests.
+    :param circuit_breaker: An optional circuit breaker, which stops requests to the
+        server for a while after repeated server failures.
+    :param rate_limiter: An optional rate limiter, which throttles requests to the
+        server.
+    :param observer: An optional observer, which is told about every request made.
     :returns: A connected simple_rest_client API object with async resources
     """
     headers = {"Authorization": "Token " + token}
@@ -41,24 +88,178 @@ def async_connect(api_root_url: str, token: str, timeout: float = 2.0) -> API:
     argusapi.add_resource(
         resource_name="tokens", resource_class=AsyncExpiringTokenResource
     )
+    json_codec = json_codec or get_codec()
+    for resource in get_resources(argusapi):
+        resource.json_codec = json_codec
+        resource.retry_policy = retry_policy
+        resource.circuit_breaker = circuit_breaker
+        resource.rate_limiter = rate_limiter
+        resource.observer = observer
+        if transport:
+            # The unused per-resource client holds no connections yet, so it can
+            # be discarded without awaiting its closure
+            resource.client = transport.get_async_client()
     return argusapi
 
 
-class AsyncIncidentResource(AsyncResource):
+class AsyncArgusResource(AsyncResource):
+    """Async version of `pyargus.api.ArgusResource`"""
+
+    json_codec: JSONCodec = get_codec("json")
+    retry_policy: Optional[RetryPolicy] = None
+    circuit_breaker: Optional[CircuitBreaker] = None
+    rate_limiter: Optional[RateLimiter] = None
+    observer: Optional[RequestObserver] = None
+    duplicate_lookups = {}
+
+    def add_action(self, action_name):
+        async def action_method(
+            self,
+            *args,
+            body=None,
+            params=None,
+            headers=None,
+            authorization=None,
+            action_name=action_name,
+            **kwargs,
+        ):
+            request = build_request(
+                self, action_name, args, body, params, headers, kwargs
+            )
+            if not is_guarded(self):
+                try:
+                    return await make_async_request(
+                        self.client, request, self.json_codec
+                    )
+                except AuthError:
+                    if not reauthorize(self, request, authorization):
+                        raise
+                    return await make_async_request(
+                        self.client, request, self.json_codec
+                    )
+            return await perform_async_request(
+                self, action_name, request, authorization
+            )
+
+        setattr(self, action_name, MethodType(action_method, self))
+
+
+async def perform_async_request(
+    resource: AsyncArgusResource,
+    action_name: str,
+    request: Request,
+    authorization: Optional[Dict[str, str]] = None,
+) -> Response:
+    """Async version of `pyargus.api.perform_request()`"""
+    policy, breaker = resource.retry_policy, resource.circuit_breaker
+    limiter = resource.rate_limiter
+    attempt = 1
+    while True:
+        if limiter is not None:
+            await limiter.async_acquire(
+                resource.resource_name, action_name, request.method
+            )
+        trial = breaker.before_request() if breaker is not None else False
+        try:
+            response = await attempt_async_request(resource, action_name, request)
+        except Exception as error:
+            if breaker is not None:
+                breaker.record(error)
+            if isinstance(error, AuthError) and reauthorize(
+                resource, request, authorization
+            ):
+                continue
+            if not may_retry(policy, resource, action_name, request, attempt, error):
+                raise
+            if not policy.is_idempotent(request.method) and not was_never_sent(error):
+                duplicate = await find_async_duplicate(resource, action_name, request)
+                if duplicate is not None:
+                    return duplicate
+            await asyncio.sleep(policy.get_delay(attempt, error))
+            attempt += 1
+        except BaseException:
+            # Cancelled or interrupted before there was an outcome to record
+            if trial:
+                breaker.abandon_trial()
+            raise
+        else:
+            if breaker is not None:
+                breaker.record(None)
+            return response
+
+
+async def attempt_async_request(
+    resource: AsyncArgusResource, action_name: str, request: Request
+) -> Response:
+    """Async version of `pyargus.api.attempt_request()`"""
+    if resource.observer is None:
+        return await make_async_request(resource.client, request, resource.json_codec)
+    info = make_request_info(resource, action_name, request)
+    try:
+        return await make_async_request(
+            resource.client, request, resource.json_codec, info
+        )
+    except Exception as error:
+        info.error = error
+        raise
+    finally:
+        resource.observer.request_finished(info)
+
+
+async def find_async_duplicate(
+    resource: AsyncArgusResource, action_name: str, request: Request
+) -> Optional[Response]:
+    """Async version of `pyargus.api.find_duplicate()`"""
+    list_action, get_filters = resource.duplicate_lookups[action_name]
+    response = await getattr(resource, list_action)(
+        params=get_filters(request.body), headers=dict(request.headers)
+    )
+    return make_duplicate_response(request, response)
+
+
+@handle_async_request_error
+async def make_async_request(
+    client: httpx.AsyncClient,
+    request: Request,
+    json_codec: JSONCodec,
+    info: Optional[RequestInfo] = None,
+) -> Response:
+    """Async version of `pyargus.api.make_request()`"""
+    logger.debug("operation=request_started, request=%r", request)
+    options = get_client_options(request, json_codec)
+    if info is None:
+        client_response = await client.request(request.method, request.url, **options)
+    else:
+        start = start_measuring(info, options)
+        try:
+            client_response = await client.request(
+                request.method, request.url, **options
+            )
+        finally:
+            info.elapsed = time.perf_counter() - start
+    response = make_response(request, client_response, json_codec, info)
+    logger.debug(
+        "operation=request_finished, request=%r, response=%r", request, response
+    )
+    return response
+
+
+class AsyncIncidentResource(AsyncArgusResource):
+    duplicate_lookups = IncidentResource.duplicate_lookups
     actions = IncidentResource.actions
 
 
-class AsyncIncidentEventResource(AsyncResource):
+class AsyncIncidentEventResource(AsyncArgusResource):
     actions = IncidentEventResource.actions
 
 
-class AsyncIncidentAcknowledgementResource(AsyncResource):
+class AsyncIncidentAcknowledgementResource(AsyncArgusResource):
     actions = IncidentAcknowledgementResource.actions
 
 
-class AsyncSourceSystemResource(AsyncResource):
+class AsyncSourceSystemResource(AsyncArgusResource):
     actions = SourceSystemResource.actions
 
 
-class AsyncExpiringTokenResource(AsyncResource):
+class AsyncExpiringTokenResource(AsyncArgusResource):
     actions = ExpiringTokenResource.actions
@@ -2,13 +2,38 @@
 
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime
-from typing import AsyncIterator, Callable, List, Optional, Tuple
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from simple_rest_client.exceptions import AuthError, ClientError, NotFoundError
-
-from . import async_api, models
-from .client import IncidentType, extract_params, has_next_page, is_paginated_response
+from simple_rest_client.resource import BaseResource
+
+from . import api, async_api, models, streaming
+from .batch import BatchResult, map_concurrently
+from .cache import AsyncReadCache
+from .client import (
+    IncidentType,
+    extract_params,
+    has_next_page,
+    incident_pk,
+    is_paginated_response,
+)
+from .codec import JSONCodec
+from .instrumentation import RequestObserver, observe_models
+from .query import IncidentQuery
+from .ratelimit import RateLimiter
+from .resilience import CircuitBreaker, RetryPolicy
 from .time import now as utcnow
 
 __all__ = ["AsyncClient"]
@@ -18,65 +43,315 @@ class AsyncClient:
     """Async high-level Argus API client.
 
     The low-level simple_rest_client API is available in the `api` instance variable.
+
+    API responses are decoded into the model classes of `model_set`. Pass
+    `models.COMPACT_MODELS` to decode into compact, slotted model variants that use
+    less memory.
+
+    Incidents decoded by a single query share SourceSystem objects. Pass a
+    `models.SourceRegistry` as `source_registry` to share them across all queries
+    made by this client (or by several clients sharing the registry) instead.
+
+    Pass a `cache.AsyncReadCache` as `read_cache` to cache the results of
+    `get_incident()` and `get_incident_events()` for a short while, and to coalesce
+    concurrent requests for the same incident. Cached reads of an incident are
+    invalidated when this client changes it.
+
+    Pass a `resilience.RetryPolicy` as `retry_policy` to retry requests that fail
+    due to server or connection errors, and a `resilience.CircuitBreaker` as
+    `circuit_breaker` to stop making requests to an unhealthy server for a while.
+    Pass a `ratelimit.RateLimiter` as `rate_limiter` to throttle requests to the
+    rates the server tolerates.
+
+    Pass an `instrumentation.RequestObserver` as `observer` to measure the time
+    spent on every request, on decoding its JSON body and on decoding the records
+    into model objects.
     """
 
-    def __init__(self, api_root_url: str, token: str, timeout: float = 2.0):
-        self.api = async_api.async_connect(api_root_url, token, timeout)
+    def __init__(
+        self,
+        api_root_url: str,
+        token: str,
+        timeout: float = 2.0,
+        transport: Optional[api.TransportConfig] = None,
+        json_codec: Optional[JSONCodec] = None,
+        model_set: models.ModelSet = models.DEFAULT_MODELS,
+        source_registry: Optional[models.SourceRegistry] = None,
+        read_cache: Optional[AsyncReadCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        observer: Optional[RequestObserver] = None,
+    ):
+        argusapi = async_api.async_connect(
+            api_root_url,
+            token,
+            timeout,
+            transport,
+            json_codec,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            rate_limiter=rate_limiter,
+            observer=observer,
+        )
+        if observer is not None:
+            model_set = observe_models(model_set, observer)
+        self._attach(argusapi, model_set, source_registry, read_cache)
+
+    @classmethod
+    def from_api(
+        cls,
+        argusapi: Any,
+        model_set: models.ModelSet = models.DEFAULT_MODELS,
+        source_registry: Optional[models.SourceRegistry] = None,
+        read_cache: Optional[AsyncReadCache] = None,
+    ) -> AsyncClient:
+        """Creates a client that makes its requests through an existing API object,
+        such as the API of a `pool.ClientPool`, rather than connecting a new one.
+
+        The model set is used as is; a model set that must report to an observer
+        should already be wrapped by `instrumentation.observe_models()`.
+        """
+        client = cls.__new__(cls)
+        client._attach(argusapi, model_set, source_registry, read_cache)
+        return client
+
+    def _attach(
+        self,
+        argusapi: Any,
+        model_set: models.ModelSet,
+        source_registry: Optional[models.SourceRegistry],
+        read_cache: Optional[AsyncReadCache],
+    ) -> None:
+        self.api = argusapi
+        self.model_set = model_set
+        self.source_registry = source_registry
+        self.read_cache = read_cache
 
     def __repr__(self):
         return f"<{self.__class__.__name__} {self.api.api_root_url!r}>"
 
+    def _get_source_registry(self) -> models.SourceRegistry:
+        """Returns the client's source registry, or a new one scoped to a single
+        query if the client has none.
+        """
+        if self.source_registry is not None:
+            return self.source_registry
+        return models.SourceRegistry(self.model_set.source_system)
+
     async def get_incident(self, incident_id: int) -> models.Incident:
         """Retrieves an incident based on its Argus ID"""
+        if self.read_cache is not None:
+            # Keyed like invalidate_incident(), however the id was given
+            pk = incident_pk(incident_id)
+            return await self.read_cache.get(
+                ("incident", pk), lambda: self._get_incident(pk)
+            )
+        return await self._get_incident(incident_id)
+
+    async def _get_incident(self, incident_id: int) -> models.Incident:
         response = await self.api.incidents.retrieve(incident_id)
-        return models.Incident.from_json(response.body)
+        return self.model_set.incident.from_json(response.body, self.source_registry)
 
-    async def get_incidents(self, **filters) -> AsyncIterator[models.Incident]:
+    async def get_incidents(
+        self,
+        query: Optional[IncidentQuery] = None,
+        *,
+        prefetch: int = 0,
+        stream: bool = False,
+        **filters,
+    ) -> AsyncIterator[models.Incident]:
         """Retrieves Argus Incidents as an async generator.
 
-        Use keyword arguments for filtering, unless you want every last bit from the
-        API.
+        Use a `query.IncidentQuery` or keyword arguments for filtering, unless you
+        want every last bit from the API. Keyword arguments are passed on to the API
+        as is, and take precedence over the filters of the query.
+
+        :param prefetch: If larger than zero, fetch up to this many result pages in
+            a background task while the current page is being consumed.
+        :param stream: If True, decode incidents incrementally as the bytes of each
+            result page arrive, rather than loading entire pages into memory first.
+            This cannot be combined with `prefetch`.
 
         Usage example:
         >>> [i async for i in client.get_incidents(open=True, acked=False)]
         [Incident(...), ...]
         """
-        async for _response, results in async_paginated_query(
-            self.api.incidents.list, params=filters
-        ):
-            for record in results:
-                yield models.Incident.from_json(record)
+        incidents = self._list_incidents("list", query, filters, prefetch, stream)
+        try:
+            async for incident in incidents:
+                yield incident
+        finally:
+            await incidents.aclose()
 
-    async def get_my_incidents(self, **filters) -> AsyncIterator[models.Incident]:
+    async def get_my_incidents(
+        self,
+        query: Optional[IncidentQuery] = None,
+        *,
+        prefetch: int = 0,
+        stream: bool = False,
+        **filters,
+    ) -> AsyncIterator[models.Incident]:
         """Retrieves all Incidents that came from the Source System represented by
         this client, returning them as an async generator.
 
-        Use keyword arguments for filtering, unless you want every last bit from the
-        API.
+        Use a `query.IncidentQuery` or keyword arguments for filtering, unless you
+        want every last bit from the API.
+
+        :param prefetch: If larger than zero, fetch up to this many result pages in
+            a background task while the current page is being consumed.
+        :param stream: If True, decode incidents incrementally as the bytes of each
+            result page arrive, rather than loading entire pages into memory first.
+            This cannot be combined with `prefetch`.
 
         Usage example:
         >>> [i async for i in client.get_my_incidents(open=True, acked=False)]
         [Incident(...), ...]
         """
-        async for _response, results in async_paginated_query(
-            self.api.incidents.list_mine, params=filters
-        ):
-            for record in results:
-                yield models.Incident.from_json(record)
+        incidents = self._list_incidents("list_mine", query, filters, prefetch, stream)
+        try:
+            async for incident in incidents:
+                yield incident
+        finally:
+            await incidents.aclose()
+
+    async def get_open_incidents(
+        self,
+        query: Optional[IncidentQuery] = None,
+        *,
+        prefetch: int = 0,
+        stream: bool = False,
+        **filters,
+    ) -> AsyncIterator[models.Incident]:
+        """Retrieves all open Incidents as an async generator, using the dedicated
+        endpoint for open incidents.
+
+        Takes the same arguments as `get_incidents()`.
+        """
+        incidents = self._list_incidents("list_open", query, filters, prefetch, stream)
+        try:
+            async for incident in incidents:
+                yield incident
+        finally:
+            await incidents.aclose()
+
+    async def get_open_unacked_incidents(
+        self,
+        query: Optional[IncidentQuery] = None,
+        *,
+        prefetch: int = 0,
+        stream: bool = False,
+        **filters,
+    ) -> AsyncIterator[models.Incident]:
+        """Retrieves all open Incidents that have not been acknowledged as an async
+        generator, using the dedicated endpoint for them.
+
+        Takes the same arguments as `get_incidents()`.
+        """
+        incidents = self._list_incidents(
+            "list_open_unacked", query, filters, prefetch, stream
+        )
+        try:
+            async for incident in incidents:
+                yield incident
+        finally:
+            await incidents.aclose()
+
+    async def _list_incidents(
+        self,
+        action_name: str,
+        query: Optional[IncidentQuery],
+        filters: dict,
+        prefetch: int,
+        stream: bool,
+    ) -> AsyncIterator[models.Incident]:
+        """Retrieves incidents using one of the listing actions of the incidents
+        resource, following page cursors.
+        """
+        sources = self._get_source_registry()
+        decode = self.model_set.incident.from_json
+        if query is not None:
+            filters = {**query.to_params(), **filters}
+            decode = query.get_decoder(self.model_set)
+        if stream:
+            if prefetch:
+                raise ValueError("prefetch cannot be combined with stream")
+            records = async_streamed_query(self.api.incidents, action_name, filters)
+        else:
+            method = getattr(self.api.incidents, action_name)
+            records = _iter_page_results(
+                async_paginated_query(method, params=filters, prefetch=prefetch)
+            )
+        try:
+            project = None
+            if query is not None and query.fields is not None:
+                project = query.project
+            async for record in records:
+                if project is not None:
+                    record = project(record)
+                yield decode(record, sources)
+        finally:
+            await records.aclose()
 
     async def get_incident_events(self, incident: IncidentType) -> List[models.Event]:
         """Returns a list of all events related to an Incident"""
-        pk = incident.pk if isinstance(incident, models.Incident) else int(incident)
+        pk = incident_pk(incident)
+        if self.read_cache is not None:
+            return await self.read_cache.get(
+                ("events", pk), lambda: self._get_incident_events(pk)
+            )
+        return await self._get_incident_events(pk)
+
+    async def _get_incident_events(self, pk: int) -> List[models.Event]:
         response = await self.api.events.list(pk)
-        return [models.Event.from_json(record) for record in response.body]
+        return [self.model_set.event.from_json(record) for record in response.body]
 
     async def get_incident_acknowledgements(
         self, incident: IncidentType
     ) -> List[models.Acknowledgement]:
         """Returns a list of all acknowledgements on an Incident"""
-        pk = incident.pk if isinstance(incident, models.Incident) else int(incident)
+        pk = incident_pk(incident)
         response = await self.api.acknowledgements.list(pk)
-        return [models.Acknowledgement.from_json(record) for record in response.body]
+        return [
+            self.model_set.acknowledgement.from_json(record) for record in response.body
+        ]
+
+    def get_events_for_many(
+        self,
+        incidents: Union[Iterable[IncidentType], AsyncIterable[IncidentType]],
+        concurrency: int = 10,
+    ) -> AsyncIterator[BatchResult]:
+        """Retrieves the events of many Incidents, with at most `concurrency`
+        requests in flight at any time.
+
+        Returns an async iterator that produces a `BatchResult` for each incident as
+        soon as its events have been retrieved, with the incident in its `item`
+        attribute and the list of events in its `result` attribute. Results may
+        arrive out of order. The `elapsed` attribute of each result holds the
+        latency of its request, which can be aggregated using
+        `pyargus.batch.LatencyStats`.
+
+        Usage example:
+        >>> async for result in client.get_events_for_many(incidents, concurrency=20):
+        ...     if result.ok:
+        ...         report(result.item, result.result)
+        """
+        return map_concurrently(self.get_incident_events, incidents, concurrency)
+
+    def get_acknowledgements_for_many(
+        self,
+        incidents: Union[Iterable[IncidentType], AsyncIterable[IncidentType]],
+        concurrency: int = 10,
+    ) -> AsyncIterator[BatchResult]:
+        """Retrieves the acknowledgements of many Incidents, with at most
+        `concurrency` requests in flight at any time.
+
+        Works just like `get_events_for_many()`, except that the `result` attribute
+        of each `BatchResult` holds the incident's list of acknowledgements.
+        """
+        return map_concurrently(
+            self.get_incident_acknowledgements, incidents, concurrency
+        )
 
     async def post_incident(self, incident: models.Incident) -> models.Incident:
         """Posts a new Incident to Argus.
@@ -85,7 +360,29 @@ class AsyncClient:
         """
         body = incident.to_json()
         response = await self.api.incidents.create(body=body)
-        return models.Incident.from_json(response.body)
+        return self.model_set.incident.from_json(response.body, self.source_registry)
+
+    def post_incidents(
+        self,
+        incidents: Union[Iterable[models.Incident], AsyncIterable[models.Incident]],
+        concurrency: int = 10,
+    ) -> AsyncIterator[BatchResult]:
+        """Posts many new Incidents to Argus, with at most `concurrency` requests in
+        flight at any time.
+
+        Returns an async iterator that produces a `BatchResult` for each incident as
+        soon as it has been posted. Results may arrive out of order: use their
+        `index` or `item` attributes to correlate them with the input. The `result`
+        attribute holds the full Incident as returned from the API, while a failed
+        post has its exception in the `error` attribute instead of failing the
+        entire batch.
+
+        Usage example:
+        >>> async for posted in client.post_incidents(incidents, concurrency=20):
+        ...     if not posted.ok:
+        ...         log.error("could not post %r: %s", posted.item, posted.error)
+        """
+        return map_concurrently(self.post_incident, incidents, concurrency)
 
     async def update_incident(self, incident: models.Incident) -> models.Incident:
         """Updates an Argus Incident.
@@ -97,8 +394,11 @@ class AsyncClient:
         # The API takes the primary key as part of the URL, not as part of the body
         if "pk" in body:
             del body["pk"]
-        response = await self.api.incidents.update(pk, body=body)
-        return models.Incident.from_json(response.body)
+        try:
+            response = await self.api.incidents.update(pk, body=body)
+        finally:
+            self._invalidate(pk)
+        return self.model_set.incident.from_json(response.body, self.source_registry)
 
     async def resolve_incident(
         self,
@@ -145,10 +445,18 @@ class AsyncClient:
 
         :returns: A full Event description as returned from the API.
         """
-        incident_pk = incident if isinstance(incident, int) else incident.pk
         body = event.to_json()
-        response = await self.api.events.create(incident_pk, body=body)
-        return models.Event.from_json(response.body)
+        pk = incident_pk(incident)
+        try:
+            response = await self.api.events.create(pk, body=body)
+        finally:
+            self._invalidate(pk)
+        return self.model_set.event.from_json(response.body)
+
+    def _invalidate(self, pk: int):
+        """Drops cached reads of an incident that this client has changed"""
+        if self.read_cache is not None:
+            self.read_cache.invalidate_incident(pk)
 
     async def supports_heartbeat(self) -> bool:
         """Detects whether the connected Argus server provides the heartbeat endpoint.
@@ -194,8 +502,10 @@ class AsyncClient:
     async def refresh_token(self) -> models.ExpiringToken:
         """Post w/o body to get a new token and its expiration timestamp
 
-        It will be necessary to re-initialize the client as the old token has
-        been rendered invalid.
+        The old token is rendered invalid, and this client keeps using it until
+        it is re-initialized. To swap in the new token without interruption, and
+        to keep refreshing it ahead of its expiration, use a `tokens.AsyncTokenManager`
+        instead.
 
         Store the new token (and the returned expiration datetime) where your
         program can load it on next run: environment variable, config file or
@@ -206,7 +516,7 @@ class AsyncClient:
 
 
 async def async_paginated_query(
-    method: Callable, *args, **kwargs
+    method: Callable, *args, prefetch: int = 0, **kwargs
 ) -> AsyncIterator[Tuple]:
     """Extracts paginated results from an async simple_rest_client API call.
 
@@ -216,11 +526,69 @@ async def async_paginated_query(
     simple_rest_client response object and `results` is the list of results extracted
     from the response body.
 
+    If `prefetch` is larger than zero, subsequent pages are fetched by a background
+    task while the caller consumes the current one. At most `prefetch` pages are
+    buffered ahead of the caller. Pages are still produced in cursor order, and
+    closing the generator early cancels any outstanding page request.
+
     :type method: An async API instance method to call
     :type args: Arguments to pass to method
+    :type prefetch: The number of pages to fetch ahead of the caller
     :type kwargs: Keyword arguments to pass to method
 
     """
+    pages = _iter_pages(method, *args, **kwargs)
+    if prefetch > 0:
+        pages = _prefetch_pages(pages, prefetch)
+    try:
+        async for page in pages:
+            yield page
+    finally:
+        await pages.aclose()
+
+
+async def async_streamed_query(
+    resource: BaseResource, action_name: str, params: Optional[dict] = None
+) -> AsyncIterator:
+    """Streams the results of a paginated async simple_rest_client resource action.
+
+    This is the async version of `pyargus.client.streamed_query()`: It produces
+    individual results, each one decoded as soon as its bytes have arrived from the
+    server, following page cursors until the last page.
+
+    :type resource: The async API resource to query
+    :type action_name: The name of the resource action to perform
+    :type params: Query parameters for the first page
+    """
+    params = params or {}
+    while True:
+        parser = streaming.PageParser()
+        records = streaming.aiter_streamed_records(
+            resource, action_name, params, parser
+        )
+        try:
+            async for record in records:
+                yield record
+        finally:
+            await records.aclose()
+        next_url = parser.members.get("next")
+        if not next_url:
+            return
+        params = extract_params(next_url)
+
+
+async def _iter_page_results(pages: AsyncIterator[Tuple]) -> AsyncIterator:
+    """Flattens the pages produced by async_paginated_query() into results"""
+    try:
+        async for _response, results in pages:
+            for record in results:
+                yield record
+    finally:
+        await pages.aclose()
+
+
+async def _iter_pages(method: Callable, *args, **kwargs) -> AsyncIterator[Tuple]:
+    """Fetches the pages of an async_paginated_query() one at a time, on demand"""
     response = await method(*args, **kwargs)
     if is_paginated_response(response):
         yield response, response.body["results"]
@@ -233,3 +601,40 @@ async def async_paginated_query(
 
     else:
         yield response, response.body
+
+
+# Marks the end of the page stream in a prefetch buffer
+_END_OF_PAGES = object()
+
+
+async def _prefetch_pages(
+    pages: AsyncIterator[Tuple], depth: int
+) -> AsyncIterator[Tuple]:
+    """Consumes pages from a background task, buffering up to `depth` of them"""
+    buffer = asyncio.Queue(maxsize=depth)
+
+    async def produce():
+        try:
+            try:
+                async for page in pages:
+                    await buffer.put((page, None))
+            finally:
+                await pages.aclose()
+        except Exception as error:  # re-raised in the consuming task
+            await buffer.put((None, error))
+            return
+        await buffer.put(_END_OF_PAGES)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item = await buffer.get()
+            if item is _END_OF_PAGES:
+                return
+            page, error = item
+            if error is not None:
+                raise error
+            yield page
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
@@ -0,0 +1,309 @@
+"""Helpers for running many Argus API operations concurrently"""
+
+from __future__ import annotations
+
+import asyncio
+import collections.abc
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
+
+__all__ = ["BatchResult", "LatencyStats", "map_concurrently", "map_threaded"]
+
+
+@dataclass
+class BatchResult:
+    """Describes the outcome of a single item of a batch operation.
+
+    `index` is the position of `item` in the batch input, which allows results that
+    are produced out of order to be correlated with their input. `elapsed` is the
+    number of seconds the operation took, successful or not.
+    """
+
+    index: int
+    item: Any
+    result: Any = None
+    error: Optional[Exception] = None
+    elapsed: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        """Returns True if the operation succeeded for this item"""
+        return self.error is None
+
+
+class LatencyStats:
+    """Collects the latencies of the operations of a batch.
+
+    Usage example:
+    >>> stats = LatencyStats()
+    >>> async for result in client.get_events_for_many(incidents):
+    ...     stats.record(result)
+    >>> print(f"{stats.count} requests, p95={stats.percentile(95):.3f}s")
+    """
+
+    def __init__(self):
+        self._samples: List[float] = []
+        self._sorted = True
+        self.errors = 0
+
+    def __repr__(self):
+        if not self._samples:
+            return f"<{self.__class__.__name__} count=0>"
+        return (
+            f"<{self.__class__.__name__} count={self.count} errors={self.errors}"
+            f" mean={self.mean:.4f}s p50={self.percentile(50):.4f}s"
+            f" p95={self.percentile(95):.4f}s max={self.max:.4f}s>"
+        )
+
+    def record(self, result: BatchResult) -> None:
+        """Records the latency and outcome of a single batch result"""
+        if not result.ok:
+            self.errors += 1
+        if result.elapsed is not None:
+            self.add(result.elapsed)
+
+    def add(self, elapsed: float) -> None:
+        """Records a single latency sample, in seconds"""
+        self._samples.append(elapsed)
+        self._sorted = False
+
+    @property
+    def count(self) -> int:
+        """The number of recorded samples"""
+        return len(self._samples)
+
+    @property
+    def total(self) -> float:
+        """The sum of all recorded latencies"""
+        return sum(self._samples)
+
+    @property
+    def mean(self) -> float:
+        """The mean latency, or NaN if nothing has been recorded"""
+        return self.total / self.count if self._samples else math.nan
+
+    @property
+    def min(self) -> float:
+        """The lowest latency, or NaN if nothing has been recorded"""
+        return self._get_sorted()[0] if self._samples else math.nan
+
+    @property
+    def max(self) -> float:
+        """The highest latency, or NaN if nothing has been recorded"""
+        return self._get_sorted()[-1] if self._samples else math.nan
+
+    def percentile(self, percent: float) -> float:
+        """Returns a percentile of the recorded latencies, using the nearest-rank
+        method, or NaN if nothing has been recorded.
+        """
+        if not 0 <= percent <= 100:
+            raise ValueError("percent must be between 0 and 100")
+        if not self._samples:
+            return math.nan
+        samples = self._get_sorted()
+        rank = max(1, math.ceil(percent / 100 * len(samples)))
+        return samples[rank - 1]
+
+    def _get_sorted(self) -> List[float]:
+        if not self._sorted:
+            self._samples.sort()
+            self._sorted = True
+        return self._samples
+
+
+async def map_concurrently(
+    func: Callable[[Any], Awaitable],
+    items: Union[Iterable, AsyncIterable],
+    concurrency: int,
+) -> AsyncIterator[BatchResult]:
+    """Awaits `func(item)` for every item, keeping at most `concurrency` calls in
+    flight at any time.
+
+    This is an async generator that produces a `BatchResult` for each item as soon
+    as its call completes, so results may be produced in a different order than the
+    input. A call that raises an exception does not abort the batch; the exception
+    is reported in the `error` attribute of that item's result instead.
+
+    Items are pulled from `items` only as fast as calls complete, so arbitrarily
+    large (or lazy) inputs can be processed in bounded memory. Closing the generator
+    early cancels all outstanding calls.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    items = _aiter(items)
+    pending = {}
+    index = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    item = await items.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                clock = []
+                task = asyncio.ensure_future(_await_and_clock(func, item, clock))
+                pending[task] = (index, item, clock)
+                index += 1
+            if not pending:
+                return
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda task: pending[task][0]):
+                task_index, item, clock = pending.pop(task)
+                error = task.exception()
+                if error is not None and not isinstance(error, Exception):
+                    raise error
+                result = task.result() if error is None else None
+                yield BatchResult(
+                    task_index,
+                    item,
+                    result=result,
+                    error=error,
+                    elapsed=_elapsed(clock),
+                )
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        await items.aclose()
+
+
+async def _await_and_clock(
+    func: Callable[[Any], Awaitable], item: Any, clock: List[float]
+) -> Any:
+    """Awaits func(item), noting the start and end times of the call in `clock`"""
+    clock.append(time.monotonic())
+    try:
+        return await func(item)
+    finally:
+        clock.append(time.monotonic())
+
+
+async def _aiter(items: Union[Iterable, AsyncIterable]) -> AsyncIterator:
+    """Iterates asynchronously over either a regular or an async iterable"""
+    if isinstance(items, collections.abc.AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+def map_threaded(
+    func: Callable,
+    items: Iterable,
+    max_workers: int,
+    timeout: Optional[float] = None,
+) -> Iterator[BatchResult]:
+    """Calls `func(item)` for every item in a pool of `max_workers` threads.
+
+    This is the thread based counterpart of `map_concurrently()`: It is a generator
+    that produces a `BatchResult` for each item as soon as its call completes, with
+    exceptions reported per item rather than aborting the batch. Items are pulled
+    from `items` only as fast as calls complete.
+
+    If `timeout` is set, a call that has been running for longer than `timeout`
+    seconds is reported as failed with a `TimeoutError`. Python threads cannot be
+    interrupted, so the call itself keeps running in the background until the
+    underlying request times out, but its eventual result is discarded.
+
+    The thread pool is shut down when the batch is complete, or when the generator
+    is closed early, in which case calls that have not yet started are cancelled.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+
+    items = enumerate(items)
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="pyargus-batch"
+    )
+    pending = {}
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < max_workers:
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                started = []
+                future = executor.submit(_call_and_clock, func, item, started)
+                pending[future] = (index, item, started)
+            if not pending:
+                return
+
+            done, _ = wait(
+                pending,
+                timeout=_time_until_first_deadline(pending.values(), timeout),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in sorted(done, key=lambda future: pending[future][0]):
+                index, item, clock = pending.pop(future)
+                error = future.exception()
+                result = future.result() if error is None else None
+                yield BatchResult(
+                    index, item, result=result, error=error, elapsed=_elapsed(clock)
+                )
+
+            if timeout is not None:
+                now = time.monotonic()
+                for future, (index, item, started) in sorted(
+                    pending.items(), key=lambda entry: entry[1][0]
+                ):
+                    if started and now - started[0] >= timeout:
+                        del pending[future]
+                        error = TimeoutError(f"call did not complete in {timeout}s")
+                        yield BatchResult(
+                            index, item, error=error, elapsed=now - started[0]
+                        )
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _call_and_clock(func: Callable, item: Any, clock: List[float]) -> Any:
+    """Calls func(item), noting the start and end times of the call in `clock`"""
+    clock.append(time.monotonic())
+    try:
+        return func(item)
+    finally:
+        clock.append(time.monotonic())
+
+
+def _elapsed(clock: List[float]) -> Optional[float]:
+    """Returns the duration of a call clocked by `_call_and_clock()` or
+    `_await_and_clock()`, or None if it never ran to completion.
+    """
+    return clock[1] - clock[0] if len(clock) == 2 else None
+
+
+def _time_until_first_deadline(
+    calls: Iterable[tuple], timeout: Optional[float]
+) -> Optional[float]:
+    """Returns the number of seconds until the first of the running calls times out.
+
+    If none of the calls have started running yet, the full timeout is returned.
+    """
+    if timeout is None:
+        return None
+    start_times = [started[0] for _index, _item, started in calls if started]
+    if not start_times:
+        return timeout
+    return max(0.0, min(start_times) + timeout - time.monotonic())
@@ -0,0 +1,164 @@
+"""Short-lived caching and coalescing of reads from the Argus API"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+__all__ = ["ReadCache", "AsyncReadCache"]
+
+# The kinds of reads that are invalidated when an incident is changed
+_INCIDENT_READS = ("incident", "events")
+
+
+class _BaseReadCache:
+    """The TTL and LRU bookkeeping shared by the sync and async read caches"""
+
+    def __init__(self, ttl: float = 1.0, maxsize: int = 1024):
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._flights: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drops a cached value, and makes sure a read that is already in flight for
+        it does not cache its result.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._flights.pop(key, None)
+
+    def invalidate_incident(self, pk: int) -> None:
+        """Drops all cached reads that concern a single incident"""
+        for kind in _INCIDENT_READS:
+            self.invalidate((kind, int(pk)))
+
+    def clear(self) -> None:
+        """Drops all cached values"""
+        with self._lock:
+            self._entries.clear()
+            self._flights.clear()
+
+    def _lookup(self, key: Hashable):
+        """Returns a cached (hit, value) pair. Must be called with the lock held."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key: Hashable, flight: Any, value: Any) -> None:
+        """Caches the result of a flight, unless it was invalidated while in flight.
+        Must be called with the lock held.
+        """
+        if self._flights.get(key) is not flight:
+            return
+        del self._flights[key]
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class _Flight:
+    """A read in progress, that other threads may wait for"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class ReadCache(_BaseReadCache):
+    """A thread-safe cache of recent API reads, with TTL expiry and LRU eviction.
+
+    Concurrent reads of the same key are coalesced: while one thread is fetching a
+    value, other threads asking for it wait for that fetch instead of issuing
+    requests of their own. Failed reads are not cached.
+
+    Cached values are shared between all readers, and should be treated as
+    read-only.
+
+    :param ttl: The number of seconds a value is cached for.
+    :param maxsize: The maximum number of cached values.
+    """
+
+    def get(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """Returns the cached value of `key`, calling `fetch()` to fetch it first if
+        it is not cached, or joining a fetch already in progress.
+        """
+        with self._lock:
+            hit, value = self._lookup(key)
+            if hit:
+                return value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fetch()
+        except BaseException as error:
+            flight.error = error
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            raise
+        else:
+            with self._lock:
+                self._store(key, flight, flight.value)
+            return flight.value
+        finally:
+            flight.done.set()
+
+
+class AsyncReadCache(_BaseReadCache):
+    """Async version of `ReadCache`.
+
+    A fetch that is shared by several coroutines runs as a task of its own, so
+    cancelling one of the waiting coroutines does not cancel the fetch for the
+    others.
+    """
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable]) -> Any:
+        """Returns the cached value of `key`, awaiting `fetch()` to fetch it first if
+        it is not cached, or joining a fetch already in progress.
+        """
+        with self._lock:
+            hit, value = self._lookup(key)
+            if hit:
+                return value
+            task = self._flights.get(key)
+            if task is None:
+                task = self._flights[key] = asyncio.ensure_future(fetch())
+                task.add_done_callback(lambda task: self._landed(key, task))
+        return await asyncio.shield(task)
+
+    def _landed(self, key: Hashable, task: asyncio.Future):
+        with self._lock:
+            if task.cancelled() or task.exception() is not None:
+                if self._flights.get(key) is task:
+                    del self._flights[key]
+            else:
+                self._store(key, task, task.result())
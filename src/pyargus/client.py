@@ -2,14 +2,24 @@
 
 from __future__ import annotations
 
+import queue
+import threading
 from datetime import datetime
-from typing import Callable, Iterator, List, Optional, Tuple, TypeVar
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
 from urllib.parse import parse_qs, urlparse
 
 from simple_rest_client.exceptions import AuthError, ClientError, NotFoundError
 from simple_rest_client.models import Response
-
-from . import api, models
+from simple_rest_client.resource import BaseResource
+
+from . import api, models, streaming
+from .batch import BatchResult, map_threaded
+from .cache import ReadCache
+from .codec import JSONCodec
+from .instrumentation import RequestObserver, observe_models
+from .query import IncidentQuery
+from .ratelimit import RateLimiter
+from .resilience import CircuitBreaker, RetryPolicy
 from .time import now as utcnow
 
 __all__ = ["Client"]
@@ -22,65 +32,285 @@ class Client:
     """High-level Argus API client.
 
     The low-level simple_rest_client API is available in the `api` instance variable.
+
+    API responses are decoded into the model classes of `model_set`. Pass
+    `models.COMPACT_MODELS` to decode into compact, slotted model variants that use
+    less memory.
+
+    Incidents decoded by a single query share SourceSystem objects. Pass a
+    `models.SourceRegistry` as `source_registry` to share them across all queries
+    made by this client (or by several clients sharing the registry) instead.
+
+    Pass a `cache.ReadCache` as `read_cache` to cache the results of `get_incident()`
+    and `get_incident_events()` for a short while, and to coalesce concurrent
+    requests for the same incident. Cached reads of an incident are invalidated
+    when this client changes it.
+
+    Pass a `resilience.RetryPolicy` as `retry_policy` to retry requests that fail
+    due to server or connection errors, and a `resilience.CircuitBreaker` as
+    `circuit_breaker` to stop making requests to an unhealthy server for a while.
+    Pass a `ratelimit.RateLimiter` as `rate_limiter` to throttle requests to the
+    rates the server tolerates.
+
+    Pass an `instrumentation.RequestObserver` as `observer` to measure the time
+    spent on every request, on decoding its JSON body and on decoding the records
+    into model objects.
     """
 
-    def __init__(self, api_root_url: str, token: str, timeout: float = 2.0):
-        self.api = api.connect(api_root_url, token, timeout)
+    def __init__(
+        self,
+        api_root_url: str,
+        token: str,
+        timeout: float = 2.0,
+        transport: Optional[api.TransportConfig] = None,
+        json_codec: Optional[JSONCodec] = None,
+        model_set: models.ModelSet = models.DEFAULT_MODELS,
+        source_registry: Optional[models.SourceRegistry] = None,
+        read_cache: Optional[ReadCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        observer: Optional[RequestObserver] = None,
+    ):
+        argusapi = api.connect(
+            api_root_url,
+            token,
+            timeout,
+            transport,
+            json_codec,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            rate_limiter=rate_limiter,
+            observer=observer,
+        )
+        if observer is not None:
+            model_set = observe_models(model_set, observer)
+        self._attach(argusapi, model_set, source_registry, read_cache)
+
+    @classmethod
+    def from_api(
+        cls,
+        argusapi: Any,
+        model_set: models.ModelSet = models.DEFAULT_MODELS,
+        source_registry: Optional[models.SourceRegistry] = None,
+        read_cache: Optional[ReadCache] = None,
+    ) -> Client:
+        """Creates a client that makes its requests through an existing API object,
+        such as the API of a `pool.ClientPool`, rather than connecting a new one.
+
+        The model set is used as is; a model set that must report to an observer
+        should already be wrapped by `instrumentation.observe_models()`.
+        """
+        client = cls.__new__(cls)
+        client._attach(argusapi, model_set, source_registry, read_cache)
+        return client
+
+    def _attach(
+        self,
+        argusapi: Any,
+        model_set: models.ModelSet,
+        source_registry: Optional[models.SourceRegistry],
+        read_cache: Optional[ReadCache],
+    ) -> None:
+        self.api = argusapi
+        self.model_set = model_set
+        self.source_registry = source_registry
+        self.read_cache = read_cache
 
     def __repr__(self):
         return f"<{self.__class__.__name__} {self.api.api_root_url!r}>"
 
+    def _get_source_registry(self) -> models.SourceRegistry:
+        """Returns the client's source registry, or a new one scoped to a single
+        query if the client has none.
+        """
+        if self.source_registry is not None:
+            return self.source_registry
+        return models.SourceRegistry(self.model_set.source_system)
+
     def get_incident(self, incident_id: int) -> models.Incident:
         """Retrieves an incident based on its Argus ID"""
+        if self.read_cache is not None:
+            # Keyed like invalidate_incident(), however the id was given
+            pk = incident_pk(incident_id)
+            return self.read_cache.get(("incident", pk), lambda: self._get_incident(pk))
+        return self._get_incident(incident_id)
+
+    def _get_incident(self, incident_id: int) -> models.Incident:
         response = self.api.incidents.retrieve(incident_id)
-        return models.Incident.from_json(response.body)
+        return self.model_set.incident.from_json(response.body, self.source_registry)
 
-    def get_incidents(self, **filters) -> Iterator[models.Incident]:
+    def get_incidents(
+        self,
+        query: Optional[IncidentQuery] = None,
+        *,
+        prefetch: int = 0,
+        stream: bool = False,
+        **filters,
+    ) -> Iterator[models.Incident]:
         """Retrieves Argus Incidents as a generator.
 
-        Use keyword arguments for filtering, unless you want every last bit from the
-        API.
+        Use a `query.IncidentQuery` or keyword arguments for filtering, unless you
+        want every last bit from the API. Keyword arguments are passed on to the API
+        as is, and take precedence over the filters of the query.
+
+        :param prefetch: If larger than zero, fetch up to this many result pages in
+            a background thread while the current page is being consumed.
+        :param stream: If True, decode incidents incrementally as the bytes of each
+            result page arrive, rather than loading entire pages into memory first.
+            This cannot be combined with `prefetch`.
 
         Usage example:
         >>> list(client.get_incidents(open=True, acked=False))
         [Incident(...), ...]
         """
-        for _response, results in paginated_query(
-            self.api.incidents.list, params=filters
-        ):
-            for record in results:
-                yield models.Incident.from_json(record)
+        yield from self._list_incidents("list", query, filters, prefetch, stream)
 
-    def get_my_incidents(self, **filters) -> Iterator[models.Incident]:
+    def get_my_incidents(
+        self,
+        query: Optional[IncidentQuery] = None,
+        *,
+        prefetch: int = 0,
+        stream: bool = False,
+        **filters,
+    ) -> Iterator[models.Incident]:
         """Retrieves all Incidents that came from the Source System represented by
         this client, returning them as a generator.
 
-        Use keyword arguments for filtering, unless you want every last bit from the
-        API.
+        Use a `query.IncidentQuery` or keyword arguments for filtering, unless you
+        want every last bit from the API.
+
+        :param prefetch: If larger than zero, fetch up to this many result pages in
+            a background thread while the current page is being consumed.
+        :param stream: If True, decode incidents incrementally as the bytes of each
+            result page arrive, rather than loading entire pages into memory first.
+            This cannot be combined with `prefetch`.
 
         Usage example:
         >>> list(client.get_my_incidents(open=True, acked=False))
         [Incident(...), ...]
         """
-        for _response, results in paginated_query(
-            self.api.incidents.list_mine, params=filters
-        ):
-            for record in results:
-                yield models.Incident.from_json(record)
+        yield from self._list_incidents("list_mine", query, filters, prefetch, stream)
+
+    def get_open_incidents(
+        self,
+        query: Optional[IncidentQuery] = None,
+        *,
+        prefetch: int = 0,
+        stream: bool = False,
+        **filters,
+    ) -> Iterator[models.Incident]:
+        """Retrieves all open Incidents as a generator, using the dedicated endpoint
+        for open incidents.
+
+        Takes the same arguments as `get_incidents()`.
+        """
+        yield from self._list_incidents("list_open", query, filters, prefetch, stream)
+
+    def get_open_unacked_incidents(
+        self,
+        query: Optional[IncidentQuery] = None,
+        *,
+        prefetch: int = 0,
+        stream: bool = False,
+        **filters,
+    ) -> Iterator[models.Incident]:
+        """Retrieves all open Incidents that have not been acknowledged as a
+        generator, using the dedicated endpoint for them.
+
+        Takes the same arguments as `get_incidents()`.
+        """
+        yield from self._list_incidents(
+            "list_open_unacked", query, filters, prefetch, stream
+        )
+
+    def _list_incidents(
+        self,
+        action_name: str,
+        query: Optional[IncidentQuery],
+        filters: dict,
+        prefetch: int,
+        stream: bool,
+    ) -> Iterator[models.Incident]:
+        """Retrieves incidents using one of the listing actions of the incidents
+        resource, following page cursors.
+        """
+        sources = self._get_source_registry()
+        decode = self.model_set.incident.from_json
+        if query is not None:
+            filters = {**query.to_params(), **filters}
+            decode = query.get_decoder(self.model_set)
+        if stream:
+            if prefetch:
+                raise ValueError("prefetch cannot be combined with stream")
+            records = streamed_query(self.api.incidents, action_name, filters)
+        else:
+            method = getattr(self.api.incidents, action_name)
+            records = (
+                record
+                for _response, results in paginated_query(
+                    method, params=filters, prefetch=prefetch
+                )
+                for record in results
+            )
+        if query is not None and query.fields is not None:
+            records = (query.project(record) for record in records)
+        for record in records:
+            yield decode(record, sources)
 
     def get_incident_events(self, incident: IncidentType) -> List[models.Event]:
         """Returns a list of all events related to an Incident"""
-        pk = incident.pk if isinstance(incident, models.Incident) else int(incident)
+        pk = incident_pk(incident)
+        if self.read_cache is not None:
+            return self.read_cache.get(
+                ("events", pk), lambda: self._get_incident_events(pk)
+            )
+        return self._get_incident_events(pk)
+
+    def _get_incident_events(self, pk: int) -> List[models.Event]:
         response = self.api.events.list(pk)
-        return [models.Event.from_json(record) for record in response.body]
+        return [self.model_set.event.from_json(record) for record in response.body]
 
     def get_incident_acknowledgements(
         self, incident: IncidentType
     ) -> List[models.Acknowledgement]:
         """Returns a list of all acknowledgements on an Incident"""
-        pk = incident.pk if isinstance(incident, models.Incident) else int(incident)
+        pk = incident_pk(incident)
         response = self.api.acknowledgements.list(pk)
-        return [models.Acknowledgement.from_json(record) for record in response.body]
+        return [
+            self.model_set.acknowledgement.from_json(record) for record in response.body
+        ]
+
+    def get_events_for(
+        self,
+        incidents: Iterable[IncidentType],
+        max_workers: int = 8,
+        timeout: Optional[float] = None,
+    ) -> Iterator[BatchResult]:
+        """Retrieves the events of many Incidents using a pool of worker threads.
+
+        Returns a generator that produces a `BatchResult` for each incident as soon
+        as its events have been retrieved, with the list of events in its `result`
+        attribute. See `pyargus.batch.map_threaded()` for the meaning of
+        `max_workers` and `timeout`.
+        """
+        return map_threaded(self.get_incident_events, incidents, max_workers, timeout)
+
+    def get_acknowledgements_for(
+        self,
+        incidents: Iterable[IncidentType],
+        max_workers: int = 8,
+        timeout: Optional[float] = None,
+    ) -> Iterator[BatchResult]:
+        """Retrieves the acknowledgements of many Incidents using a pool of worker
+        threads.
+
+        Works just like `get_events_for()`, except that the `result` attribute of
+        each `BatchResult` holds the incident's list of acknowledgements.
+        """
+        return map_threaded(
+            self.get_incident_acknowledgements, incidents, max_workers, timeout
+        )
 
     def post_incident(self, incident: models.Incident) -> models.Incident:
         """Posts a new Incident to Argus.
@@ -89,7 +319,7 @@ class Client:
         """
         body = incident.to_json()
         response = self.api.incidents.create(body=body)
-        return models.Incident.from_json(response.body)
+        return self.model_set.incident.from_json(response.body, self.source_registry)
 
     def update_incident(self, incident: models.Incident) -> models.Incident:
         """Updates an Argus Incident.
@@ -101,8 +331,11 @@ class Client:
         # The API takes the primary key as part of the URL, not as part of the body
         if "pk" in body:
             del body["pk"]
-        response = self.api.incidents.update(pk, body=body)
-        return models.Incident.from_json(response.body)
+        try:
+            response = self.api.incidents.update(pk, body=body)
+        finally:
+            self._invalidate(pk)
+        return self.model_set.incident.from_json(response.body, self.source_registry)
 
     def resolve_incident(
         self,
@@ -123,6 +356,33 @@ class Client:
         )
         return self.post_incident_event(incident, end_event)
 
+    def resolve_incidents(
+        self,
+        incidents: Iterable[IncidentType],
+        description: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+        max_workers: int = 8,
+        timeout: Optional[float] = None,
+    ) -> Iterator[BatchResult]:
+        """Resolves many Argus Incidents using a pool of worker threads.
+
+        Returns a generator that produces a `BatchResult` for each incident as soon
+        as it has been resolved, with the posted Event in its `result` attribute.
+        Incidents that could not be resolved have the exception in their `error`
+        attribute instead. See `pyargus.batch.map_threaded()` for the meaning of
+        `max_workers` and `timeout`.
+
+        :param description: An optional event description to post.
+        :param timestamp: When the events happened. Defaults to the current datetime.
+        """
+        if timestamp is None:
+            timestamp = utcnow()
+
+        def resolve(incident: IncidentType) -> models.Event:
+            return self.resolve_incident(incident, description, timestamp)
+
+        return map_threaded(resolve, incidents, max_workers, timeout)
+
     def restart_incident(
         self,
         incident: IncidentType,
@@ -149,10 +409,38 @@ class Client:
 
         :returns: A full Event description as returned from the API.
         """
-        incident_pk = incident if isinstance(incident, int) else incident.pk
         body = event.to_json()
-        response = self.api.events.create(incident_pk, body=body)
-        return models.Event.from_json(response.body)
+        pk = incident_pk(incident)
+        try:
+            response = self.api.events.create(pk, body=body)
+        finally:
+            self._invalidate(pk)
+        return self.model_set.event.from_json(response.body)
+
+    def _invalidate(self, pk: int):
+        """Drops cached reads of an incident that this client has changed"""
+        if self.read_cache is not None:
+            self.read_cache.invalidate_incident(pk)
+
+    def post_incident_events(
+        self,
+        incident_events: Iterable[Tuple[IncidentType, models.Event]],
+        max_workers: int = 8,
+        timeout: Optional[float] = None,
+    ) -> Iterator[BatchResult]:
+        """Posts many new Incident Events to Argus using a pool of worker threads.
+
+        `incident_events` is an iterable of `(incident, event)` pairs. Returns a
+        generator that produces a `BatchResult` for each pair as soon as its event
+        has been posted, with the full Event as returned from the API in its `result`
+        attribute. See `pyargus.batch.map_threaded()` for the meaning of
+        `max_workers` and `timeout`.
+        """
+
+        def post(incident_event: Tuple[IncidentType, models.Event]) -> models.Event:
+            return self.post_incident_event(*incident_event)
+
+        return map_threaded(post, incident_events, max_workers, timeout)
 
     def supports_heartbeat(self) -> bool:
         """Detects whether the connected Argus server provides the heartbeat endpoint.
@@ -198,8 +486,10 @@ class Client:
     def refresh_token(self) -> models.ExpiringToken:
         """Post w/o body to get a new token and its expiration timestamp
 
-        It will be necessary to re-initialize the client as the old token has
-        been rendered invalid.
+        The old token is rendered invalid, and this client keeps using it until
+        it is re-initialized. To swap in the new token without interruption, and
+        to keep refreshing it ahead of its expiration, use a `tokens.TokenManager`
+        instead.
 
         Store the new token (and the returned expiration datetime) where your
         program can load it on next run: environment variable, config file or
@@ -209,7 +499,14 @@ class Client:
         return models.ExpiringToken.from_json(response.body)
 
 
-def paginated_query(method: Callable, *args, **kwargs) -> Iterator[Tuple]:
+def incident_pk(incident: IncidentType) -> int:
+    """Returns the primary key of an incident given either as an object or a pk"""
+    return incident.pk if hasattr(incident, "pk") else int(incident)
+
+
+def paginated_query(
+    method: Callable, *args, prefetch: int = 0, **kwargs
+) -> Iterator[Tuple]:
     """Extracts paginated results from a simple_rest_client API call.
 
     This function is a generator that produces subsequent results for each page
@@ -218,11 +515,52 @@ def paginated_query(method: Callable, *args, **kwargs) -> Iterator[Tuple]:
     simple_rest_client response object and `results` is the list of results extracted
     from the response body.
 
+    If `prefetch` is larger than zero, subsequent pages are fetched by a background
+    thread while the caller consumes the current one. At most `prefetch` pages are
+    buffered ahead of the caller. Pages are still produced in cursor order, and
+    closing the generator early stops the background thread from issuing further
+    requests.
+
     :type method: An API instance method to call
     :type args: Arguments to pass to method
+    :type prefetch: The number of pages to fetch ahead of the caller
     :type kwargs: Keyword arguments to pass to method
 
     """
+    pages = _iter_pages(method, *args, **kwargs)
+    if prefetch > 0:
+        pages = _prefetch_pages(pages, prefetch)
+    yield from pages
+
+
+def streamed_query(
+    resource: BaseResource, action_name: str, params: Optional[dict] = None
+) -> Iterator:
+    """Streams the results of a paginated simple_rest_client resource action.
+
+    Unlike `paginated_query()`, this generator produces individual results rather
+    than pages. Each result is decoded as soon as its bytes have arrived from the
+    server, so that only a single result, rather than an entire page, needs to be
+    held in memory at any time. Page cursors are followed until the last page.
+
+    :type resource: The API resource to query
+    :type action_name: The name of the resource action to perform
+    :type params: Query parameters for the first page
+    """
+    params = params or {}
+    while True:
+        parser = streaming.PageParser()
+        yield from streaming.iter_streamed_records(
+            resource, action_name, params, parser
+        )
+        next_url = parser.members.get("next")
+        if not next_url:
+            return
+        params = extract_params(next_url)
+
+
+def _iter_pages(method: Callable, *args, **kwargs) -> Iterator[Tuple]:
+    """Fetches the pages of a paginated_query() one at a time, on demand"""
     response = method(*args, **kwargs)
     if is_paginated_response(response):
         yield response, response.body["results"]
@@ -237,6 +575,56 @@ def paginated_query(method: Callable, *args, **kwargs) -> Iterator[Tuple]:
         yield response, response.body
 
 
+# Marks the end of the page stream in a prefetch buffer
+_END_OF_PAGES = object()
+# How often (in seconds) a blocked prefetch thread checks whether it should stop
+_PREFETCH_POLL_INTERVAL = 0.1
+
+
+def _prefetch_pages(pages: Iterator[Tuple], depth: int) -> Iterator[Tuple]:
+    """Consumes pages from a background thread, buffering up to `depth` of them"""
+    buffer = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=_PREFETCH_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            try:
+                for page in pages:
+                    if stopped.is_set() or not put((page, None)):
+                        return
+            finally:
+                pages.close()
+        # Anything that ends the thread must reach the consumer, which would
+        # otherwise wait forever
+        except BaseException as error:  # re-raised in the consuming thread
+            put((None, error))
+            return
+        put(_END_OF_PAGES)
+
+    producer = threading.Thread(target=produce, name="pyargus-prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END_OF_PAGES:
+                return
+            page, error = item
+            if error is not None:
+                raise error
+            yield page
+    finally:
+        stopped.set()
+
+
 def is_paginated_response(response: Response):
     """Returns True if the API response appears to be a paginated result"""
     return (
@@ -0,0 +1,98 @@
+"""Pluggable JSON codecs for encoding and decoding Argus API bodies"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Optional, Protocol
+
+__all__ = [
+    "JSONCodec",
+    "StdlibCodec",
+    "OrjsonCodec",
+    "MsgspecCodec",
+    "get_codec",
+]
+
+
+class JSONCodec(Protocol):
+    """Encodes Python values to JSON bytes and decodes them again"""
+
+    name: str
+
+    def encode(self, value: Any) -> bytes: ...
+
+    def decode(self, data: bytes) -> Any: ...
+
+
+class StdlibCodec:
+    """JSON codec based on the standard library `json` module"""
+
+    name = "json"
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """JSON codec based on the optional `orjson` library"""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+
+    def encode(self, value: Any) -> bytes:
+        return self._dumps(value)
+
+    def decode(self, data: bytes) -> Any:
+        return self._loads(data)
+
+
+class MsgspecCodec:
+    """JSON codec based on the optional `msgspec` library"""
+
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def encode(self, value: Any) -> bytes:
+        return self._encoder.encode(value)
+
+    def decode(self, data: bytes) -> Any:
+        return self._decoder.decode(data)
+
+
+_CODECS = {codec.name: codec for codec in (MsgspecCodec, OrjsonCodec, StdlibCodec)}
+
+
+def get_codec(name: Optional[str] = None) -> JSONCodec:
+    """Returns a JSON codec by name.
+
+    Without a name, the fastest codec available in the current environment is
+    returned: `msgspec` or `orjson` if either one is installed, the standard library
+    `json` module otherwise.
+
+    :param name: One of "msgspec", "orjson" or "json".
+    :raises ValueError: if there is no codec by that name.
+    :raises ImportError: if the named codec's library is not installed.
+    """
+    if name is not None:
+        if name not in _CODECS:
+            raise ValueError(f"Unknown JSON codec {name!r}")
+        return _CODECS[name]()
+    for codec_class in _CODECS.values():
+        try:
+            return codec_class()
+        except ImportError:
+            continue
+    return StdlibCodec()
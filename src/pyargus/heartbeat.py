@@ -0,0 +1,428 @@
+"""Scheduled sending of source system heartbeats to Argus"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .api import TransportConfig
+from .async_client import AsyncClient
+from .client import Client
+
+__all__ = [
+    "HeartbeatScheduler",
+    "AsyncHeartbeatScheduler",
+    "HeartbeatMetrics",
+    "supports_heartbeat",
+    "async_supports_heartbeat",
+    "forget_heartbeat_support",
+]
+
+logger = logging.getLogger(__name__)
+
+# Whether the heartbeat endpoint is supported, by API root URL
+_support: Dict[str, bool] = {}
+_support_lock = threading.Lock()
+
+
+def supports_heartbeat(client: Client) -> bool:
+    """Returns `client.supports_heartbeat()`, probing each Argus server only once per
+    process, no matter how many clients (or tokens) are used to talk to it.
+    """
+    url = client.api.api_root_url
+    with _support_lock:
+        if url in _support:
+            return _support[url]
+    supported = client.supports_heartbeat()
+    with _support_lock:
+        return _support.setdefault(url, supported)
+
+
+async def async_supports_heartbeat(client: AsyncClient) -> bool:
+    """Async version of `supports_heartbeat()`"""
+    url = client.api.api_root_url
+    with _support_lock:
+        if url in _support:
+            return _support[url]
+    supported = await client.supports_heartbeat()
+    with _support_lock:
+        return _support.setdefault(url, supported)
+
+
+def forget_heartbeat_support(api_root_url: Optional[str] = None) -> None:
+    """Forgets whether the Argus server at `api_root_url` (or any server, if not
+    given) supports heartbeats, e.g. after it has been upgraded.
+    """
+    with _support_lock:
+        if api_root_url is None:
+            _support.clear()
+        else:
+            _support.pop(api_root_url, None)
+
+
+@dataclass(frozen=True)
+class HeartbeatMetrics:
+    """A snapshot of the state of a heartbeat scheduler"""
+
+    sources: int
+    """Number of clients that heartbeats are sent for"""
+    sent: int
+    """Number of heartbeats successfully sent"""
+    failed: int
+    """Number of heartbeats that could not be sent"""
+    skipped: int
+    """Number of heartbeats skipped because the previous one was still in progress"""
+    unsupported: int
+    """Number of clients dropped because their server does not support heartbeats"""
+
+
+class _BaseHeartbeatScheduler:
+    """The scheduling bookkeeping shared by the sync and async heartbeat schedulers"""
+
+    def __init__(
+        self,
+        clients: Iterable[Any] = (),
+        interval: float = 60.0,
+        jitter: float = 0.1,
+        check_support: bool = True,
+        transport: Optional[TransportConfig] = None,
+    ):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if not 0 <= jitter < 1:
+            raise ValueError("jitter must be at least 0 and less than 1")
+        self.interval = interval
+        self.jitter = jitter
+        self.check_support = check_support
+        self._transport = transport
+        # A heap of (due time, sequence number, client) entries. Entries of removed
+        # clients are discarded as they come up.
+        self._schedule: List[Tuple[float, int, Any]] = []
+        self._sequence = itertools.count()
+        self._clients: Dict[int, Any] = {}
+        self._busy = set()
+        self._counts = dict.fromkeys(("sent", "failed", "skipped", "unsupported"), 0)
+        self._lock = threading.Lock()
+        for client in clients:
+            self.add(client)
+
+    @property
+    def metrics(self) -> HeartbeatMetrics:
+        """A snapshot of the scheduler's counters"""
+        with self._lock:
+            return HeartbeatMetrics(sources=len(self._clients), **self._counts)
+
+    @property
+    def clients(self) -> list:
+        """The clients that heartbeats are sent for"""
+        with self._lock:
+            return list(self._clients.values())
+
+    def add(self, client: Any) -> None:
+        """Starts sending heartbeats for a client.
+
+        The first heartbeat is sent within `jitter * interval` seconds, so that the
+        first heartbeats of many clients added at once are spread out a little.
+        """
+        with self._lock:
+            if id(client) in self._clients:
+                return
+            self._clients[id(client)] = client
+            first = time.monotonic() + random.uniform(0, self.jitter * self.interval)
+            self._push(first, client)
+        self._wake()
+
+    def remove(self, client: Any) -> None:
+        """Stops sending heartbeats for a client"""
+        with self._lock:
+            self._clients.pop(id(client), None)
+
+    def _push(self, due: float, client: Any) -> None:
+        """Schedules a heartbeat. Must be called with the lock held."""
+        heapq.heappush(self._schedule, (due, next(self._sequence), client))
+
+    def _next_interval(self) -> float:
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _pop_due(self) -> Tuple[List[Any], Optional[float]]:
+        """Takes the clients whose heartbeats are due off the schedule, scheduling
+        their next heartbeats, and returns them along with the number of seconds
+        until the next heartbeat after them is due (or None if there is none).
+
+        Clients whose previous heartbeat is still in progress are skipped.
+        """
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            while self._schedule and self._schedule[0][0] <= now:
+                _due, _sequence, client = heapq.heappop(self._schedule)
+                if id(client) not in self._clients:
+                    continue
+                self._push(now + self._next_interval(), client)
+                if id(client) in self._busy:
+                    self._counts["skipped"] += 1
+                    logger.debug("skipped heartbeat of busy %r", client)
+                    continue
+                self._busy.add(id(client))
+                due.append(client)
+            wait = self._schedule[0][0] - now if self._schedule else None
+        return due, wait
+
+    def _finish(self, client: Any, outcome: str) -> None:
+        with self._lock:
+            self._busy.discard(id(client))
+            self._counts[outcome] += 1
+            if outcome == "unsupported":
+                self._clients.pop(id(client), None)
+
+    def _wake(self) -> None:
+        """Wakes up the scheduling loop, e.g. because a client was added"""
+
+    @staticmethod
+    def _log_failure(client: Any, error: Exception) -> None:
+        logger.warning("could not send heartbeat of %r: %s", client, error)
+
+    @staticmethod
+    def _log_unsupported(client: Any) -> None:
+        logger.warning(
+            "not sending heartbeats of %r, the server does not support them", client
+        )
+
+
+class HeartbeatScheduler(_BaseHeartbeatScheduler):
+    """Sends a heartbeat for each of a set of source system clients at regular
+    intervals, from a background thread.
+
+    Each client's heartbeat is sent every `interval` seconds, varied randomly by up
+    to `jitter` times the interval, so that the heartbeats of many clients do not
+    synchronize into bursts. Heartbeats are sent by a pool of `max_workers` threads.
+    If a client's previous heartbeat is still in progress when the next one is due,
+    the next one is skipped rather than queued up.
+
+    If `check_support` is set, clients whose Argus server does not support
+    heartbeats are dropped after their first attempt. Support is probed only once
+    per server, see `supports_heartbeat()`.
+
+    To send heartbeats for many source systems over a single connection pool, give
+    their clients the same `api.TransportConfig`, or use `for_tokens()`.
+
+    Example:
+
+        >>> with HeartbeatScheduler([nav, zabbix], interval=30) as scheduler:
+        ...     run_glue_service()
+
+    :param clients: The clients to send heartbeats for.
+    :param interval: The number of seconds between heartbeats of a client.
+    :param jitter: The maximum random variation of the interval, as a fraction of
+        the interval.
+    :param check_support: Whether to stop sending heartbeats for clients whose
+        server does not support them.
+    :param max_workers: The maximum number of heartbeats sent concurrently.
+    :param transport: A transport that is closed along with the scheduler.
+    """
+
+    def __init__(self, *args, max_workers: int = 8, **kwargs):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self._condition = threading.Condition(threading.Lock())
+        self._stopping = False
+        self._woken = False
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def for_tokens(
+        cls,
+        api_root_url: str,
+        tokens: Iterable[str],
+        transport: Optional[TransportConfig] = None,
+        timeout: float = 2.0,
+        **kwargs,
+    ) -> HeartbeatScheduler:
+        """Returns a scheduler that sends heartbeats for many source system tokens,
+        all over the connection pool of a single transport.
+
+        :param transport: The transport to share between the clients. If not given,
+            one is created, which is closed along with the scheduler.
+        """
+        owned = transport is None
+        transport = transport or TransportConfig()
+        clients = [
+            Client(api_root_url, token, timeout=timeout, transport=transport)
+            for token in tokens
+        ]
+        return cls(clients, transport=transport if owned else None, **kwargs)
+
+    def __enter__(self) -> HeartbeatScheduler:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self) -> None:
+        """Starts sending heartbeats"""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(
+            self.max_workers, thread_name_prefix="pyargus-heartbeat-worker"
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="pyargus-heartbeat", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stops sending heartbeats, waiting for those in progress to finish"""
+        if self._thread is not None:
+            with self._condition:
+                self._stopping = True
+                self._condition.notify()
+            self._thread.join()
+            self._thread = None
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._transport is not None:
+            self._transport.close()
+
+    def _wake(self) -> None:
+        with self._condition:
+            self._woken = True
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if self._stopping:
+                    return
+            due, wait = self._pop_due()
+            for client in due:
+                self._executor.submit(self._beat, client)
+            with self._condition:
+                if not (self._stopping or self._woken or due):
+                    self._condition.wait(wait)
+                self._woken = False
+
+    def _beat(self, client: Client) -> None:
+        try:
+            if self.check_support and not supports_heartbeat(client):
+                self._log_unsupported(client)
+                outcome = "unsupported"
+            else:
+                client.send_heartbeat()
+                outcome = "sent"
+        except Exception as error:
+            self._log_failure(client, error)
+            outcome = "failed"
+        self._finish(client, outcome)
+
+
+class AsyncHeartbeatScheduler(_BaseHeartbeatScheduler):
+    """Async version of `HeartbeatScheduler`, for AsyncClients.
+
+    Heartbeats are scheduled by a task, and each heartbeat is sent by a task of its
+    own, with at most `max_concurrency` of them in progress at any time.
+
+    Example:
+
+        >>> async with AsyncHeartbeatScheduler([nav, zabbix], interval=30):
+        ...     await run_glue_service()
+    """
+
+    def __init__(self, *args, max_concurrency: int = 8, **kwargs):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        # Created by start(), as they must belong to the running event loop
+        self._wakeup: Optional[asyncio.Event] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Future] = None
+        self._beats = set()
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def for_tokens(
+        cls,
+        api_root_url: str,
+        tokens: Iterable[str],
+        transport: Optional[TransportConfig] = None,
+        timeout: float = 2.0,
+        **kwargs,
+    ) -> AsyncHeartbeatScheduler:
+        """Async version of `HeartbeatScheduler.for_tokens()`"""
+        owned = transport is None
+        transport = transport or TransportConfig()
+        clients = [
+            AsyncClient(api_root_url, token, timeout=timeout, transport=transport)
+            for token in tokens
+        ]
+        return cls(clients, transport=transport if owned else None, **kwargs)
+
+    async def __aenter__(self) -> AsyncHeartbeatScheduler:
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def start(self) -> None:
+        """Starts sending heartbeats. Must be called from a running event loop."""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._task = asyncio.ensure_future(self._run())
+
+    async def aclose(self) -> None:
+        """Stops sending heartbeats, waiting for those in progress to finish"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            await asyncio.gather(*self._beats, return_exceptions=True)
+        if self._transport is not None:
+            await self._transport.aclose()
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            due, wait = self._pop_due()
+            for client in due:
+                beat = asyncio.ensure_future(self._beat(client))
+                self._beats.add(beat)
+                beat.add_done_callback(self._beats.discard)
+            if due:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _beat(self, client: AsyncClient) -> None:
+        async with self._semaphore:
+            try:
+                if self.check_support and not await async_supports_heartbeat(client):
+                    self._log_unsupported(client)
+                    outcome = "unsupported"
+                else:
+                    await client.send_heartbeat()
+                    outcome = "sent"
+            except Exception as error:
+                self._log_failure(client, error)
+                outcome = "failed"
+        self._finish(client, outcome)
@@ -0,0 +1,148 @@
+"""Indexed collections of incidents, for fast filtering on the client side"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Union
+
+from . import models
+from .client import IncidentType, incident_pk
+from .mirror import CLOSED, IncidentChange
+
+__all__ = ["IncidentIndex"]
+
+
+class IncidentIndex:
+    """A collection of incidents with inverted indexes on their tags, source, level,
+    open and acked attributes.
+
+    Rather than scanning every incident, `query()` intersects the sets of incidents
+    that match each criterion, starting with the smallest, which makes compound
+    queries fast even over large collections. The indexes are updated incrementally
+    as incidents are added, replaced and removed.
+
+    Example:
+
+        >>> index = IncidentIndex(client.get_incidents(open=True))
+        >>> index.query(tags={"host": "switch-1"}, source="nav", max_level=2)
+
+    An index can also follow an IncidentMirror:
+
+        >>> mirror.subscribe(index.apply_change)
+    """
+
+    def __init__(self, incidents: Iterable[models.Incident] = ()):
+        self._incidents: Dict[int, models.Incident] = {}
+        self._tags: Dict[tuple, Set[int]] = defaultdict(set)
+        self._sources: Dict[Union[int, str], Set[int]] = defaultdict(set)
+        self._levels: Dict[int, Set[int]] = defaultdict(set)
+        self._open: Dict[bool, Set[int]] = defaultdict(set)
+        self._acked: Dict[bool, Set[int]] = defaultdict(set)
+        self.update(incidents)
+
+    def __len__(self) -> int:
+        return len(self._incidents)
+
+    def __iter__(self) -> Iterator[models.Incident]:
+        return iter(list(self._incidents.values()))
+
+    def __contains__(self, incident: IncidentType) -> bool:
+        return incident_pk(incident) in self._incidents
+
+    def get(self, incident: IncidentType) -> Optional[models.Incident]:
+        """Returns the indexed incident with the given primary key, if any"""
+        return self._incidents.get(incident_pk(incident))
+
+    def add(self, incident: models.Incident) -> None:
+        """Adds an incident to the index, replacing any incident with the same pk"""
+        self.remove(incident.pk)
+        pk = incident.pk
+        self._incidents[pk] = incident
+        for index, value in self._keys(incident):
+            index[value].add(pk)
+
+    def update(self, incidents: Iterable[models.Incident]) -> None:
+        """Adds several incidents to the index"""
+        for incident in incidents:
+            self.add(incident)
+
+    def remove(self, incident: IncidentType) -> Optional[models.Incident]:
+        """Removes an incident from the index, returning it if it was indexed"""
+        pk = incident_pk(incident)
+        removed = self._incidents.pop(pk, None)
+        if removed is not None:
+            for index, value in self._keys(removed):
+                pks = index[value]
+                pks.discard(pk)
+                if not pks:
+                    del index[value]
+        return removed
+
+    def apply_change(self, change: IncidentChange) -> None:
+        """Applies a change reported by an IncidentMirror to the index"""
+        if change.kind == CLOSED:
+            self.remove(change.incident)
+        else:
+            self.add(change.incident)
+
+    def query(
+        self,
+        *,
+        tags: Optional[Dict[str, str]] = None,
+        source: Union[models.SourceSystem, int, str, None] = None,
+        level: Optional[int] = None,
+        max_level: Optional[int] = None,
+        open: Optional[bool] = None,
+        acked: Optional[bool] = None,
+    ) -> List[models.Incident]:
+        """Returns the indexed incidents matching all the given criteria, in pk order.
+
+        :param tags: Tags that the incidents must all have, as key=value pairs.
+        :param source: The source system of the incidents, as a SourceSystem object,
+            its primary key or its name.
+        :param level: The exact level of the incidents.
+        :param max_level: The highest level number (i.e. the lowest severity) of the
+            incidents, like the `level__lte` filter of the Argus API.
+        :param open: Whether the incidents are open.
+        :param acked: Whether the incidents are acknowledged.
+        """
+        candidates = []
+        for key, value in (tags or {}).items():
+            candidates.append(self._tags.get((key, str(value)), set()))
+        if source is not None:
+            if hasattr(source, "pk"):
+                source = source.pk
+            candidates.append(self._sources.get(source, set()))
+        if level is not None:
+            candidates.append(self._levels.get(level, set()))
+        if max_level is not None:
+            candidates.append(
+                set().union(
+                    *(pks for lvl, pks in self._levels.items() if lvl <= max_level)
+                )
+            )
+        if open is not None:
+            candidates.append(self._open.get(bool(open), set()))
+        if acked is not None:
+            candidates.append(self._acked.get(bool(acked), set()))
+
+        if not candidates:
+            matches = self._incidents.keys()
+        else:
+            candidates.sort(key=len)
+            matches = candidates[0].intersection(*candidates[1:])
+        return [self._incidents[pk] for pk in sorted(matches)]
+
+    def _keys(self, incident: models.Incident) -> Iterator[tuple]:
+        """Yields the (index, value) pairs under which an incident is indexed"""
+        for tag in (incident.tags or {}).items():
+            yield self._tags, tag
+        if incident.source is not None:
+            yield self._sources, incident.source.pk
+            yield self._sources, incident.source.name
+        if incident.level is not None:
+            yield self._levels, incident.level
+        if incident.open is not None:
+            yield self._open, bool(incident.open)
+        if incident.acked is not None:
+            yield self._acked, bool(incident.acked)
@@ -0,0 +1,328 @@
+"""Instrumentation of requests to the Argus API and of response decoding"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+from . import models
+
+__all__ = [
+    "RequestInfo",
+    "RequestObserver",
+    "CompositeObserver",
+    "MetricsCollector",
+    "OpenTelemetryObserver",
+]
+
+# Upper bounds of the request duration histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class RequestInfo:
+    """Describes a single attempt at performing an API request.
+
+    :param resource: The name of the API resource, e.g. "incidents".
+    :param action: The name of the resource action, e.g. "list".
+    :param method: The HTTP method of the request.
+    :param url: The URL of the request, without query parameters.
+    :param started: The wall clock time the request was started at, as seconds since
+        the epoch.
+    :param elapsed: The number of seconds spent sending the request and receiving
+        the response.
+    :param decode_time: The number of seconds spent decoding the JSON body of the
+        response.
+    :param request_bytes: The size of the request body.
+    :param response_bytes: The size of the response body.
+    :param status_code: The HTTP status code of the response, if one was received.
+    :param error: The exception the request failed with, if any.
+    """
+
+    resource: str
+    action: str
+    method: str
+    url: str
+    started: float = 0.0
+    elapsed: float = 0.0
+    decode_time: float = 0.0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    status_code: Optional[int] = None
+    error: Optional[Exception] = None
+
+    @property
+    def endpoint(self) -> str:
+        """The resource action of the request, like "incidents.list" """
+        return f"{self.resource}.{self.action}"
+
+
+class RequestObserver(Protocol):
+    """Receives measurements of the requests made and responses decoded by a client.
+
+    Observers are called synchronously by the thread or task that made the request,
+    and should return quickly.
+    """
+
+    def request_finished(self, info: RequestInfo) -> None:
+        """Called after every attempt at performing a request, failed or not"""
+
+    def model_decoded(self, model: type, elapsed: float) -> None:
+        """Called after every `from_json()` call that decoded an API record into an
+        instance of `model`, which took `elapsed` seconds.
+        """
+
+
+class CompositeObserver:
+    """Passes all measurements on to several observers"""
+
+    def __init__(self, *observers: RequestObserver):
+        self.observers = observers
+
+    def request_finished(self, info: RequestInfo) -> None:
+        for observer in self.observers:
+            observer.request_finished(info)
+
+    def model_decoded(self, model: type, elapsed: float) -> None:
+        for observer in self.observers:
+            observer.model_decoded(model, elapsed)
+
+
+class MetricsCollector:
+    """Aggregates measurements into Prometheus-style counters and histograms, which
+    can be exposed using the text-based exposition format returned by `render()`.
+
+    Metrics are labelled by resource, action and, for request counts, HTTP status
+    (or "error" for requests that got no response). A single collector can be
+    shared by any number of clients and threads.
+
+    :param prefix: The prefix of all metric names.
+    :param buckets: The upper bounds of the request duration histogram buckets.
+    """
+
+    def __init__(self, prefix: str = "argus_client", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, ...], int] = defaultdict(int)
+        self._durations: Dict[Tuple[str, ...], List] = {}
+        self._decode_seconds: Dict[Tuple[str, ...], float] = defaultdict(float)
+        self._request_bytes: Dict[Tuple[str, ...], int] = defaultdict(int)
+        self._response_bytes: Dict[Tuple[str, ...], int] = defaultdict(int)
+        self._models: Dict[str, int] = defaultdict(int)
+        self._model_seconds: Dict[str, float] = defaultdict(float)
+
+    def request_finished(self, info: RequestInfo) -> None:
+        endpoint = (info.resource, info.action)
+        status = str(info.status_code) if info.status_code is not None else "error"
+        with self._lock:
+            self._requests[(*endpoint, info.method, status)] += 1
+            histogram = self._durations.get(endpoint)
+            if histogram is None:
+                # Bucket counts (the last one being +Inf), sum
+                histogram = self._durations[endpoint] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                ]
+            histogram[0][bisect.bisect_left(self.buckets, info.elapsed)] += 1
+            histogram[1] += info.elapsed
+            self._decode_seconds[endpoint] += info.decode_time
+            self._request_bytes[endpoint] += info.request_bytes
+            self._response_bytes[endpoint] += info.response_bytes
+
+    def model_decoded(self, model: type, elapsed: float) -> None:
+        with self._lock:
+            self._models[model.__name__] += 1
+            self._model_seconds[model.__name__] += elapsed
+
+    def clear(self) -> None:
+        """Resets all metrics"""
+        with self._lock:
+            for metric in (
+                self._requests,
+                self._durations,
+                self._decode_seconds,
+                self._request_bytes,
+                self._response_bytes,
+                self._models,
+                self._model_seconds,
+            ):
+                metric.clear()
+
+    def render(self) -> str:
+        """Returns all metrics in the Prometheus text-based exposition format"""
+        lines = []
+        with self._lock:
+            self._render_counter(
+                lines,
+                "requests_total",
+                "Requests made to the Argus API",
+                ("resource", "action", "method", "status"),
+                self._requests,
+            )
+            self._render_histogram(lines)
+            endpoint_labels = ("resource", "action")
+            self._render_counter(
+                lines,
+                "json_decode_seconds_total",
+                "Time spent decoding JSON response bodies",
+                endpoint_labels,
+                self._decode_seconds,
+            )
+            self._render_counter(
+                lines,
+                "request_bytes_total",
+                "Size of request bodies sent",
+                endpoint_labels,
+                self._request_bytes,
+            )
+            self._render_counter(
+                lines,
+                "response_bytes_total",
+                "Size of response bodies received",
+                endpoint_labels,
+                self._response_bytes,
+            )
+            model_counts = {(name,): count for name, count in self._models.items()}
+            self._render_counter(
+                lines,
+                "models_decoded_total",
+                "API records decoded into model objects",
+                ("model",),
+                model_counts,
+            )
+            model_seconds = {
+                (name,): seconds for name, seconds in self._model_seconds.items()
+            }
+            self._render_counter(
+                lines,
+                "model_decode_seconds_total",
+                "Time spent decoding API records into model objects",
+                ("model",),
+                model_seconds,
+            )
+        return "\n".join(lines) + "\n"
+
+    def _render_counter(
+        self,
+        lines: List[str],
+        name: str,
+        description: str,
+        label_names: Tuple[str, ...],
+        values: Dict[Tuple[str, ...], Any],
+    ):
+        name = f"{self.prefix}_{name}"
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in sorted(values.items()):
+            lines.append(f"{name}{_format_labels(zip(label_names, labels))} {value}")
+
+    def _render_histogram(self, lines: List[str]):
+        name = f"{self.prefix}_request_duration_seconds"
+        lines.append(f"# HELP {name} Time spent waiting for Argus API responses")
+        lines.append(f"# TYPE {name} histogram")
+        for (resource, action), (counts, total) in sorted(self._durations.items()):
+            labels = [("resource", resource), ("action", action)]
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                bucket_labels = _format_labels([*labels, ("le", str(bound))])
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+
+def _format_labels(labels) -> str:
+    pairs = ",".join(f'{key}="{_escape_label(str(value))}"' for key, value in labels)
+    return "{" + pairs + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+class OpenTelemetryObserver:
+    """Records every API request as an OpenTelemetry span.
+
+    This requires the optional `opentelemetry-api` package
+    (`pip install argus-api-client[opentelemetry]`), and a configured
+    OpenTelemetry SDK for the spans to be exported anywhere.
+
+    :param tracer: The tracer to create spans with. Defaults to the tracer of this
+        module from the global tracer provider.
+    """
+
+    def __init__(self, tracer: Any = None):
+        if tracer is None:
+            from opentelemetry import trace
+
+            tracer = trace.get_tracer(__name__)
+        self.tracer = tracer
+
+    def request_finished(self, info: RequestInfo) -> None:
+        attributes = {
+            "http.request.method": info.method,
+            "url.full": info.url,
+            "argus.endpoint": info.endpoint,
+            "argus.decode_time": info.decode_time,
+            "http.request.body.size": info.request_bytes,
+            "http.response.body.size": info.response_bytes,
+        }
+        if info.status_code is not None:
+            attributes["http.response.status_code"] = info.status_code
+        start = int(info.started * 1e9)
+        span = self.tracer.start_span(
+            f"{info.method} {info.endpoint}", start_time=start, attributes=attributes
+        )
+        if info.error is not None:
+            span.record_exception(info.error)
+            span.set_attribute("error.type", type(info.error).__name__)
+        span.end(end_time=start + int((info.elapsed + info.decode_time) * 1e9))
+
+    def model_decoded(self, model: type, elapsed: float) -> None:
+        pass  # too fine-grained to be worth a span of its own
+
+
+class ObservedModel:
+    """Stands in for a model class, reporting the time spent by its `from_json()`
+    to an observer.
+    """
+
+    def __init__(self, model: type, observer: RequestObserver):
+        self.model = model
+        self.observer = observer
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.model.__name__}>"
+
+    def __getattr__(self, name: str):
+        return getattr(self.model, name)
+
+    def __call__(self, *args, **kwargs):
+        return self.model(*args, **kwargs)
+
+    def from_json(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.model.from_json(*args, **kwargs)
+        finally:
+            self.observer.model_decoded(self.model, time.perf_counter() - start)
+
+
+def observe_models(
+    model_set: models.ModelSet, observer: RequestObserver
+) -> models.ModelSet:
+    """Returns a model set whose incident, event and acknowledgement classes report
+    the time spent decoding records to an observer.
+
+    Source systems are decoded as part of incidents, so their class is left as is.
+    """
+    return model_set._replace(
+        incident=ObservedModel(model_set.incident, observer),
+        event=ObservedModel(model_set.event, observer),
+        acknowledgement=ObservedModel(model_set.acknowledgement, observer),
+    )
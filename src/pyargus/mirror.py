@@ -0,0 +1,347 @@
+"""Local, incrementally synchronized mirrors of the open incidents of an Argus server"""
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timedelta
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from simple_rest_client.exceptions import NotFoundError
+
+from . import models
+from .client import IncidentType, incident_pk
+from .time import now as utcnow
+
+if TYPE_CHECKING:
+    from .store import IncidentStore
+
+__all__ = [
+    "ADDED",
+    "UPDATED",
+    "CLOSED",
+    "IncidentChange",
+    "IncidentMirror",
+    "AsyncIncidentMirror",
+]
+
+# Kinds of incident changes
+ADDED = "added"
+UPDATED = "updated"
+CLOSED = "closed"
+
+DEFAULT_OVERLAP = timedelta(seconds=60)
+DEFAULT_FULL_SYNC_INTERVAL = timedelta(minutes=10)
+
+
+class IncidentChange(NamedTuple):
+    """Describes a change to the mirrored set of open incidents"""
+
+    kind: str
+    incident: models.Incident
+
+
+ChangeCallback = Callable[[IncidentChange], None]
+
+
+class _BaseMirror:
+    """Keeps the mirrored incidents and their bookkeeping, independently of how they
+    are fetched from the API.
+    """
+
+    def __init__(
+        self,
+        client,
+        overlap: timedelta = DEFAULT_OVERLAP,
+        store: Optional[IncidentStore] = None,
+        full_sync_interval: Optional[timedelta] = DEFAULT_FULL_SYNC_INTERVAL,
+        **filters,
+    ):
+        self.client = client
+        self.overlap = overlap
+        self.store = store
+        self.full_sync_interval = full_sync_interval
+        self.filters = filters
+        self.last_synced: Optional[datetime] = None
+        self.last_full_synced: Optional[datetime] = None
+        self._incidents: Dict[int, models.Incident] = {}
+        self._subscribers: List[ChangeCallback] = []
+        self._lock = threading.Lock()
+        if store is not None:
+            self._warm_up(store)
+
+    def _warm_up(self, store: IncidentStore):
+        """Loads the open incidents from a store, so that the next synchronization
+        only needs to fetch what has changed since the store was last synchronized.
+        """
+        self.last_synced = store.last_synced
+        # The store does not know when it was last fully synchronized, so the
+        # mirror is considered as fresh as its most recent synchronization
+        self.last_full_synced = store.last_synced
+        if self.last_synced is not None:
+            self._incidents = {
+                incident.pk: incident for incident in store.incidents(open=True)
+            }
+
+    def __len__(self) -> int:
+        return len(self._incidents)
+
+    def __iter__(self) -> Iterator[models.Incident]:
+        with self._lock:
+            return iter(list(self._incidents.values()))
+
+    def __contains__(self, incident: IncidentType) -> bool:
+        return incident_pk(incident) in self._incidents
+
+    def get(self, incident: IncidentType) -> Optional[models.Incident]:
+        """Returns the mirrored incident with the given primary key, if any"""
+        return self._incidents.get(incident_pk(incident))
+
+    def subscribe(self, callback: ChangeCallback) -> None:
+        """Registers a callback to be called with every IncidentChange that results
+        from a synchronization or a refresh.
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: ChangeCallback) -> None:
+        """Removes a previously subscribed callback"""
+        self._subscribers.remove(callback)
+
+    def _is_full_sync_due(self, started: datetime) -> bool:
+        if self.last_synced is None:
+            return True
+        return (
+            self.full_sync_interval is not None
+            and started - self.last_full_synced >= self.full_sync_interval
+        )
+
+    def _full_filters(self) -> dict:
+        return {**self.filters, "open": True}
+
+    def _delta_filters(self) -> Tuple[dict, dict]:
+        """Returns the filters for fetching incidents that have been opened and closed
+        since the last synchronization, respectively.
+
+        An incident that is reopened keeps its original start time, so the filters
+        miss it unless it started within the delta. Only a full synchronization
+        picks it up.
+        """
+        since = (self.last_synced - self.overlap).isoformat()
+        opened = {**self.filters, "open": True, "start_time__gte": since}
+        closed = {**self.filters, "open": False, "end_time__gte": since}
+        return opened, closed
+
+    def _apply(
+        self,
+        opened: Iterable[models.Incident],
+        closed: Iterable[models.Incident] = (),
+        full: bool = False,
+    ) -> List[IncidentChange]:
+        """Updates the mirror from lists of open and closed incidents, notifying
+        subscribers of the resulting changes.
+
+        :param full: If True, `opened` is the complete set of open incidents, and any
+            mirrored incident not in it is considered closed.
+        """
+        changes = []
+        with self._lock:
+            seen = set()
+            for incident in opened:
+                seen.add(incident.pk)
+                change = self._store(incident)
+                if change:
+                    changes.append(change)
+            if full:
+                for pk in set(self._incidents) - seen:
+                    changes.append(IncidentChange(CLOSED, self._incidents.pop(pk)))
+            for incident in closed:
+                if self._incidents.pop(incident.pk, None) is not None:
+                    changes.append(IncidentChange(CLOSED, incident))
+        self._persist(changes)
+        self._notify(changes)
+        return changes
+
+    def _apply_refreshed(
+        self, pk: int, incident: Optional[models.Incident]
+    ) -> Optional[IncidentChange]:
+        """Updates the mirror from a freshly retrieved incident, which is None if it
+        no longer exists.
+        """
+        with self._lock:
+            if incident is not None and incident.open:
+                change = self._store(incident)
+            else:
+                gone = self._incidents.pop(pk, None)
+                change = IncidentChange(CLOSED, incident or gone) if gone else None
+        if change:
+            self._persist([change])
+            self._notify([change])
+        return change
+
+    def _store(self, incident: models.Incident) -> Optional[IncidentChange]:
+        previous = self._incidents.get(incident.pk)
+        self._incidents[incident.pk] = incident
+        if previous is None:
+            return IncidentChange(ADDED, incident)
+        if previous != incident:
+            return IncidentChange(UPDATED, incident)
+        return None
+
+    def _synced(self, started: datetime, full: bool):
+        self.last_synced = started
+        if full:
+            self.last_full_synced = started
+        if self.store is not None:
+            self.store.last_synced = started
+
+    def _persist(self, changes: List[IncidentChange]):
+        """Writes changes through to the store, if any"""
+        if self.store is None or not changes:
+            return
+        # An incident that has merely left the mirrored set is not known to be
+        # closed, so its stored copy is dropped rather than kept as an open incident
+        dropped = {
+            change.incident.pk
+            for change in changes
+            if change.kind == CLOSED and change.incident.open
+        }
+        self.store.put_incidents(
+            change.incident for change in changes if change.incident.pk not in dropped
+        )
+        self.store.delete_incidents(dropped)
+
+    def _notify(self, changes: List[IncidentChange]):
+        for change in changes:
+            for callback in list(self._subscribers):
+                callback(change)
+
+
+class IncidentMirror(_BaseMirror):
+    """An in-memory mirror of the open incidents of an Argus server.
+
+    The first synchronization fetches all open incidents. Subsequent
+    synchronizations only fetch the incidents that have been opened or closed
+    since the previous one, using the `start_time__gte` and `end_time__gte`
+    filters, which turns a full listing into a small delta.
+
+    Changes to an incident that is already open (such as being acknowledged or
+    changing level) cannot be detected by these filters, and neither can closed
+    incidents that are reopened, as they keep their original start time. To pick
+    up such changes, `sync()` fetches all open incidents every `full_sync_interval`
+    (ten minutes by default). Call `refresh()` for incidents that are known to
+    have changed, to pick up their changes sooner.
+
+    Example:
+
+        >>> mirror = IncidentMirror(client, source__id__in=3)
+        >>> mirror.subscribe(print)
+        >>> while True:
+        ...     mirror.sync()
+        ...     time.sleep(30)
+
+    :param client: The Client to fetch incidents through.
+    :param overlap: How far back in time, relative to the previous synchronization,
+        a delta synchronization looks for changes. This must cover the maximum clock
+        skew between client and server, and how far back in time a source may
+        timestamp the start of a newly posted incident.
+    :param store: An optional IncidentStore that the mirror is persisted to. The
+        mirror is warmed up from the store, so that the first synchronization after
+        a restart only fetches the delta since the store was last synchronized. A
+        store should only ever be used by mirrors with the same filters.
+    :param full_sync_interval: How often `sync()` fetches all open incidents rather
+        than just the delta. If None, it only does so on the first synchronization,
+        and changes to incidents that are already open go unnoticed.
+    :param filters: Extra filters that restrict which open incidents are mirrored.
+    """
+
+    def sync(self, full: bool = False) -> List[IncidentChange]:
+        """Synchronizes the mirror with the Argus server.
+
+        :param full: If True, all open incidents are fetched, rather than just the
+            delta since the previous synchronization. This is also done when a full
+            synchronization is due, according to `full_sync_interval`.
+        :returns: The changes made to the mirror
+        """
+        started = utcnow()
+        full = full or self._is_full_sync_due(started)
+        if full:
+            opened = list(self.client.get_incidents(**self._full_filters()))
+            changes = self._apply(opened, full=True)
+        else:
+            opened_filters, closed_filters = self._delta_filters()
+            opened = list(self.client.get_incidents(**opened_filters))
+            closed = list(self.client.get_incidents(**closed_filters))
+            changes = self._apply(opened, closed)
+        self._synced(started, full)
+        return changes
+
+    def refresh(self, *incidents: IncidentType) -> List[IncidentChange]:
+        """Re-fetches individual incidents from the Argus server.
+
+        :returns: The changes made to the mirror
+        """
+        changes = []
+        for incident in incidents:
+            pk = incident_pk(incident)
+            try:
+                fetched = self.client.get_incident(pk)
+            except NotFoundError:
+                fetched = None
+            change = self._apply_refreshed(pk, fetched)
+            if change:
+                changes.append(change)
+        return changes
+
+
+class AsyncIncidentMirror(_BaseMirror):
+    """Async version of `IncidentMirror`, for use with an AsyncClient"""
+
+    async def sync(self, full: bool = False) -> List[IncidentChange]:
+        """Synchronizes the mirror with the Argus server.
+
+        :param full: If True, all open incidents are fetched, rather than just the
+            delta since the previous synchronization. This is also done when a full
+            synchronization is due, according to `full_sync_interval`.
+        :returns: The changes made to the mirror
+        """
+        started = utcnow()
+        full = full or self._is_full_sync_due(started)
+        if full:
+            opened = await self._fetch(self._full_filters())
+            changes = self._apply(opened, full=True)
+        else:
+            opened_filters, closed_filters = self._delta_filters()
+            opened = await self._fetch(opened_filters)
+            closed = await self._fetch(closed_filters)
+            changes = self._apply(opened, closed)
+        self._synced(started, full)
+        return changes
+
+    async def refresh(self, *incidents: IncidentType) -> List[IncidentChange]:
+        """Re-fetches individual incidents from the Argus server.
+
+        :returns: The changes made to the mirror
+        """
+        changes = []
+        for incident in incidents:
+            pk = incident_pk(incident)
+            try:
+                fetched = await self.client.get_incident(pk)
+            except NotFoundError:
+                fetched = None
+            change = self._apply_refreshed(pk, fetched)
+            if change:
+                changes.append(change)
+        return changes
+
+    async def _fetch(self, filters: dict) -> List[models.Incident]:
+        return [incident async for incident in self.client.get_incidents(**filters)]
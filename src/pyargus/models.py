@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+import dataclasses
 import inspect
+import threading
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional
 
-from iso8601 import parse_date
-
-from .time import LOCAL_INFINITY
+from .time import LOCAL_INFINITY, parse_timestamp
 
 
 # STATELESS is a sentinel used as an `end_time` value to explicitly indicate that an
@@ -33,9 +35,71 @@ class SourceSystem:
     @classmethod
     def from_json(cls, data: dict) -> SourceSystem:
         """Returns a SourceSystem object initalized from an Argus JSON dict"""
-        kwargs = data.copy()
-        kwargs["type"] = kwargs["type"]["name"]
-        return cls(**kwargs)
+        return cls(**_compile_decoder(cls)(data))
+
+    @classmethod
+    def _json_field_decoders(cls) -> Dict[str, Callable[[Any], Any]]:
+        return {"type": _decode_source_type}
+
+
+class SourceRegistry:
+    """Interns the SourceSystem objects decoded from Argus JSON dicts.
+
+    A typical incident listing refers to only a handful of distinct source systems.
+    Passing a registry to `Incident.from_json()` makes every incident from the same
+    source share a single SourceSystem object, which saves allocations and memory,
+    and makes `incident.source is other.source` a cheap way to compare sources.
+
+    Sources are keyed by their primary key. A source whose JSON description has
+    changed since it was first seen is decoded anew, so the registry never hands
+    out stale source descriptions.
+
+    A registry can be shared by any number of threads.
+    """
+
+    def __init__(self, source_class: type = SourceSystem):
+        self.source_class = source_class
+        self._sources = {}
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def from_json(self, data: dict) -> SourceSystem:
+        """Returns the registered SourceSystem object described by an Argus JSON
+        dict, decoding and registering it first if necessary.
+        """
+        entry = self._sources.get(data["pk"])
+        if entry is not None and entry[0] == data:
+            return entry[1]
+        source = self.source_class.from_json(data)
+        with self._lock:
+            previous = self._sources.get(source.pk)
+            if (
+                previous is not None
+                and self._names.get(previous[1].name) is previous[1]
+            ):
+                # The source may have been renamed
+                del self._names[previous[1].name]
+            self._sources[source.pk] = (data.copy(), source)
+            self._names[source.name] = source
+        return source
+
+    def get(self, pk: int) -> Optional[SourceSystem]:
+        """Returns the registered source system with the given primary key, if any"""
+        entry = self._sources.get(pk)
+        return entry[1] if entry else None
+
+    def by_name(self, name: str) -> Optional[SourceSystem]:
+        """Returns the registered source system with the given name, if any"""
+        return self._names.get(name)
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def __iter__(self) -> Iterator[SourceSystem]:
+        return (source for _data, source in list(self._sources.values()))
+
+    def __contains__(self, pk: int) -> bool:
+        return pk in self._sources
 
 
 @dataclass
@@ -58,32 +122,28 @@ class Incident:
     metadata: dict = None
 
     @classmethod
-    def from_json(cls, data: dict) -> Incident:
-        """Returns an Incident object initalized from an Argus JSON dict"""
-        kwargs = data.copy()
-        if kwargs["start_time"]:
-            kwargs["start_time"] = parse_date(kwargs["start_time"])
-        if kwargs["end_time"]:
-            kwargs["end_time"] = (
-                parse_date(kwargs["end_time"])
-                if kwargs["end_time"] != "infinity"
-                else LOCAL_INFINITY
-            )
-        else:
-            kwargs["end_time"] = STATELESS
-        kwargs["source"] = SourceSystem.from_json(kwargs["source"])
-
-        tags = [tag["tag"] for tag in kwargs["tags"]]
-        tags = dict(tag.split("=", maxsplit=1) for tag in tags)
-        kwargs["tags"] = tags
-
-        return cls(
-            **{
-                key: value
-                for key, value in kwargs.items()
-                if key in inspect.signature(cls).parameters
-            }
-        )
+    def from_json(
+        cls, data: dict, sources: Optional[SourceRegistry] = None
+    ) -> Incident:
+        """Returns an Incident object initalized from an Argus JSON dict
+
+        :param sources: An optional registry of previously decoded source systems.
+            If given, the incident's source is looked up in (or added to) the
+            registry, so that incidents from the same source share a single
+            SourceSystem object.
+        """
+        if sources is None:
+            return cls(**_compile_decoder(cls)(data))
+        return cls(**_compile_decoder(cls)(data, source=sources.from_json))
+
+    @classmethod
+    def _json_field_decoders(cls) -> Dict[str, Callable[[Any], Any]]:
+        return {
+            "start_time": _decode_timestamp,
+            "end_time": _decode_end_time,
+            "source": SourceSystem.from_json,
+            "tags": _decode_tags,
+        }
 
     def to_json(self) -> dict:
         """Despite the name, this serializes this object into a dict that is suitable
@@ -125,14 +185,16 @@ class Event:
     @classmethod
     def from_json(cls, data: dict) -> Event:
         """Returns an Event object initalized from an Argus JSON dict"""
-        kwargs = data.copy()
-        kwargs["actor"] = kwargs.get("actor", {}).get("username")
-        if kwargs["received"]:
-            kwargs["received"] = parse_date(kwargs["received"])
-        if kwargs["timestamp"]:
-            kwargs["timestamp"] = parse_date(kwargs["timestamp"])
-        kwargs["type"] = kwargs["type"]["value"]
-        return cls(**kwargs)
+        return cls(**_compile_decoder(cls)(data))
+
+    @classmethod
+    def _json_field_decoders(cls) -> Dict[str, Callable[[Any], Any]]:
+        return {
+            "actor": _decode_actor,
+            "received": _decode_timestamp,
+            "timestamp": _decode_timestamp,
+            "type": _decode_event_type,
+        }
 
     def to_json(self) -> dict:
         """Despite the name, this serializes this object into a dict that is suitable
@@ -163,14 +225,11 @@ class Acknowledgement:
     @classmethod
     def from_json(cls, data: dict) -> Acknowledgement:
         """Returns an Acknowledgement object initalized from an Argus JSON dict"""
-        kwargs = {
-            "pk": data["pk"],
-            "event": Event.from_json(data["event"]),
-            "expiration": parse_date(data["expiration"])
-            if data["expiration"]
-            else None,
-        }
-        return cls(**kwargs)
+        return cls(**_compile_decoder(cls)(data))
+
+    @classmethod
+    def _json_field_decoders(cls) -> Dict[str, Callable[[Any], Any]]:
+        return {"event": Event.from_json, "expiration": _decode_expiration}
 
 
 @dataclass
@@ -178,12 +237,276 @@ class ExpiringToken:
     """Class for describing the authentication token"""
 
     expiration: datetime
-    token: int
+    token: str
 
     @classmethod
     def from_json(cls, data: dict) -> ExpiringToken:
         kwargs = {
-            "expiration": parse_date(data["expiration"]),
-            "token": parse_date(data["token"]),
+            "expiration": parse_timestamp(data["expiration"]),
+            "token": data["token"],
         }
         return cls(**kwargs)
+
+
+@lru_cache(maxsize=None)
+def _compile_decoder(cls: type) -> Callable[[dict], dict]:
+    """Compiles a function that converts an Argus JSON dict into keyword arguments
+    for the constructor of a model class.
+
+    Attributes that are not accepted by the constructor are dropped, so that new
+    attributes introduced by the Argus API do not break deserialization, while the
+    values of attributes listed by the class' `_json_field_decoders()` are converted
+    by their decoder. Decoders for individual attributes can be overridden per call
+    by passing them as keyword arguments to the compiled function. Compiled decoders
+    are cached per class, so that the class signature is only inspected once.
+    """
+    parameters = frozenset(inspect.signature(cls).parameters)
+    decoders = cls._json_field_decoders()
+
+    def decode(data: dict, **overrides: Callable[[Any], Any]) -> dict:
+        field_decoders = {**decoders, **overrides} if overrides else decoders
+        return {
+            key: field_decoders[key](value) if key in field_decoders else value
+            for key, value in data.items()
+            if key in parameters
+        }
+
+    return decode
+
+
+def _decode_timestamp(value: str):
+    return parse_timestamp(value) if value else value
+
+
+def _decode_end_time(value: str):
+    if not value:
+        return STATELESS
+    return parse_timestamp(value) if value != "infinity" else LOCAL_INFINITY
+
+
+def _decode_expiration(value: str):
+    return parse_timestamp(value) if value else None
+
+
+def _decode_tags(value: list) -> dict:
+    return dict(tag["tag"].split("=", maxsplit=1) for tag in value)
+
+
+def _decode_source_type(value: dict) -> str:
+    return value["name"]
+
+
+def _decode_actor(value: dict) -> str:
+    return value.get("username")
+
+
+def _decode_event_type(value: dict) -> str:
+    return value["value"]
+
+
+def _compact_variant(cls: type, **field_decoders) -> type:
+    """Creates a compact variant of a model class.
+
+    The variant has the same attributes and the same `from_json()`/`to_json()`
+    contract as the original, but stores its attributes in `__slots__` rather than
+    in a per-instance `__dict__`, which considerably reduces the memory footprint
+    of each instance. Any `field_decoders` given override the decoders of the
+    original class, so that nested models can be decoded into compact variants too.
+    """
+    name = "Compact" + cls.__name__
+    decoders = {**cls._json_field_decoders(), **field_decoders}
+    namespace = {
+        "__doc__": f"Compact, slotted variant of {cls.__name__}",
+        "__module__": cls.__module__,
+        "from_json": cls.__dict__["from_json"],
+        "_json_field_decoders": classmethod(lambda cls: decoders),
+    }
+    if "to_json" in cls.__dict__:
+        namespace["to_json"] = cls.__dict__["to_json"]
+    compact = dataclasses.make_dataclass(
+        name,
+        [
+            (f.name, f.type, dataclasses.field(default=f.default))
+            for f in dataclasses.fields(cls)
+        ],
+        namespace=namespace,
+    )
+    return _add_slots(compact)
+
+
+def _add_slots(cls: type) -> type:
+    """Recreates a dataclass with `__slots__` for all its fields.
+
+    This is what `@dataclass(slots=True)` does on Python 3.10 and newer. Slots cannot
+    coexist with class attributes of the same name, so the field defaults are
+    removed from the class namespace; they are already part of the generated
+    `__init__()` method.
+    """
+    field_names = tuple(f.name for f in dataclasses.fields(cls))
+    namespace = dict(cls.__dict__)
+    namespace["__slots__"] = field_names
+    for name in field_names:
+        namespace.pop(name, None)
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+CompactSourceSystem = _compact_variant(SourceSystem)
+CompactEvent = _compact_variant(Event)
+CompactIncident = _compact_variant(Incident, source=CompactSourceSystem.from_json)
+CompactAcknowledgement = _compact_variant(Acknowledgement, event=CompactEvent.from_json)
+
+
+# Marks an attribute of a lazy model that has yet to be decoded
+_UNDECODED = object()
+
+
+class LazyIncident:
+    """A view of an Argus incident JSON dict that decodes each attribute on first
+    access, rather than all of them up front like `Incident.from_json()`.
+
+    Parsing timestamps, splitting tags and decoding source systems makes up most of
+    the cost of decoding an incident. Consumers that only look at a few attributes
+    of each incident, like `pk`, `level` and `open`, can skip most of that work by
+    listing lazy incidents instead, e.g. using `IncidentQuery(lazy=True)`.
+
+    Lazy incidents have the same attributes, with the same values, as an Incident
+    decoded from the same dict, and the same `to_json()` output. Attributes can be
+    assigned to, and a lazy incident compares equal to any incident model object
+    (like an Incident or a CompactIncident) with the same attribute values. Use
+    `to_incident()` to decode all of it into a model object.
+    """
+
+    __slots__ = ("_data", "_decode_source") + tuple(
+        "_" + field.name for field in dataclasses.fields(Incident)
+    )
+
+    def __init__(
+        self,
+        data: dict,
+        sources: Optional[SourceRegistry] = None,
+        source_class: type = SourceSystem,
+    ):
+        self._data = data
+        self._decode_source = (
+            source_class.from_json if sources is None else sources.from_json
+        )
+
+    @classmethod
+    def from_json(
+        cls,
+        data: dict,
+        sources: Optional[SourceRegistry] = None,
+        source_class: type = SourceSystem,
+    ) -> LazyIncident:
+        """Returns a LazyIncident viewing an Argus JSON dict, which must not be
+        changed afterwards.
+
+        :param sources: An optional registry of previously decoded source systems,
+            in which the incident's source is looked up (or added to) once it is
+            accessed.
+        :param source_class: The class to decode the incident's source into, if no
+            registry is given, like `CompactSourceSystem`.
+        """
+        return cls(data, sources, source_class)
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={value!r}" for name, value in self._items())
+        return f"{self.__class__.__name__}({values})"
+
+    def __eq__(self, other):
+        if not isinstance(other, LazyIncident) and not _is_incident_model(other):
+            return NotImplemented
+        return all(
+            _equal_values(getattr(other, name), value) for name, value in self._items()
+        )
+
+    __hash__ = None  # mutable, like Incident
+
+    def _items(self) -> Iterator[tuple]:
+        return ((name, getattr(self, name)) for name in Incident.__dataclass_fields__)
+
+    def to_incident(self, model: type = Incident) -> Incident:
+        """Returns an Incident object (or an object of another incident model class)
+        with all the attributes of this incident.
+        """
+        return model(**dict(self._items()))
+
+    def to_json(self) -> dict:
+        """Despite the name, this serializes this object into a dict that is suitable
+        for feeding to the stdlib JSON serializer, just like `Incident.to_json()`.
+        """
+        return self.to_incident().to_json()
+
+
+def _lazy_attribute(name: str, decode: Optional[Callable[[Any], Any]]) -> property:
+    """Returns a property that decodes an attribute of a LazyIncident on first
+    access, caching the result in the attribute's slot.
+    """
+    slot = "_" + name
+
+    def get(self):
+        value = getattr(self, slot, _UNDECODED)
+        if value is _UNDECODED:
+            value = self._data.get(name)
+            if decode is not None and name in self._data:
+                if name == "source":
+                    value = self._decode_source(value)
+                else:
+                    value = decode(value)
+            setattr(self, slot, value)
+        return value
+
+    def set(self, value):
+        setattr(self, slot, value)
+
+    return property(get, set)
+
+
+def _is_incident_model(value: Any) -> bool:
+    """Returns True if a value is an instance of an incident model class, i.e. of
+    Incident or any of its variants.
+    """
+    fields = getattr(type(value), "__dataclass_fields__", None)
+    return fields is not None and fields.keys() == Incident.__dataclass_fields__.keys()
+
+
+def _equal_values(first: Any, second: Any) -> bool:
+    """Compares attribute values of incidents, comparing the model objects they
+    contain, like sources, by their attribute values, regardless of their variant.
+    """
+    first_fields = getattr(type(first), "__dataclass_fields__", None)
+    second_fields = getattr(type(second), "__dataclass_fields__", None)
+    if first_fields is None or second_fields is None:
+        return first == second
+    return first_fields.keys() == second_fields.keys() and all(
+        getattr(first, name) == getattr(second, name) for name in first_fields
+    )
+
+
+for _field in dataclasses.fields(Incident):
+    setattr(
+        LazyIncident,
+        _field.name,
+        _lazy_attribute(_field.name, Incident._json_field_decoders().get(_field.name)),
+    )
+del _field
+
+
+class ModelSet(NamedTuple):
+    """The set of model classes that a client decodes API responses into"""
+
+    source_system: type
+    incident: type
+    event: type
+    acknowledgement: type
+
+
+DEFAULT_MODELS = ModelSet(SourceSystem, Incident, Event, Acknowledgement)
+"""Decodes API responses into the regular model dataclasses"""
+COMPACT_MODELS = ModelSet(
+    CompactSourceSystem, CompactIncident, CompactEvent, CompactAcknowledgement
+)
+"""Decodes API responses into compact, slotted model variants, which need far less
+memory when large numbers of incidents and events are kept around."""
@@ -0,0 +1,213 @@
+"""Pools of clients that share a single API connection between many tokens"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from simple_rest_client.api import API
+from simple_rest_client.resource import BaseResource
+
+from . import api, async_api, models
+from .async_client import AsyncClient
+from .client import Client
+from .codec import JSONCodec
+from .instrumentation import RequestObserver, observe_models
+from .ratelimit import RateLimiter
+from .resilience import CircuitBreaker, RetryPolicy
+
+__all__ = ["ClientPool", "AsyncClientPool"]
+
+
+class TokenAPI:
+    """A view of a shared simple_rest_client API object that authenticates all its
+    requests using a token of its own.
+
+    Its resources are views of the shared resources that add the Authorization
+    header of this view to every request. As with a regular API object, the token
+    can be replaced by assigning to `headers["Authorization"]`, e.g. by a
+    `tokens.TokenManager`.
+
+    The connections of the shared API object belong to the pool, so closing this
+    view leaves them open.
+    """
+
+    def __init__(self, shared_api: API, token: str):
+        self.shared_api = shared_api
+        self.headers = {"Authorization": "Token " + token}
+        self._resources: Dict[str, TokenResource] = {}
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.shared_api.api_root_url!r}>"
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.shared_api, name)
+        if not isinstance(attribute, BaseResource):
+            return attribute
+        resource = self._resources.get(name)
+        if resource is None:
+            resource = self._resources[name] = TokenResource(attribute, self.headers)
+        return resource
+
+    def close_client(self) -> None:
+        """Does nothing, as the connections belong to the pool"""
+
+    async def aclose_client(self) -> None:
+        """Does nothing, as the connections belong to the pool"""
+
+
+class TokenResource:
+    """A view of a shared resource that adds `authorization` headers to every
+    request made through it.
+    """
+
+    def __init__(self, resource: BaseResource, authorization: Dict[str, str]):
+        self.resource = resource
+        self.authorization = authorization
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.resource.resource_name!r}>"
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """The headers of requests made through this view"""
+        return {**self.resource.headers, **self.authorization}
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.resource, name)
+        if name in self.resource.actions:
+            return self._authorize(attribute)
+        return attribute
+
+    def _authorize(self, action: Callable) -> Callable:
+        # The live authorization headers are passed along as well, so that requests
+        # rejected after a token swap can be retried with the new token
+        def authorized_action(*args, headers=None, **kwargs):
+            return action(
+                *args,
+                headers={**(headers or {}), **self.authorization},
+                authorization=self.authorization,
+                **kwargs,
+            )
+
+        return authorized_action
+
+
+class _BaseClientPool:
+    """The bookkeeping shared by the sync and async client pools"""
+
+    client_class: type
+    connect: Callable[..., API]
+
+    def __init__(
+        self,
+        api_root_url: str,
+        timeout: float = 2.0,
+        transport: Optional[api.TransportConfig] = None,
+        json_codec: Optional[JSONCodec] = None,
+        model_set: models.ModelSet = models.DEFAULT_MODELS,
+        source_registry: Optional[models.SourceRegistry] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        observer: Optional[RequestObserver] = None,
+    ):
+        self.api = self.connect(
+            api_root_url,
+            "",
+            timeout,
+            transport,
+            json_codec,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            rate_limiter=rate_limiter,
+            observer=observer,
+        )
+        # All resources share the headers of the API object, and every request
+        # carries the Authorization header of the client making it instead
+        del self.api.headers["Authorization"]
+        if observer is not None:
+            model_set = observe_models(model_set, observer)
+        self.model_set = model_set
+        self.source_registry = source_registry
+        self.transport = transport
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__} {self.api.api_root_url!r} clients={len(self)}>"
+        )
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._clients
+
+    def client(self, token: str):
+        """Returns the client of a token, creating it on first use"""
+        with self._lock:
+            client = self._clients.get(token)
+            if client is None:
+                client = self._clients[token] = self._make_client(token)
+            return client
+
+    __getitem__ = client
+
+    def discard(self, token: str) -> None:
+        """Forgets the client of a token"""
+        with self._lock:
+            self._clients.pop(token, None)
+
+    def _make_client(self, token: str):
+        return self.client_class.from_api(
+            TokenAPI(self.api, token),
+            model_set=self.model_set,
+            source_registry=self.source_registry,
+        )
+
+
+class ClientPool(_BaseClientPool):
+    """Hands out Clients for any number of tokens, all sharing a single API object,
+    and therefore a single set of connections to the Argus server.
+
+    Applications that talk to Argus on behalf of many source systems would
+    otherwise need a separate Client, with connection pools of its own, for the
+    token of every source system. The Clients of a pool are lightweight views of
+    the pool's API object, which send the Authorization header of their own token
+    with every request. They have the full `Client` API.
+
+    The retry policy, circuit breaker, rate limiter and observer, if any, apply to
+    the requests of all the pool's clients.
+
+    Example:
+
+        >>> pool = ClientPool("https://argus.example.org/api/v2", transport=transport)
+        >>> for token in tokens:
+        ...     pool.client(token).send_heartbeat()
+
+    The parameters are those of `Client`, except for the token.
+    """
+
+    client_class = Client
+    connect = staticmethod(api.connect)
+
+    def close(self) -> None:
+        """Closes the connections of the pool, unless they belong to a transport,
+        which must be closed by its owner.
+        """
+        if self.transport is None:
+            self.api.close_client()
+
+
+class AsyncClientPool(_BaseClientPool):
+    """Async version of `ClientPool`, which hands out AsyncClients"""
+
+    client_class = AsyncClient
+    connect = staticmethod(async_api.async_connect)
+
+    async def aclose(self) -> None:
+        """Async version of `ClientPool.close()`"""
+        if self.transport is None:
+            await self.api.aclose_client()
@@ -0,0 +1,728 @@
+"""Write-behind publishing of incidents and events to Argus"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from simple_rest_client.exceptions import ClientConnectionError, ServerError
+
+from . import models
+from .client import IncidentType, incident_pk
+from .time import now as utcnow
+from .time import parse_timestamp
+
+__all__ = [
+    "BLOCK",
+    "DROP",
+    "SPILL",
+    "PublisherMetrics",
+    "EventPublisher",
+    "AsyncEventPublisher",
+]
+
+logger = logging.getLogger(__name__)
+
+# Overflow policies
+BLOCK = "block"
+DROP = "drop"
+SPILL = "spill"
+
+# Errors that may well go away if a request is retried
+RETRYABLE_ERRORS = (ClientConnectionError, ServerError)
+
+ErrorCallback = Callable[[Any, Exception], None]
+
+
+@dataclass(frozen=True)
+class PublisherMetrics:
+    """A snapshot of the state of a publisher"""
+
+    queued: int
+    """Number of items waiting in the in-memory queue"""
+    spilled: int
+    """Number of items waiting in the spill file"""
+    submitted: int
+    """Number of items submitted to the publisher"""
+    published: int
+    """Number of items successfully published to Argus"""
+    failed: int
+    """Number of items that could not be published, even after retrying"""
+    dropped: int
+    """Number of items dropped because the queue was full"""
+    retried: int
+    """Number of retried publishing attempts"""
+
+
+class _Job(NamedTuple):
+    """An item to publish: either an Incident to post, or an (incident pk, Event)
+    pair to post
+    """
+
+    incident: Any
+    event: Optional[models.Event] = None
+
+    @property
+    def item(self) -> Any:
+        """The item as submitted"""
+        return self.incident if self.event is None else (self.incident, self.event)
+
+    def to_json(self) -> dict:
+        if self.event is None:
+            return {"incident": self.incident.to_json()}
+        timestamp = self.event.timestamp
+        return {
+            "incident": self.incident,
+            "event": {
+                "description": self.event.description,
+                "timestamp": timestamp.isoformat() if timestamp else None,
+                "type": self.event.type,
+            },
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> _Job:
+        if "event" not in data:
+            return cls(models.Incident.from_json(data["incident"]))
+        event = data["event"]
+        timestamp = event["timestamp"]
+        return cls(
+            data["incident"],
+            models.Event(
+                description=event["description"],
+                timestamp=parse_timestamp(timestamp) if timestamp else None,
+                type=event["type"],
+            ),
+        )
+
+
+class _SpillFile:
+    """A first-in, first-out queue of jobs in an append-only JSON lines file.
+
+    Jobs are appended to the end of the file and taken from the start of it by
+    advancing a read offset, which is kept in a companion ".offset" file, so that
+    neither adding nor taking jobs rewrites the file. The file is emptied whenever
+    it has been read to the end.
+
+    Jobs left in the file when a publisher is stopped are picked up again by the
+    next publisher that uses the same file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offset_path = path + ".offset"
+        self._lock = threading.Lock()
+        self._offset = self._load_offset()
+        self._count = len(self._read_remaining())
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, job: _Job) -> None:
+        line = json.dumps(job.to_json()) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as spill:
+            spill.write(line)
+            self._count += 1
+
+    def take(self, count: int) -> List[_Job]:
+        """Removes and returns up to `count` jobs from the start of the file"""
+        with self._lock:
+            if not self._count or count < 1:
+                return []
+            lines = []
+            with open(self.path, "rb") as spill:
+                spill.seek(self._offset)
+                while len(lines) < count:
+                    line = spill.readline()
+                    if not line:
+                        break
+                    if line.strip():
+                        lines.append(line)
+                offset = spill.tell()
+                at_end = not spill.read(1)
+            if at_end:
+                self._truncate()
+            else:
+                self._count -= len(lines)
+                self._save_offset(offset)
+        return self._decode(lines)
+
+    def prepend(self, jobs: List[_Job]) -> None:
+        """Puts jobs back at the start of the file, ahead of any other jobs.
+
+        This rewrites the file, and is only meant for when a publisher is closed.
+        """
+        if not jobs:
+            return
+        with self._lock:
+            lines = [(json.dumps(job.to_json()) + "\n").encode() for job in jobs]
+            lines += self._read_remaining()
+            with open(self.path + ".tmp", "wb") as spill:
+                spill.writelines(lines)
+            os.replace(self.path + ".tmp", self.path)
+            self._count = len(lines)
+            self._save_offset(0)
+
+    def _truncate(self):
+        open(self.path, "wb").close()
+        self._count = 0
+        self._save_offset(0)
+
+    def _load_offset(self) -> int:
+        try:
+            with open(self._offset_path, encoding="ascii") as file:
+                offset = int(file.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+        # An offset beyond the end belongs to an earlier incarnation of the file
+        return offset if offset <= size else 0
+
+    def _save_offset(self, offset: int):
+        self._offset = offset
+        with open(self._offset_path + ".tmp", "w", encoding="ascii") as file:
+            file.write(str(offset))
+        os.replace(self._offset_path + ".tmp", self._offset_path)
+
+    def _read_remaining(self) -> List[bytes]:
+        try:
+            with open(self.path, "rb") as spill:
+                spill.seek(self._offset)
+                return [line for line in spill if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _decode(self, lines: List[bytes]) -> List[_Job]:
+        jobs = []
+        for line in lines:
+            try:
+                jobs.append(_Job.from_json(json.loads(line)))
+            except (ValueError, KeyError, TypeError) as error:
+                logger.error("dropping corrupt line from %s: %s", self.path, error)
+        return jobs
+
+
+class _BasePublisher:
+    """The bookkeeping shared by the sync and async publishers"""
+
+    def __init__(
+        self,
+        client,
+        workers: int = 4,
+        maxsize: int = 1000,
+        overflow: str = BLOCK,
+        block_timeout: Optional[float] = None,
+        spill_path: Optional[str] = None,
+        retries: int = 3,
+        backoff: float = 0.5,
+        on_error: Optional[ErrorCallback] = None,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        if overflow not in (BLOCK, DROP, SPILL):
+            raise ValueError(f"Unknown overflow policy {overflow!r}")
+        if overflow == SPILL and not spill_path:
+            raise ValueError("The spill overflow policy requires a spill_path")
+        self.client = client
+        self.workers = workers
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.on_error = on_error
+        self._spill = _SpillFile(spill_path) if spill_path else None
+        self._counters = dict.fromkeys(
+            ("submitted", "published", "failed", "dropped", "retried"), 0
+        )
+        self._counter_lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def metrics(self) -> PublisherMetrics:
+        """Returns a snapshot of the queue depths and counters of the publisher"""
+        with self._counter_lock:
+            return PublisherMetrics(
+                queued=self._queue.qsize() if self._queue is not None else 0,
+                spilled=len(self._spill) if self._spill is not None else 0,
+                **self._counters,
+            )
+
+    def _count(self, counter: str, increment: int = 1):
+        with self._counter_lock:
+            self._counters[counter] += increment
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError("publisher is closed")
+
+    @staticmethod
+    def _resolve_job(
+        incident: IncidentType,
+        description: Optional[str],
+        timestamp: Optional[datetime],
+    ) -> _Job:
+        # The time of resolution is noted when it is submitted, not when published
+        event = models.Event(
+            description=description, timestamp=timestamp or utcnow(), type="END"
+        )
+        return _Job(incident_pk(incident), event)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        return self.backoff * 2**attempt
+
+    def _put_aside(self, jobs: List[_Job]):
+        """Saves unpublished jobs in the spill file, ahead of the jobs already in it,
+        or drops them if there is no spill file.
+        """
+        if self._spill is not None:
+            self._spill.prepend(jobs)
+        else:
+            self._count("dropped", len(jobs))
+
+    def _failed(self, job: _Job, error: Exception):
+        self._count("failed")
+        logger.warning("could not publish %r: %s", job.item, error)
+        if self.on_error is not None:
+            try:
+                self.on_error(job.item, error)
+            except Exception:
+                logger.exception("on_error callback failed for %r", job.item)
+
+    def _safe_refill(self):
+        """Refills the queue from the spill file, logging rather than raising any
+        error, so that a bad spill file cannot take down a worker.
+        """
+        try:
+            self._refill()
+        except Exception:
+            logger.exception("could not move spilled items back into the queue")
+
+
+class EventPublisher(_BasePublisher):
+    """Publishes incidents and events to Argus in the background, so that slow Argus
+    responses do not stall the code that produces them.
+
+    Submitted items are put in a bounded queue, which is drained by a pool of
+    worker threads. Publishing attempts that fail with a server or connection
+    error are retried with exponential backoff. Items that still cannot be
+    published are counted as failed and passed to the `on_error` callback.
+
+    When the queue is full, the `overflow` policy decides what happens to newly
+    submitted items:
+
+    - BLOCK: wait for room in the queue, for at most `block_timeout` seconds (or
+      forever), after which the item is dropped.
+    - DROP: drop the item immediately.
+    - SPILL: append the item to the JSON lines file at `spill_path`, from where it
+      is moved back into the queue as room becomes available. Items left in the
+      spill file when the publisher is closed are picked up by the next publisher
+      that uses the same file.
+
+    Example:
+
+        >>> with EventPublisher(client, workers=4, overflow=DROP) as publisher:
+        ...     publisher.resolve_incident(incident)
+        ...     print(publisher.metrics)
+
+    Note that a retried post of an incident may end up posting it twice, if the
+    server received the first attempt but failed to respond.
+
+    :param client: The Client to publish through.
+    :param workers: The number of worker threads, i.e. the number of concurrent
+        requests to Argus.
+    :param maxsize: The maximum number of items in the in-memory queue.
+    :param retries: The maximum number of times to retry publishing an item.
+    :param backoff: The number of seconds to wait before the first retry. The wait
+        is doubled for every subsequent retry.
+    :param on_error: Called with the submitted item and the exception, for every
+        item that could not be published.
+    """
+
+    def __init__(self, client, *args, **kwargs):
+        super().__init__(client, *args, **kwargs)
+        self._queue = queue.Queue(maxsize=self.maxsize)
+        # Guards the decision whether to queue or spill an item, but no file I/O
+        self._submit_lock = threading.Lock()
+        self._refill_lock = threading.Lock()
+        self._spilling = bool(self._spill and len(self._spill))
+        self._spills_in_progress = 0
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def __enter__(self) -> EventPublisher:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self) -> None:
+        """Starts the worker threads"""
+        self._check_open()
+        if self._threads:
+            return
+        self._refill()
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"pyargus-publisher-{number}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Publishes all queued items, then stops the worker threads.
+
+        :param timeout: The maximum number of seconds to wait for queued items to be
+            published. Items not yet published by then are moved to the spill file,
+            if there is one, or dropped otherwise.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.flush(timeout)
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._evacuate()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until all submitted items have been published (or have failed).
+
+        :returns: True if everything was published within `timeout` seconds
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks or (self._spill and len(self._spill)):
+            if not any(thread.is_alive() for thread in self._threads):
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def post_incident(self, incident: models.Incident) -> bool:
+        """Submits a new Incident to be posted to Argus.
+
+        :returns: False if the incident was dropped due to a full queue
+        """
+        return self._submit(_Job(incident))
+
+    def post_incident_event(self, incident: IncidentType, event: models.Event) -> bool:
+        """Submits a new Incident Event to be posted to Argus.
+
+        :returns: False if the event was dropped due to a full queue
+        """
+        return self._submit(_Job(incident_pk(incident), event))
+
+    def resolve_incident(
+        self,
+        incident: IncidentType,
+        description: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+    ) -> bool:
+        """Submits the resolution of an Argus Incident.
+
+        :param description: An optional event description to post.
+        :param timestamp: When the event happened. Defaults to the current datetime.
+        :returns: False if the resolution was dropped due to a full queue
+        """
+        return self._submit(self._resolve_job(incident, description, timestamp))
+
+    def _submit(self, job: _Job) -> bool:
+        self._check_open()
+        self._count("submitted")
+        with self._submit_lock:
+            # Once items have been spilled, later items are spilled too, so that
+            # items are still published in the order they were submitted
+            spill = self._spilling
+            if not spill:
+                try:
+                    self._queue.put_nowait(job)
+                    return True
+                except queue.Full:
+                    spill = self._spilling = self.overflow == SPILL
+            if spill:
+                self._spills_in_progress += 1
+        if spill:
+            try:
+                self._spill.append(job)
+            finally:
+                with self._submit_lock:
+                    self._spills_in_progress -= 1
+            return True
+        if self.overflow == BLOCK:
+            try:
+                self._queue.put(job, timeout=self.block_timeout)
+                return True
+            except queue.Full:
+                pass
+        self._count("dropped")
+        return False
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                job = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                self._safe_refill()
+                continue
+            try:
+                self._publish(job)
+            except Exception:
+                logger.exception("could not publish %r", job.item)
+            finally:
+                self._queue.task_done()
+                self._safe_refill()
+
+    def _publish(self, job: _Job):
+        for attempt in range(self.retries + 1):
+            try:
+                if job.event is None:
+                    self.client.post_incident(job.incident)
+                else:
+                    self.client.post_incident_event(job.incident, job.event)
+            except RETRYABLE_ERRORS as error:
+                if attempt == self.retries or self._stopping.wait(
+                    self._backoff_delay(attempt)
+                ):
+                    self._failed(job, error)
+                    return
+                self._count("retried")
+            except Exception as error:
+                self._failed(job, error)
+                return
+            else:
+                self._count("published")
+                return
+
+    def _refill(self):
+        """Moves spilled items back into the queue, as far as there is room"""
+        if not self._spilling:
+            return
+        # While spilling, submitters leave the queue alone, so the room in it can
+        # only grow while the spill file is being read
+        with self._refill_lock:
+            for job in self._spill.take(self.maxsize - self._queue.qsize()):
+                self._queue.put_nowait(job)
+            with self._submit_lock:
+                if not len(self._spill) and not self._spills_in_progress:
+                    self._spilling = False
+
+    def _evacuate(self):
+        """Moves any items left in the queue to the spill file, or drops them"""
+        jobs = []
+        while True:
+            try:
+                jobs.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            self._queue.task_done()
+        self._put_aside(jobs)
+
+
+class AsyncEventPublisher(_BasePublisher):
+    """Async version of `EventPublisher`, for use with an AsyncClient.
+
+    The queue is drained by `workers` tasks. The spill file, if any, is read and
+    written synchronously, as it is only used when the queue is overflowing.
+
+    Example:
+
+        >>> async with AsyncEventPublisher(client, overflow=DROP) as publisher:
+        ...     await publisher.resolve_incident(incident)
+    """
+
+    def __init__(self, client, *args, **kwargs):
+        super().__init__(client, *args, **kwargs)
+        # Created by start(), as the queue must belong to the running event loop
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._interrupted: List[_Job] = []
+
+    async def __aenter__(self) -> AsyncEventPublisher:
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def start(self) -> None:
+        """Starts the worker tasks. Must be called from a running event loop."""
+        self._check_open()
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._refill()
+        self._tasks = [
+            asyncio.ensure_future(self._work()) for _number in range(self.workers)
+        ]
+
+    async def aclose(self, timeout: Optional[float] = None) -> None:
+        """Publishes all queued items, then stops the worker tasks.
+
+        :param timeout: The maximum number of seconds to wait for queued items to be
+            published. Items not yet published by then are moved to the spill file,
+            if there is one, or dropped otherwise.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        await self.flush(timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._evacuate()
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until all submitted items have been published (or have failed).
+
+        :returns: True if everything was published within `timeout` seconds
+        """
+        if not self._tasks:
+            return False
+        drain = asyncio.ensure_future(self._drain())
+        waiting = {drain, *self._tasks}
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                remaining = None
+                if deadline is not None:
+                    remaining = max(0.0, deadline - time.monotonic())
+                done, waiting = await asyncio.wait(
+                    waiting, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                if drain in done:
+                    return True
+                # Either the time is up, or workers have died, and the queue
+                # cannot be drained if all of them have
+                if not done or all(task.done() for task in self._tasks):
+                    return False
+        finally:
+            drain.cancel()
+
+    async def _drain(self):
+        while True:
+            await self._queue.join()
+            if not self._spill or not len(self._spill):
+                return
+            self._safe_refill()
+
+    async def post_incident(self, incident: models.Incident) -> bool:
+        """Submits a new Incident to be posted to Argus.
+
+        :returns: False if the incident was dropped due to a full queue
+        """
+        return await self._submit(_Job(incident))
+
+    async def post_incident_event(
+        self, incident: IncidentType, event: models.Event
+    ) -> bool:
+        """Submits a new Incident Event to be posted to Argus.
+
+        :returns: False if the event was dropped due to a full queue
+        """
+        return await self._submit(_Job(incident_pk(incident), event))
+
+    async def resolve_incident(
+        self,
+        incident: IncidentType,
+        description: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+    ) -> bool:
+        """Submits the resolution of an Argus Incident.
+
+        :param description: An optional event description to post.
+        :param timestamp: When the event happened. Defaults to the current datetime.
+        :returns: False if the resolution was dropped due to a full queue
+        """
+        return await self._submit(self._resolve_job(incident, description, timestamp))
+
+    async def _submit(self, job: _Job) -> bool:
+        self._check_open()
+        if self._queue is None:
+            raise RuntimeError("publisher has not been started")
+        self._count("submitted")
+        if self._spill and len(self._spill):
+            self._spill.append(job)
+            return True
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            if self.overflow == SPILL:
+                self._spill.append(job)
+                return True
+        if self.overflow == BLOCK:
+            try:
+                await asyncio.wait_for(self._queue.put(job), self.block_timeout)
+                return True
+            except asyncio.TimeoutError:
+                pass
+        self._count("dropped")
+        return False
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._publish(job)
+            except asyncio.CancelledError:
+                # Stopped by aclose() after a flush timeout, mid-publication
+                self._interrupted.append(job)
+                raise
+            except Exception:
+                logger.exception("could not publish %r", job.item)
+            finally:
+                self._queue.task_done()
+                self._safe_refill()
+
+    async def _publish(self, job: _Job):
+        for attempt in range(self.retries + 1):
+            try:
+                if job.event is None:
+                    await self.client.post_incident(job.incident)
+                else:
+                    await self.client.post_incident_event(job.incident, job.event)
+            except RETRYABLE_ERRORS as error:
+                if attempt == self.retries:
+                    self._failed(job, error)
+                    return
+                self._count("retried")
+                await asyncio.sleep(self._backoff_delay(attempt))
+            except Exception as error:
+                self._failed(job, error)
+                return
+            else:
+                self._count("published")
+                return
+
+    def _refill(self):
+        """Moves spilled items back into the queue, as far as there is room"""
+        if not self._spill or not len(self._spill):
+            return
+        for job in self._spill.take(self.maxsize - self._queue.qsize()):
+            self._queue.put_nowait(job)
+
+    def _evacuate(self):
+        """Moves any items left in the queue to the spill file, or drops them"""
+        # Items interrupted mid-publication were taken from the queue before the rest
+        jobs, self._interrupted = self._interrupted, []
+        while self._queue is not None and not self._queue.empty():
+            jobs.append(self._queue.get_nowait())
+            self._queue.task_done()
+        self._put_aside(jobs)
@@ -0,0 +1,171 @@
+"""Typed queries for listing Argus incidents"""
+
+from __future__ import annotations
+
+import dataclasses
+import functools
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import models
+
+__all__ = ["IncidentQuery"]
+
+# The incident severity levels known to Argus, from most to least severe
+LEVELS = range(1, 6)
+# The attributes of an incident that can be projected
+INCIDENT_FIELDS = tuple(field.name for field in dataclasses.fields(models.Incident))
+
+
+@dataclass(frozen=True)
+class IncidentQuery:
+    """Describes which incidents to list, and how, using the filters of the Argus
+    incident listing endpoints.
+
+    All filters are optional, and incidents must match all the filters given. Values
+    are validated up front, rather than being sent to the server as is, like the
+    keyword filters of `Client.get_incidents()`. A query is immutable, but
+    `filter()` returns a copy with some of its attributes changed:
+
+        >>> recent = IncidentQuery(open=True, started_after=yesterday)
+        >>> critical = recent.filter(max_level=2, fields=("pk", "level"))
+        >>> for incident in client.get_incidents(critical):
+        ...     page(incident.pk, incident.level)
+
+    Argus always sends complete incident records. When `fields` are given, only
+    those attributes of each record are decoded; all other attributes of the
+    incidents are left as None. Leaving out the timestamps, tags and source of
+    the incidents saves most of the decoding time.
+
+    When `lazy` is set, incidents are listed as `models.LazyIncident` views, which
+    only decode the attributes that are actually accessed. This suits consumers
+    that look at a few attributes of most incidents, but need all of them now and
+    then.
+
+    :param open: Whether incidents are open.
+    :param acked: Whether incidents are acknowledged.
+    :param stateful: Whether incidents are stateful.
+    :param ticket: Whether incidents have a ticket URL.
+    :param max_level: The least severe level of incidents, from 1 (most severe) to
+        5 (least severe).
+    :param source_ids: The primary keys of the source systems of incidents.
+    :param source_names: The names of the source systems of incidents.
+    :param source_types: The types of the source systems of incidents.
+    :param source_incident_id: The source's id of an incident.
+    :param tags: Tags the incidents must be tagged with, like {"host": "gw1"}.
+    :param started_after: The earliest start time of incidents.
+    :param started_before: The latest start time of incidents.
+    :param ended_after: The earliest end time of incidents.
+    :param ended_before: The latest end time of incidents.
+    :param page_size: The number of incidents per result page. Larger pages mean
+        fewer round trips, at the expense of memory, unless the results are streamed.
+    :param fields: The incident attributes to decode, all of them if not given.
+    :param lazy: Whether to decode the attributes of incidents on first access.
+    """
+
+    open: Optional[bool] = None
+    acked: Optional[bool] = None
+    stateful: Optional[bool] = None
+    ticket: Optional[bool] = None
+    max_level: Optional[int] = None
+    source_ids: Tuple[int, ...] = ()
+    source_names: Tuple[str, ...] = ()
+    source_types: Tuple[str, ...] = ()
+    source_incident_id: Optional[str] = None
+    tags: Optional[Dict[str, str]] = None
+    started_after: Optional[datetime] = None
+    started_before: Optional[datetime] = None
+    ended_after: Optional[datetime] = None
+    ended_before: Optional[datetime] = None
+    page_size: Optional[int] = None
+    fields: Optional[Tuple[str, ...]] = None
+    lazy: bool = False
+
+    def __post_init__(self):
+        for name in ("open", "acked", "stateful", "ticket", "lazy"):
+            value = getattr(self, name)
+            if value is not None and not isinstance(value, bool):
+                raise TypeError(f"{name} must be a bool, not {value!r}")
+        for name in ("started_after", "started_before", "ended_after", "ended_before"):
+            value = getattr(self, name)
+            if value is not None and not isinstance(value, datetime):
+                raise TypeError(f"{name} must be a datetime, not {value!r}")
+        if self.max_level is not None and self.max_level not in LEVELS:
+            raise ValueError(f"max_level must be between 1 and 5, not {self.max_level}")
+        if self.page_size is not None and self.page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        # Accept any iterable of values, but store them as tuples to keep the query
+        # immutable and hashable
+        for name in ("source_ids", "source_names", "source_types"):
+            object.__setattr__(self, name, tuple(getattr(self, name)))
+        if self.fields is not None:
+            unknown = set(self.fields) - set(INCIDENT_FIELDS)
+            if unknown:
+                raise ValueError(
+                    f"unknown incident fields: {', '.join(sorted(unknown))}"
+                )
+            object.__setattr__(self, "fields", tuple(self.fields))
+        if self.tags is not None:
+            for key, value in self.tags.items():
+                if not key or "=" in key or "," in f"{key}{value}":
+                    raise ValueError(f"invalid tag: {key}={value}")
+
+    def __hash__(self):
+        tags = tuple(sorted(self.tags.items())) if self.tags else None
+        values = dataclasses.astuple(dataclasses.replace(self, tags=None))
+        return hash((values, tags))
+
+    def filter(self, **changes) -> IncidentQuery:
+        """Returns a copy of this query with some of its attributes changed"""
+        return dataclasses.replace(self, **changes)
+
+    def to_params(self) -> dict:
+        """Returns the query parameters of the Argus incident listing endpoints that
+        implement this query.
+        """
+        params = {}
+        for name in ("open", "acked", "stateful", "ticket", "source_incident_id"):
+            value = getattr(self, name)
+            if value is not None:
+                params[name] = value
+        if self.max_level is not None:
+            params["level__lte"] = self.max_level
+        for name, param in (
+            ("source_ids", "source__id__in"),
+            ("source_names", "source__name__in"),
+            ("source_types", "source__type__in"),
+        ):
+            values = getattr(self, name)
+            if values:
+                params[param] = ",".join(str(value) for value in values)
+        if self.tags:
+            params["tags"] = ",".join(
+                f"{key}={value}" for key, value in self.tags.items()
+            )
+        for name, param in (
+            ("started_after", "start_time__gte"),
+            ("started_before", "start_time__lte"),
+            ("ended_after", "end_time__gte"),
+            ("ended_before", "end_time__lte"),
+        ):
+            value = getattr(self, name)
+            if value is not None:
+                params[param] = value.isoformat()
+        if self.page_size is not None:
+            params["page_size"] = self.page_size
+        return params
+
+    def get_decoder(self, model_set: models.ModelSet) -> Callable[..., Any]:
+        """Returns the function that decodes the incidents listed by this query"""
+        if self.lazy:
+            return functools.partial(
+                models.LazyIncident.from_json, source_class=model_set.source_system
+            )
+        return model_set.incident.from_json
+
+    def project(self, record: dict) -> dict:
+        """Returns the attributes of an incident record that this query decodes"""
+        if self.fields is None:
+            return record
+        return {key: record[key] for key in self.fields if key in record}
@@ -0,0 +1,230 @@
+"""Client-side rate limiting of requests to the Argus API"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import struct
+import threading
+import time
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+__all__ = ["TokenBucket", "FileTokenBucket", "RateLimiter"]
+
+# HTTP methods that only read from the server
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class TokenBucket:
+    """A token bucket that allows `rate` requests per second on average, with bursts
+    of up to `burst` requests.
+
+    Rather than failing when the bucket is empty, `reserve()` hands out tokens that
+    will only become available in the future, and returns how long the caller must
+    wait before using them. Concurrent callers are thereby queued in the order in
+    which they made their reservations.
+
+    A TokenBucket can be shared by any number of clients and threads within a
+    single process. Use a `FileTokenBucket` to share a limit between processes.
+
+    :param rate: The number of tokens added to the bucket per second.
+    :param burst: The capacity of the bucket. Defaults to `rate`, i.e. a second's
+        worth of requests, but to at least a single request.
+    """
+
+    # Whether reserve() may block on I/O, and should be kept off event loops
+    blocking = False
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        burst = max(1.0, rate) if burst is None else burst
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = self._clock()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} rate={self.rate} burst={self.burst}>"
+
+    @staticmethod
+    def _clock() -> float:
+        return time.monotonic()
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Takes `tokens` tokens from the bucket, returning the number of seconds the
+        caller must wait before they are available.
+        """
+        with self._lock:
+            self._tokens, self._updated, delay = self._take(
+                self._tokens, self._updated, tokens
+            )
+        return delay
+
+    def _take(self, available: float, updated: float, tokens: float):
+        """Returns the (available, updated, delay) state of the bucket after taking
+        `tokens` from it.
+        """
+        now = self._clock()
+        available = min(self.burst, available + (now - updated) * self.rate)
+        available -= tokens
+        delay = -available / self.rate if available < 0 else 0.0
+        return available, now, delay
+
+
+class FileTokenBucket(TokenBucket):
+    """A token bucket whose state is kept in a small file, so that it can be shared
+    by several processes on the same host, e.g. the workers of a web application.
+
+    Access to the state is serialized using an exclusive `flock()` on the file, so
+    this backend is only available on POSIX systems. All processes sharing the file
+    should use the same `rate` and `burst`.
+
+    :param path: Path of the state file, which is created if necessary.
+    """
+
+    _STATE = struct.Struct("dd")
+    blocking = True
+
+    def __init__(self, path: str, rate: float, burst: Optional[float] = None):
+        if fcntl is None:
+            raise RuntimeError("FileTokenBucket requires fcntl, which is unavailable")
+        super().__init__(rate, burst)
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__} {self.path!r} rate={self.rate} "
+            f"burst={self.burst}>"
+        )
+
+    @staticmethod
+    def _clock() -> float:
+        # Wall clock time, as monotonic clocks are not comparable between processes
+        # on every platform
+        return time.time()
+
+    def close(self) -> None:
+        """Closes the state file"""
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def reserve(self, tokens: float = 1) -> float:
+        # The flock() only excludes other processes, as all threads of this process
+        # share the same open file
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                state = os.pread(self._fd, self._STATE.size, 0)
+                if len(state) == self._STATE.size:
+                    available, updated = self._STATE.unpack(state)
+                else:
+                    available, updated = self.burst, self._clock()
+                available, updated, delay = self._take(available, updated, tokens)
+                os.pwrite(self._fd, self._STATE.pack(available, updated), 0)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return delay
+
+
+class RateLimiter:
+    """Throttles the requests of a client to stay within the request rates an Argus
+    server tolerates, rather than finding out about them through 429 responses.
+
+    Requests are limited by the bucket of their kind (`read` for GET requests,
+    `write` for everything else), and additionally by the bucket of their endpoint,
+    if there is one in `endpoints`. Endpoints are named by their resource and,
+    optionally, action, like "incidents" or "sources.heartbeat"; the most specific
+    name takes precedence.
+
+    Example:
+
+        >>> limiter = RateLimiter(
+        ...     read=TokenBucket(rate=20, burst=40),
+        ...     write=TokenBucket(rate=5),
+        ...     endpoints={"sources.heartbeat": TokenBucket(rate=1)},
+        ... )
+
+    A limiter and its buckets can be shared by any number of clients.
+
+    :param read: The bucket limiting read requests, if any.
+    :param write: The bucket limiting write requests, if any.
+    :param endpoints: Buckets limiting requests to individual endpoints.
+    """
+
+    def __init__(
+        self,
+        read: Optional[TokenBucket] = None,
+        write: Optional[TokenBucket] = None,
+        endpoints: Optional[Dict[str, TokenBucket]] = None,
+    ):
+        self.read = read
+        self.write = write
+        self.endpoints = dict(endpoints or {})
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__} read={self.read!r} write={self.write!r} "
+            f"endpoints={self.endpoints!r}>"
+        )
+
+    def get_buckets(
+        self, resource_name: str, action_name: str, method: str
+    ) -> List[TokenBucket]:
+        """Returns the buckets that limit requests of a resource action"""
+        buckets = []
+        kind = self.read if method.upper() in READ_METHODS else self.write
+        if kind is not None:
+            buckets.append(kind)
+        endpoint = self.endpoints.get(
+            f"{resource_name}.{action_name}", self.endpoints.get(resource_name)
+        )
+        if endpoint is not None:
+            buckets.append(endpoint)
+        return buckets
+
+    def reserve(self, resource_name: str, action_name: str, method: str) -> float:
+        """Reserves a token for a request of a resource action, returning the number
+        of seconds to wait before the request may be made.
+        """
+        return max(
+            (
+                bucket.reserve()
+                for bucket in self.get_buckets(resource_name, action_name, method)
+            ),
+            default=0.0,
+        )
+
+    def acquire(self, resource_name: str, action_name: str, method: str) -> None:
+        """Blocks until a request of a resource action may be made"""
+        delay = self.reserve(resource_name, action_name, method)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def async_acquire(
+        self, resource_name: str, action_name: str, method: str
+    ) -> None:
+        """Waits until a request of a resource action may be made, without blocking
+        the event loop.
+        """
+        buckets = self.get_buckets(resource_name, action_name, method)
+        if any(bucket.blocking for bucket in buckets):
+            # Waiting for the lock of a shared state file could stall the event loop
+            delay = await asyncio.to_thread(
+                self.reserve, resource_name, action_name, method
+            )
+        else:
+            delay = self.reserve(resource_name, action_name, method)
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -0,0 +1,221 @@
+"""Retry and circuit breaker policies for requests to the Argus API"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple
+
+import httpx
+from simple_rest_client.exceptions import (
+    ClientConnectionError,
+    ErrorWithResponse,
+    ServerError,
+)
+
+__all__ = ["RetryPolicy", "CircuitBreaker", "CircuitOpenError"]
+
+# Connection errors that guarantee that a request was never sent to the server
+_UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class CircuitOpenError(ClientConnectionError):
+    """Raised instead of performing a request while a circuit breaker is open"""
+
+
+@dataclass
+class RetryPolicy:
+    """Decides whether and when failed requests are retried.
+
+    Requests that fail with a connection error, or with one of the
+    `retry_statuses`, are retried up to `max_attempts` times in total. The delay
+    before each retry grows exponentially from `backoff` seconds, up to
+    `max_backoff` seconds, and is randomized ("full jitter") so that many clients
+    failing at the same time do not retry in lockstep. A `Retry-After` header sent
+    by the server takes precedence over the computed delay.
+
+    Requests using one of the `idempotent_methods` are always safe to retry. Other
+    requests (i.e. POST) are only retried if the failed attempt never reached the
+    server, or if the resource can look up whether the first attempt took effect
+    after all (as is the case for posting incidents with a `source_incident_id`).
+
+    :param max_attempts: The maximum number of attempts per request, including the
+        first one.
+    :param backoff: The base delay, in seconds, before the first retry.
+    :param max_backoff: The maximum delay, in seconds, before any retry.
+    :param jitter: Whether to randomize delays.
+    :param retry_statuses: The HTTP status codes of responses that are retried.
+    :param respect_retry_after: Whether to honor `Retry-After` response headers.
+    :param idempotent_methods: The HTTP methods that are safe to retry.
+    """
+
+    max_attempts: int = 3
+    backoff: float = 0.5
+    max_backoff: float = 30.0
+    jitter: bool = True
+    retry_statuses: Tuple[int, ...] = (429, 500, 502, 503, 504)
+    respect_retry_after: bool = True
+    idempotent_methods: Tuple[str, ...] = ("GET", "HEAD", "OPTIONS", "PUT", "PATCH")
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Returns True if a request that failed with `error` may succeed if retried"""
+        if isinstance(error, CircuitOpenError):
+            return False
+        if isinstance(error, ClientConnectionError):
+            return True
+        if isinstance(error, ErrorWithResponse):
+            return _status_code(error) in self.retry_statuses
+        return False
+
+    def is_idempotent(self, method: str) -> bool:
+        """Returns True if requests using `method` are safe to repeat"""
+        return method.upper() in self.idempotent_methods
+
+    def get_delay(self, attempt: int, error: Exception) -> float:
+        """Returns the number of seconds to wait before retrying a request that
+        failed with `error` on its `attempt`th attempt (counting from 1).
+        """
+        retry_after = self._get_retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def _get_retry_after(self, error: Exception) -> Optional[float]:
+        if not self.respect_retry_after or not isinstance(error, ErrorWithResponse):
+            return None
+        headers = getattr(error.response, "headers", None) or {}
+        return parse_retry_after(headers.get("Retry-After"))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses the value of a Retry-After header into a number of seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def was_never_sent(error: Exception) -> bool:
+    """Returns True if `error` shows that a request never reached the server"""
+    if isinstance(error, CircuitOpenError):
+        return True
+    cause = error.args[0] if isinstance(error, ClientConnectionError) else None
+    return isinstance(cause, _UNSENT_ERRORS)
+
+
+def is_server_failure(error: Exception) -> bool:
+    """Returns True if `error` indicates an unhealthy server, rather than a bad
+    request.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    return isinstance(error, (ClientConnectionError, ServerError)) or (
+        isinstance(error, ErrorWithResponse) and _status_code(error) == 429
+    )
+
+
+def _status_code(error: ErrorWithResponse) -> Optional[int]:
+    return getattr(error.response, "status_code", None)
+
+
+class CircuitBreaker:
+    """Stops requests to an unhealthy Argus server for a while.
+
+    After `failure_threshold` consecutive server failures (5xx responses, 429
+    responses or connection errors), the breaker opens: requests fail immediately
+    with a CircuitOpenError for `recovery_time` seconds, instead of adding to the
+    load of a server that is already struggling. After that, the breaker lets a
+    single trial request through. If it succeeds, the breaker closes again,
+    otherwise it stays open for another `recovery_time` seconds. A trial that ends
+    without an outcome, e.g. because it was cancelled, must be handed back using
+    `abandon_trial()`, so that the next request can be the trial instead.
+
+    A single breaker can be shared by any number of clients and threads.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 30.0):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.state}>"
+
+    @property
+    def state(self) -> str:
+        """The current state of the breaker: CLOSED, OPEN or HALF_OPEN"""
+        with self._lock:
+            return self._state
+
+    def before_request(self) -> bool:
+        """Checks whether a request may be performed.
+
+        :returns: True if the request is the trial request of a half-open breaker
+        :raises CircuitOpenError: if the breaker is open
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return False
+            if (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at >= self.recovery_time
+            ):
+                self._state = self.HALF_OPEN
+                return True  # this request is the trial
+        raise CircuitOpenError(
+            f"circuit breaker is {self._state} after repeated server failures"
+        )
+
+    def record_success(self) -> None:
+        """Notes that a request got a response from a healthy server"""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        """Notes that a request failed due to a server failure"""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (
+                self._failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def abandon_trial(self) -> None:
+        """Notes that the trial request ended without an outcome, which reopens the
+        breaker, but lets the next request through as a new trial.
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.OPEN
+
+    def record(self, error: Optional[Exception]) -> None:
+        """Notes the outcome of a request, which failed if `error` is set"""
+        if error is None or not is_server_failure(error):
+            self.record_success()
+        else:
+            self.record_failure()
@@ -0,0 +1,306 @@
+"""Persistent, SQLite based storage of incidents, events and acknowledgements"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Union
+
+from . import models
+from .client import IncidentType, incident_pk
+from .codec import JSONCodec, get_codec
+from .time import LOCAL_INFINITY, parse_timestamp
+
+__all__ = ["IncidentStore"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    pk INTEGER PRIMARY KEY,
+    open INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS incidents_open ON incidents (open);
+CREATE TABLE IF NOT EXISTS events (
+    pk INTEGER PRIMARY KEY,
+    incident INTEGER,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_incident ON events (incident);
+CREATE TABLE IF NOT EXISTS acknowledgements (
+    pk INTEGER PRIMARY KEY,
+    incident INTEGER,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS acknowledgements_incident ON acknowledgements (incident);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class IncidentStore:
+    """Stores incidents, events and acknowledgements in an SQLite database, keyed by
+    their primary keys, so that they survive restarts of the application.
+
+    Records are stored in the same JSON shape as served by the Argus API, and are
+    decoded by the `from_json()` methods of the models in `model_set`, exactly like
+    records fetched from the API.
+
+    Example:
+
+        >>> with IncidentStore("incidents.sqlite") as store:
+        ...     store.put_incidents(client.get_incidents(open=True))
+        ...     open_incidents = list(store.incidents(open=True))
+
+    :param path: Path of the database file, or ":memory:" for a temporary database.
+    :param model_set: The model classes that stored records are decoded into.
+    :param json_codec: The codec used to encode and decode stored records.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        model_set: models.ModelSet = models.DEFAULT_MODELS,
+        json_codec: Optional[JSONCodec] = None,
+    ):
+        self.path = path
+        self.model_set = model_set
+        self.json_codec = json_codec or get_codec()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> IncidentStore:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """Closes the database"""
+        self._connection.close()
+
+    def __len__(self) -> int:
+        return self._execute("SELECT count(*) FROM incidents")[0][0]
+
+    def __contains__(self, incident: IncidentType) -> bool:
+        return bool(
+            self._execute(
+                "SELECT 1 FROM incidents WHERE pk = ?", (incident_pk(incident),)
+            )
+        )
+
+    @property
+    def last_synced(self) -> Optional[datetime]:
+        """The time of the last synchronization of this store with the Argus server,
+        as noted by whoever keeps the store up to date.
+        """
+        rows = self._execute("SELECT value FROM meta WHERE key = 'last_synced'")
+        return parse_timestamp(rows[0][0]) if rows else None
+
+    @last_synced.setter
+    def last_synced(self, value: Optional[datetime]):
+        if value is None:
+            self._execute("DELETE FROM meta WHERE key = 'last_synced'")
+        else:
+            self._execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_synced', ?)",
+                (value.isoformat(),),
+            )
+
+    def put_incidents(self, incidents: Iterable[models.Incident]) -> None:
+        """Stores incidents, replacing any stored incidents with the same pk"""
+        self._executemany(
+            "INSERT OR REPLACE INTO incidents (pk, open, data) VALUES (?, ?, ?)",
+            (
+                (
+                    incident.pk,
+                    bool(incident.open),
+                    self._encode(_incident_record(incident)),
+                )
+                for incident in incidents
+            ),
+        )
+
+    def get_incident(self, incident: IncidentType) -> Optional[models.Incident]:
+        """Returns the stored incident with the given pk, if any"""
+        rows = self._execute(
+            "SELECT data FROM incidents WHERE pk = ?", (incident_pk(incident),)
+        )
+        return self._decode_incidents(rows)[0] if rows else None
+
+    def incidents(self, open: Optional[bool] = None) -> Iterator[models.Incident]:
+        """Returns all stored incidents in pk order.
+
+        :param open: If given, only incidents whose open state matches are returned.
+        """
+        if open is None:
+            rows = self._execute("SELECT data FROM incidents ORDER BY pk")
+        else:
+            rows = self._execute(
+                "SELECT data FROM incidents WHERE open = ? ORDER BY pk", (bool(open),)
+            )
+        return iter(self._decode_incidents(rows))
+
+    def delete_incidents(self, incidents: Iterable[IncidentType]) -> None:
+        """Removes incidents from the store, along with their events and
+        acknowledgements.
+        """
+        pks = [(incident_pk(incident),) for incident in incidents]
+        for table, column in (
+            ("incidents", "pk"),
+            ("events", "incident"),
+            ("acknowledgements", "incident"),
+        ):
+            self._executemany(f"DELETE FROM {table} WHERE {column} = ?", pks)
+
+    def put_events(self, events: Iterable[models.Event]) -> None:
+        """Stores events, replacing any stored events with the same pk"""
+        self._executemany(
+            "INSERT OR REPLACE INTO events (pk, incident, data) VALUES (?, ?, ?)",
+            (
+                (event.pk, event.incident, self._encode(_event_record(event)))
+                for event in events
+            ),
+        )
+
+    def events_for(self, incident: IncidentType) -> List[models.Event]:
+        """Returns the stored events of an incident, in pk order"""
+        rows = self._execute(
+            "SELECT data FROM events WHERE incident = ? ORDER BY pk",
+            (incident_pk(incident),),
+        )
+        return [self.model_set.event.from_json(self._decode(data)) for (data,) in rows]
+
+    def put_acknowledgements(
+        self, acknowledgements: Iterable[models.Acknowledgement]
+    ) -> None:
+        """Stores acknowledgements, replacing any stored acknowledgements with the
+        same pk.
+        """
+        self._executemany(
+            "INSERT OR REPLACE INTO acknowledgements (pk, incident, data) "
+            "VALUES (?, ?, ?)",
+            (
+                (
+                    ack.pk,
+                    ack.event.incident if ack.event else None,
+                    self._encode(_acknowledgement_record(ack)),
+                )
+                for ack in acknowledgements
+            ),
+        )
+
+    def acknowledgements_for(
+        self, incident: IncidentType
+    ) -> List[models.Acknowledgement]:
+        """Returns the stored acknowledgements of an incident, in pk order"""
+        rows = self._execute(
+            "SELECT data FROM acknowledgements WHERE incident = ? ORDER BY pk",
+            (incident_pk(incident),),
+        )
+        return [
+            self.model_set.acknowledgement.from_json(self._decode(data))
+            for (data,) in rows
+        ]
+
+    def _decode_incidents(self, rows: list) -> List[models.Incident]:
+        sources = models.SourceRegistry(self.model_set.source_system)
+        return [
+            self.model_set.incident.from_json(self._decode(data), sources)
+            for (data,) in rows
+        ]
+
+    def _encode(self, record: dict) -> bytes:
+        return self.json_codec.encode(record)
+
+    def _decode(self, data: Union[bytes, str]) -> dict:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return self.json_codec.decode(data)
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> list:
+        with self._lock, self._connection:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def _executemany(self, sql: str, rows: Iterable[tuple]) -> None:
+        with self._lock, self._connection:
+            self._connection.executemany(sql, rows)
+
+
+def _incident_record(incident: models.Incident) -> dict:
+    """Returns the Argus JSON dict that describes an incident.
+
+    Unlike `Incident.to_json()`, which produces a request body for posting an
+    incident, this is the lossless inverse of `Incident.from_json()`.
+    """
+    record = _without_unset(
+        pk=incident.pk,
+        start_time=_encode_timestamp(incident.start_time),
+        source=_source_record(incident.source) if incident.source else None,
+        source_incident_id=incident.source_incident_id,
+        details_url=incident.details_url,
+        description=incident.description,
+        level=incident.level,
+        ticket_url=incident.ticket_url,
+        tags=(
+            [{"tag": f"{key}={value}"} for key, value in incident.tags.items()]
+            if incident.tags is not None
+            else None
+        ),
+        stateful=incident.stateful,
+        open=incident.open,
+        acked=incident.acked,
+        metadata=incident.metadata,
+    )
+    if incident.end_time is models.STATELESS:
+        record["end_time"] = None
+    elif incident.end_time == LOCAL_INFINITY:
+        record["end_time"] = "infinity"
+    elif incident.end_time is not None:
+        record["end_time"] = incident.end_time.isoformat()
+    return record
+
+
+def _source_record(source: models.SourceSystem) -> dict:
+    return _without_unset(
+        pk=source.pk,
+        name=source.name,
+        type={"name": source.type} if source.type is not None else None,
+        user=source.user,
+        base_url=source.base_url,
+    )
+
+
+def _event_record(event: models.Event) -> dict:
+    return _without_unset(
+        pk=event.pk,
+        actor={"username": event.actor} if event.actor is not None else None,
+        description=event.description,
+        incident=event.incident,
+        received=_encode_timestamp(event.received),
+        timestamp=_encode_timestamp(event.timestamp),
+        type={"value": event.type} if event.type is not None else None,
+    )
+
+
+def _acknowledgement_record(acknowledgement: models.Acknowledgement) -> dict:
+    return _without_unset(
+        pk=acknowledgement.pk,
+        expiration=_encode_timestamp(acknowledgement.expiration),
+        event=_event_record(acknowledgement.event) if acknowledgement.event else None,
+    )
+
+
+def _encode_timestamp(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _without_unset(**attributes) -> dict:
+    """Returns the attributes whose values are set, leaving the rest to the defaults
+    of the model class when decoded.
+    """
+    return {key: value for key, value in attributes.items() if value is not None}
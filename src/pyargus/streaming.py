@@ -0,0 +1,424 @@
+"""Incremental decoding of Argus API listings, straight from the response bytes"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+import httpx
+from simple_rest_client.decorators import validate_response
+from simple_rest_client.exceptions import AuthError, ClientConnectionError
+from simple_rest_client.models import Request, Response
+from simple_rest_client.resource import BaseResource
+
+from . import api
+from .resilience import CircuitBreaker
+
+__all__ = ["PageParser", "iter_streamed_records", "aiter_streamed_records"]
+
+_WHITESPACE = " \t\n\r"
+# The characters that matter when looking for the end of an array or object, outside
+# and inside of strings, respectively
+_STRUCTURE = re.compile(r'["{}\[\]]')
+_STRING_END = re.compile(r'["\\]')
+
+# Parser states
+_START = "start"
+_KEY = "key"
+_COLON = "colon"
+_VALUE = "value"
+_AFTER_VALUE = "after value"
+_ITEM = "item"
+_AFTER_ITEM = "after item"
+_END = "end"
+
+
+class PageParser:
+    """Incrementally parses a JSON result page, as served by Argus listing endpoints.
+
+    Feed the page to the parser piece by piece as the bytes arrive from the
+    network. Each element of the page's `results` array is returned as soon as it
+    has been completely received, while all other members of the page object (such
+    as the `next` and `previous` cursor URLs) are collected in the `members`
+    dictionary. A non-paginated result, i.e. a bare JSON array, is also supported.
+
+    Only a single, partially received element is ever buffered, so memory use is
+    bounded by the size of the largest element rather than by the size of the page.
+    An element that spans several pieces is only decoded once it is complete, so
+    the time spent on it is independent of the number of pieces.
+    """
+
+    def __init__(self, results_key: str = "results"):
+        self.results_key = results_key
+        self.members = {}
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._state = _START
+        self._in_object = False
+        self._key = None
+        self._closed = False
+        # How far an incomplete array or object has been scanned for its end, with
+        # the nesting depth and whether a string was open at that point
+        self._scanned = 0
+        self._depth = 0
+        self._in_string = False
+
+    def feed(self, data: bytes) -> List[Any]:
+        """Parses another piece of the page, returning any completed elements"""
+        self._buffer += self._text_decoder.decode(data)
+        return self._parse()
+
+    def close(self) -> List[Any]:
+        """Signals the end of the page, returning any remaining completed elements.
+
+        :raises ValueError: if the page is not a complete JSON document
+        """
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        self._closed = True
+        items = self._parse()
+        if self._state != _END or self._buffer.strip(_WHITESPACE):
+            raise ValueError("Incomplete or invalid JSON result page")
+        return items
+
+    def _parse(self) -> List[Any]:
+        items = []
+        buffer = self._buffer
+        position = 0
+        while True:
+            position = _skip_whitespace(buffer, position)
+            if position >= len(buffer) or self._state == _END:
+                break
+            state, char = self._state, buffer[position]
+
+            if state == _START:
+                if char == "{":
+                    self._in_object = True
+                    self._state = _KEY
+                elif char == "[":
+                    self._state = _ITEM
+                else:
+                    raise ValueError(f"Unexpected {char!r} at start of result page")
+                position += 1
+            elif state == _KEY and char == "}":
+                self._state = _END
+                position += 1
+            elif state == _COLON:
+                _expect(char, ":")
+                self._state = _VALUE
+                position += 1
+            elif state == _VALUE and self._key == self.results_key:
+                _expect(char, "[")
+                self._state = _ITEM
+                position += 1
+            elif state == _ITEM and char == "]":
+                self._state = self._state_after_results()
+                position += 1
+            elif state == _AFTER_VALUE:
+                _expect(char, ",}")
+                self._state = _KEY if char == "," else _END
+                position += 1
+            elif state == _AFTER_ITEM:
+                _expect(char, ",]")
+                self._state = _ITEM if char == "," else self._state_after_results()
+                position += 1
+            else:  # a member name, a member value or a results element
+                decoded = self._decode_value(buffer, position)
+                if decoded is None:
+                    break  # incomplete, wait for more data
+                value, position = decoded
+                if state == _KEY:
+                    if not isinstance(value, str):
+                        raise ValueError("Expected a member name in result page")
+                    self._key = value
+                    self._state = _COLON
+                elif state == _VALUE:
+                    self.members[self._key] = value
+                    self._state = _AFTER_VALUE
+                else:
+                    items.append(value)
+                    self._state = _AFTER_ITEM
+
+        self._buffer = buffer[position:]
+        return items
+
+    def _state_after_results(self) -> str:
+        return _AFTER_VALUE if self._in_object else _END
+
+    def _decode_value(self, buffer: str, position: int):
+        """Decodes a complete JSON value from the buffer, returning it along with
+        the position following it, or None if the value is not yet complete.
+        """
+        if self._depth and not self._closed:
+            # Rather than decoding an incomplete array or object over and over again
+            # as more of it arrives, only the new data is scanned for its end
+            if self._find_end(buffer, position) is None:
+                return None
+        try:
+            value, end = self._decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if self._closed:
+                raise
+            if buffer[position] in "{[" and self._find_end(buffer, position):
+                raise  # complete, yet invalid
+            return None
+        # A number at the very end of the buffer may continue in the next piece
+        if end >= len(buffer) and not self._closed and buffer[position] not in '{["':
+            return None
+        return value, end
+
+    def _find_end(self, buffer: str, start: int) -> Optional[int]:
+        """Scans the array or object starting at `start` for its end, continuing
+        where the previous scan left off, returning the position following it, or
+        None if it is not yet complete.
+        """
+        position = start + self._scanned
+        depth, in_string = self._depth, self._in_string
+        while True:
+            if in_string:
+                match = _STRING_END.search(buffer, position)
+                if match is None:
+                    position = len(buffer)
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(buffer):
+                        # Rescan the escape once the escaped character has arrived
+                        position = match.start()
+                        break
+                    position = match.end() + 1
+                    continue
+                in_string = False
+            else:
+                match = _STRUCTURE.search(buffer, position)
+                if match is None:
+                    position = len(buffer)
+                    break
+                char = match.group()
+                if char == '"':
+                    in_string = True
+                elif char in "{[":
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        self._scanned, self._depth, self._in_string = 0, 0, False
+                        return match.end()
+            position = match.end()
+        self._scanned, self._depth, self._in_string = position - start, depth, in_string
+        return None
+
+
+def _expect(char: str, expected: str):
+    if char not in expected:
+        raise ValueError(f"Unexpected {char!r} in result page")
+
+
+def _skip_whitespace(buffer: str, position: int) -> int:
+    while position < len(buffer) and buffer[position] in _WHITESPACE:
+        position += 1
+    return position
+
+
+def iter_streamed_records(
+    resource: BaseResource, action_name: str, params: dict, parser: PageParser
+) -> Iterator[Any]:
+    """Performs a simple_rest_client resource action, streaming the elements of its
+    result page as they are decoded by `parser`.
+
+    When the page is exhausted, its remaining members (such as the `next` cursor)
+    are available in `parser.members`. Error responses raise the same exceptions as
+    regular simple_rest_client actions.
+
+    Like the actions of an `api.ArgusResource`, the request is subject to the rate
+    limiter, retry policy, circuit breaker and observer of the resource, and a
+    request rejected as unauthorized is sent again if the token of the resource has
+    been replaced in the meantime. As elements are produced while the page arrives,
+    a request is only sent again if it failed before its page started to arrive.
+    """
+    request = api.build_request(resource, action_name, (), params=dict(params))
+    limiter = getattr(resource, "rate_limiter", None)
+    policy = getattr(resource, "retry_policy", None)
+    breaker = getattr(resource, "circuit_breaker", None)
+    attempt = 1
+    while True:
+        if limiter is not None:
+            limiter.acquire(resource.resource_name, action_name, request.method)
+        trial = breaker.before_request() if breaker is not None else False
+        page = _PageAttempt(resource, action_name, request)
+        try:
+            try:
+                with resource.client.stream(
+                    request.method, request.url, **_get_stream_options(request)
+                ) as client_response:
+                    page.receive(client_response)
+                    if client_response.is_error:
+                        client_response.read()
+                        _raise_for_response(request.method, client_response)
+                    for chunk in client_response.iter_bytes():
+                        yield from page.decode(parser, chunk)
+                    yield from page.decode(parser)
+            except httpx.RequestError as error:
+                raise ClientConnectionError(error) from error
+        except Exception as error:
+            page.finish(error)
+            if breaker is not None:
+                breaker.record(error)
+            if page.responded:
+                raise
+            if isinstance(error, AuthError) and api.reauthorize(resource, request):
+                continue
+            if not api.may_retry(
+                policy, resource, action_name, request, attempt, error
+            ):
+                raise
+            time.sleep(policy.get_delay(attempt, error))
+            attempt += 1
+        except BaseException:
+            # Closed early by the consumer, cancelled or interrupted
+            page.finish()
+            page.settle(breaker, trial)
+            raise
+        else:
+            page.finish()
+            if breaker is not None:
+                breaker.record(None)
+            return
+
+
+async def aiter_streamed_records(
+    resource: BaseResource, action_name: str, params: dict, parser: PageParser
+) -> AsyncIterator[Any]:
+    """Async version of `iter_streamed_records()`, for async resources"""
+    request = api.build_request(resource, action_name, (), params=dict(params))
+    limiter = getattr(resource, "rate_limiter", None)
+    policy = getattr(resource, "retry_policy", None)
+    breaker = getattr(resource, "circuit_breaker", None)
+    attempt = 1
+    while True:
+        if limiter is not None:
+            await limiter.async_acquire(
+                resource.resource_name, action_name, request.method
+            )
+        trial = breaker.before_request() if breaker is not None else False
+        page = _PageAttempt(resource, action_name, request)
+        try:
+            try:
+                async with resource.client.stream(
+                    request.method, request.url, **_get_stream_options(request)
+                ) as client_response:
+                    page.receive(client_response)
+                    if client_response.is_error:
+                        await client_response.aread()
+                        _raise_for_response(request.method, client_response)
+                    async for chunk in client_response.aiter_bytes():
+                        for item in page.decode(parser, chunk):
+                            yield item
+                    for item in page.decode(parser):
+                        yield item
+            except httpx.RequestError as error:
+                raise ClientConnectionError(error) from error
+        except Exception as error:
+            page.finish(error)
+            if breaker is not None:
+                breaker.record(error)
+            if page.responded:
+                raise
+            if isinstance(error, AuthError) and api.reauthorize(resource, request):
+                continue
+            if not api.may_retry(
+                policy, resource, action_name, request, attempt, error
+            ):
+                raise
+            await asyncio.sleep(policy.get_delay(attempt, error))
+            attempt += 1
+        except BaseException:
+            # Closed early by the consumer, cancelled or interrupted
+            page.finish()
+            page.settle(breaker, trial)
+            raise
+        else:
+            page.finish()
+            if breaker is not None:
+                breaker.record(None)
+            return
+
+
+def _get_stream_options(request: Request) -> dict:
+    """Returns the httpx options needed to stream the response to a GET request"""
+    return {
+        "params": request.params,
+        "headers": request.headers,
+        "timeout": request.timeout,
+    }
+
+
+class _PageAttempt:
+    """Keeps track of a single attempt at streaming a result page, measuring it for
+    the observer of its resource, if there is one.
+    """
+
+    def __init__(self, resource: BaseResource, action_name: str, request: Request):
+        self.observer = getattr(resource, "observer", None)
+        self.info = None
+        # Whether the page started to arrive, after a successful response status
+        self.responded = False
+        self._start = 0.0
+        if self.observer is not None:
+            self.info = api.make_request_info(resource, action_name, request)
+            self._start = api.start_measuring(self.info, {})
+
+    def receive(self, client_response: httpx.Response):
+        """Notes the arrival of the response status and headers"""
+        self.responded = not client_response.is_error
+        if self.info is not None:
+            self.info.status_code = client_response.status_code
+
+    def decode(self, parser: PageParser, chunk: Optional[bytes] = None) -> List[Any]:
+        """Feeds a chunk of the page to the parser, or closes it if there are no
+        more chunks, returning the elements decoded.
+        """
+        if self.info is None:
+            return parser.feed(chunk) if chunk is not None else parser.close()
+        start = time.perf_counter()
+        items = parser.feed(chunk) if chunk is not None else parser.close()
+        self.info.decode_time += time.perf_counter() - start
+        self.info.response_bytes += len(chunk or b"")
+        return items
+
+    def finish(self, error: Optional[Exception] = None):
+        """Reports the attempt to the observer, if any"""
+        if self.info is None:
+            return
+        self.info.elapsed = time.perf_counter() - self._start
+        self.info.error = error
+        self.observer.request_finished(self.info)
+
+    def settle(self, breaker: Optional[CircuitBreaker], trial: bool):
+        """Notes the outcome of an attempt that was stopped before it was complete.
+
+        The server is healthy if the page started to arrive. Otherwise there is no
+        outcome, and the trial request of a half-open breaker is abandoned.
+        """
+        if breaker is None:
+            return
+        if self.responded:
+            breaker.record(None)
+        elif trial:
+            breaker.abandon_trial()
+
+
+def _raise_for_response(method: str, client_response: httpx.Response):
+    """Raises the simple_rest_client exception matching an error response"""
+    response = Response(
+        url=str(client_response.url),
+        method=method,
+        body=client_response.text,
+        headers=client_response.headers,
+        status_code=client_response.status_code,
+        client_response=client_response,
+    )
+    validate_response(response)
@@ -1,10 +1,72 @@
 """Pyargus time related functions"""
 
-from datetime import datetime, timezone
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+from iso8601 import parse_date
+
+__all__ = ["LOCAL_INFINITY", "now", "parse_timestamp", "parse_timestamps"]
 
 LOCAL_INFINITY = datetime.max.replace(tzinfo=timezone.utc)
 
+# The exact timestamp format emitted by Argus, e.g. 2021-04-04T16:37:43.293726+02:00,
+# whose date and time `datetime.fromisoformat()` can parse on all supported Python
+# versions
+_ARGUS_TIMESTAMP = re.compile(
+    r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d{3}|\.\d{6})?(?:Z|[+-]\d\d:\d\d)"
+)
+
 
 def now() -> datetime:
     """Returns current time as UTC time with timezone information"""
     return datetime.now(timezone.utc)
+
+
+@lru_cache(maxsize=1024)
+def parse_timestamp(value: str) -> datetime:
+    """Parses an ISO 8601 timestamp from the Argus API.
+
+    Timestamps in the exact format emitted by Argus are parsed by a fast path, while
+    anything else falls back to the more lenient `iso8601.parse_date()`. Results are
+    cached, as the same timestamps tend to recur across records (e.g. the `received`
+    time of events that were posted together).
+
+    :raises iso8601.ParseError: if the value is not a valid ISO 8601 timestamp
+    """
+    if _ARGUS_TIMESTAMP.fullmatch(value):
+        if value[-1] == "Z":
+            return datetime.fromisoformat(value[:-1]).replace(tzinfo=timezone.utc)
+        naive = datetime.fromisoformat(value[:-6])
+        return naive.replace(tzinfo=_fixed_offset(value[-6:]))
+    return parse_date(value)
+
+
+@lru_cache(maxsize=None)
+def _fixed_offset(offset: str) -> timezone:
+    """Returns the timezone of a +HH:MM offset, named by the offset itself like the
+    timezones of `iso8601.parse_date()`, so both parsers give identical results.
+    """
+    sign = -1 if offset[0] == "-" else 1
+    hours, minutes = int(offset[1:3]), int(offset[4:6])
+    return timezone(sign * timedelta(hours=hours, minutes=minutes), offset)
+
+
+def parse_timestamps(values: Iterable[Optional[str]]) -> List[Optional[datetime]]:
+    """Parses a whole column of timestamps at once, e.g. the `start_time` of every
+    incident of a result page.
+
+    Each distinct value is parsed only once. Empty values are passed through as-is.
+    """
+    parsed = {}
+    result = []
+    for value in values:
+        if not value:
+            result.append(value)
+            continue
+        timestamp = parsed.get(value)
+        if timestamp is None:
+            timestamp = parsed[value] = parse_timestamp(value)
+        result.append(timestamp)
+    return result
@@ -0,0 +1,286 @@
+"""Management of expiring Argus API tokens"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Optional, Protocol
+
+from .async_client import AsyncClient
+from .client import Client
+from .models import ExpiringToken
+from .time import now, parse_timestamp
+
+__all__ = ["TokenStore", "FileTokenStore", "TokenManager", "AsyncTokenManager"]
+
+logger = logging.getLogger(__name__)
+
+# Refresh tokens this many seconds before they expire, by default
+DEFAULT_REFRESH_MARGIN = 24 * 60 * 60.0
+
+
+class TokenStore(Protocol):
+    """Persists the most recent token of a client, so that it survives restarts"""
+
+    def load(self) -> Optional[ExpiringToken]:
+        """Returns the stored token, or None if no token has been stored yet"""
+
+    def save(self, token: ExpiringToken) -> None:
+        """Replaces the stored token"""
+
+
+class FileTokenStore:
+    """Stores a token as a small JSON file that only its owner can read.
+
+    The file is replaced atomically, so a process that crashes while saving a token
+    leaves the previous one intact.
+
+    :param path: Path of the token file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.path!r}>"
+
+    def load(self) -> Optional[ExpiringToken]:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return None
+        return ExpiringToken(
+            expiration=parse_timestamp(data["expiration"]), token=data["token"]
+        )
+
+    def save(self, token: ExpiringToken) -> None:
+        data = {"token": token.token, "expiration": token.expiration.isoformat()}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        # mkstemp() creates the file readable and writable by its owner only
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix=".pyargus-token-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(temporary, self.path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+
+class _BaseTokenManager:
+    """The bookkeeping shared by the sync and async token managers"""
+
+    def __init__(
+        self,
+        client: Any,
+        token: Optional[ExpiringToken] = None,
+        store: Optional[TokenStore] = None,
+        refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+        retry_interval: float = 60.0,
+        on_refresh: Optional[Callable[[ExpiringToken], None]] = None,
+    ):
+        if retry_interval <= 0:
+            raise ValueError("retry_interval must be positive")
+        self.client = client
+        self.store = store
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.on_refresh = on_refresh
+        if token is None and store is not None:
+            token = store.load()
+        self.token = token
+        if token is not None:
+            self._set_header(token)
+
+    def __repr__(self):
+        expiration = self.token.expiration if self.token else None
+        return f"<{self.__class__.__name__} expiration={expiration}>"
+
+    def seconds_until_refresh(self) -> float:
+        """Returns the number of seconds until the token is due to be refreshed.
+
+        A token of unknown expiration is due at once.
+        """
+        if self.token is None:
+            return 0.0
+        remaining = (self.token.expiration - now()).total_seconds()
+        return max(0.0, remaining - self.refresh_margin)
+
+    def _next_wait(self) -> float:
+        # A token that expires sooner than the refresh margin would otherwise be
+        # refreshed over and over again
+        return max(self.seconds_until_refresh(), self.retry_interval)
+
+    def _set_header(self, token: ExpiringToken) -> None:
+        # All resources of the API object share its headers, and every request
+        # copies them when it is built, so requests in flight keep the old token
+        # while all later requests get the new one
+        self.client.api.headers["Authorization"] = "Token " + token.token
+
+    def _install(self, token: ExpiringToken) -> None:
+        self._set_header(token)
+        self.token = token
+        logger.info("Refreshed Argus API token, which expires at %s", token.expiration)
+        if self.store is not None:
+            try:
+                self.store.save(token)
+            except Exception:
+                # The client works fine without it, until the next restart
+                logger.exception("Could not save refreshed token to %r", self.store)
+        if self.on_refresh is not None:
+            try:
+                self.on_refresh(token)
+            except Exception:
+                # The token is installed, so it must not be refreshed again
+                logger.exception("Error in on_refresh callback %r", self.on_refresh)
+
+    @staticmethod
+    def _log_failure(error: Exception, retry_interval: float) -> None:
+        logger.warning(
+            "Could not refresh Argus API token, retrying in %s seconds: %s",
+            retry_interval,
+            error,
+        )
+
+
+class TokenManager(_BaseTokenManager):
+    """Keeps the token of a Client fresh, by refreshing it from a background thread
+    some time before it expires.
+
+    A refreshed token is swapped into the client's live API object, so the client
+    can be used without interruption, and without throwing away its connections or
+    caches. Requests that were already in flight when the token was swapped, and
+    are rejected as the old token is revoked, are retried once with the new token.
+
+    Each new token is saved to `store`, if given, and passed to `on_refresh`. If no
+    `token` is given, the token is loaded from `store`, and if its expiration is
+    unknown, the token is refreshed as soon as the manager is started.
+
+    Example:
+
+        >>> store = FileTokenStore("/var/lib/glue/argus-token.json")
+        >>> with TokenManager(client, store=store):
+        ...     run_glue_service()
+
+    This also works for the clients of a `pool.ClientPool`.
+
+    :param client: The client whose token to manage.
+    :param token: The current token of the client, with its expiration.
+    :param store: Where to persist new tokens.
+    :param refresh_margin: The number of seconds before expiration to refresh the
+        token at.
+    :param retry_interval: The number of seconds to wait before retrying a failed
+        refresh, which is also the minimum time between refreshes.
+    :param on_refresh: Called with every new token. Errors it raises are logged.
+    """
+
+    def __init__(self, client: Client, *args, **kwargs):
+        super().__init__(client, *args, **kwargs)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> TokenManager:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self) -> None:
+        """Starts refreshing the token in the background"""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="pyargus-token", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stops refreshing the token, waiting for a refresh in progress to finish"""
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+
+    def refresh(self) -> ExpiringToken:
+        """Refreshes the token right away, returning the new token"""
+        with self._lock:
+            token = self.client.refresh_token()
+            self._install(token)
+            return token
+
+    def _run(self) -> None:
+        wait = self.seconds_until_refresh()
+        while not self._stopping.wait(wait):
+            try:
+                self.refresh()
+            except Exception as error:
+                self._log_failure(error, self.retry_interval)
+                wait = self.retry_interval
+            else:
+                wait = self._next_wait()
+
+
+class AsyncTokenManager(_BaseTokenManager):
+    """Async version of `TokenManager`, for AsyncClients, which refreshes the token
+    from a task.
+
+    Example:
+
+        >>> async with AsyncTokenManager(client, store=store):
+        ...     await run_glue_service()
+    """
+
+    def __init__(self, client: AsyncClient, *args, **kwargs):
+        super().__init__(client, *args, **kwargs)
+        # Created by start(), as they must belong to the running event loop
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Future] = None
+
+    async def __aenter__(self) -> AsyncTokenManager:
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def start(self) -> None:
+        """Starts refreshing the token. Must be called from a running event loop."""
+        if self._task is not None:
+            return
+        self._lock = self._lock or asyncio.Lock()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def aclose(self) -> None:
+        """Stops refreshing the token"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def refresh(self) -> ExpiringToken:
+        """Refreshes the token right away, returning the new token"""
+        self._lock = self._lock or asyncio.Lock()
+        async with self._lock:
+            token = await self.client.refresh_token()
+            self._install(token)
+            return token
+
+    async def _run(self) -> None:
+        wait = self.seconds_until_refresh()
+        while True:
+            await asyncio.sleep(wait)
+            try:
+                await self.refresh()
+            except Exception as error:
+                self._log_failure(error, self.retry_interval)
+                wait = self.retry_interval
+            else:
+                wait = self._next_wait()
@@ -0,0 +1,111 @@
+"""Helpers shared by the pyargus tests"""
+
+from datetime import timedelta
+from typing import Callable, List, Optional
+
+import httpx
+from simple_rest_client.models import Response
+
+from pyargus import api
+from pyargus.models import ExpiringToken
+from pyargus.time import now
+
+
+def incident_json(**overrides) -> dict:
+    """Returns an Argus incident JSON dict, with any attributes given overridden"""
+    data = {
+        "pk": 4,
+        "start_time": "2021-04-04T16:37:43.293726+02:00",
+        "end_time": "infinity",
+        "source": {
+            "pk": 2,
+            "name": "testnav",
+            "type": {"name": "nav"},
+            "user": 3,
+            "base_url": "http://localhost/",
+        },
+        "source_incident_id": "202430",
+        "details_url": "http://localhost/search/event/202430",
+        "description": "uninett-gsw2 BGP session is DOWN",
+        "level": 5,
+        "ticket_url": "",
+        "tags": [
+            {"added_by": 3, "tag": "host=uninett-gsw2.uninett.no"},
+            {"added_by": 3, "tag": "url=http://x/?a=b"},
+        ],
+        "stateful": True,
+        "open": True,
+        "acked": False,
+        "metadata": {},
+    }
+    data.update(overrides)
+    return data
+
+
+def event_json() -> dict:
+    """Returns an Argus incident event JSON dict"""
+    return {
+        "pk": 10,
+        "actor": {"pk": 3, "username": "testnav"},
+        "description": "The demolition was cancelled",
+        "incident": 8,
+        "received": "2021-04-22T09:47:11.978438Z",
+        "timestamp": "2021-04-22T09:47:11.946076Z",
+        "type": {"value": "END", "display": "Incident end"},
+    }
+
+
+def expiring_token(token: str, days: float) -> ExpiringToken:
+    """Returns a token that expires the given number of days from now"""
+    return ExpiringToken(expiration=now() + timedelta(days=days), token=token)
+
+
+def fake_response(body) -> Response:
+    """Returns a successful simple_rest_client response with the given body"""
+    return Response(
+        url="",
+        method="GET",
+        body=body,
+        headers={},
+        status_code=200,
+        client_response=None,
+    )
+
+
+def serve_incident_pages(request: httpx.Request) -> httpx.Response:
+    """Serves incidents 1, 2 and 3 across two pages, as an httpx mock transport"""
+    if request.url.params.get("cursor") == "2":
+        page = {"next": None, "results": [incident_json(pk=3)]}
+    else:
+        page = {
+            "next": "https://argus.example.org/api/v2/incidents/?cursor=2",
+            "results": [incident_json(pk=1), incident_json(pk=2)],
+        }
+    return httpx.Response(200, json=page)
+
+
+def serve(
+    argusapi,
+    handler: Optional[Callable[[httpx.Request], httpx.Response]] = None,
+    client_class: type = httpx.Client,
+) -> List[httpx.Request]:
+    """Makes all resources of an API object serve their requests using `handler`, as
+    an httpx mock transport, returning the list of requests received.
+
+    Without a handler, every request is answered by an empty JSON object. Pass
+    `httpx.AsyncClient` as `client_class` to serve the resources of an async API.
+    """
+    requests = []
+
+    def respond(request):
+        requests.append(request)
+        return handler(request) if handler else httpx.Response(200, json={})
+
+    for resource in api.get_resources(argusapi):
+        resource.client = client_class(transport=httpx.MockTransport(respond))
+    return requests
+
+
+def authorizations(requests: List[httpx.Request]) -> List[Optional[str]]:
+    """Returns the Authorization headers of a list of requests"""
+    return [request.headers.get("Authorization") for request in requests]
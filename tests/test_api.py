@@ -26,3 +26,32 @@ def test_connect_should_expose_source_heartbeat_probe_action():
     action = client.sources.actions["heartbeat_probe"]
     assert action["method"] == "GET"
     assert action["url"] == "incidents/sources/heartbeat/"
+
+
+class TestTransportConfig:
+    def test_when_given_it_should_share_one_pool_between_all_resources(self):
+        transport = api.TransportConfig()
+        client = api.connect("random", "token", transport=transport)
+        pools = {id(resource.client) for resource in api.get_resources(client)}
+        assert pools == {id(transport.get_client())}
+
+    def test_when_given_it_should_share_one_pool_between_api_objects(self):
+        transport = api.TransportConfig()
+        first = api.connect("random", "token", transport=transport)
+        second = api.connect("random", "other-token", transport=transport)
+        assert first.incidents.client is second.incidents.client
+
+    def test_when_closed_it_should_open_a_new_pool_on_next_use(self):
+        transport = api.TransportConfig()
+        client = transport.get_client()
+        transport.close()
+        assert client.is_closed
+        assert transport.get_client() is not client
+
+    def test_it_should_translate_to_httpx_limits(self):
+        transport = api.TransportConfig(
+            max_connections=5, max_keepalive_connections=2, keepalive_expiry=1.5
+        )
+        assert transport.limits.max_connections == 5
+        assert transport.limits.max_keepalive_connections == 2
+        assert transport.limits.keepalive_expiry == 1.5
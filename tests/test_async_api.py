@@ -3,6 +3,7 @@
 import pytest
 
 from pyargus import async_api
+from pyargus.api import TransportConfig
 
 
 def test_async_connect_should_return_api_client():
@@ -21,3 +22,11 @@ def test_async_connect_should_expose_source_heartbeat_action():
     client = async_api.async_connect("random", "token")
     assert "heartbeat" in client.sources.actions
     assert "heartbeat_probe" in client.sources.actions
+
+
+def test_async_connect_with_transport_should_share_one_pool():
+    transport = TransportConfig()
+    first = async_api.async_connect("random", "token", transport=transport)
+    second = async_api.async_connect("random", "other-token", transport=transport)
+    assert first.incidents.client is second.events.client
+    assert first.incidents.client is transport.get_async_client()
@@ -1,11 +1,15 @@
+import asyncio
 from collections.abc import AsyncIterable
 from unittest.mock import AsyncMock
 
+import httpx
 import pytest
+from conftest import fake_response, incident_json, serve, serve_incident_pages
 from simple_rest_client.exceptions import AuthError, ClientError, NotFoundError
 
-from pyargus.async_client import AsyncClient
-from pyargus.models import Incident
+from pyargus.async_client import AsyncClient, async_paginated_query
+from pyargus.cache import AsyncReadCache
+from pyargus.models import Event, Incident
 from pyargus.time import now as utcnow
 
 
@@ -105,6 +109,154 @@ class TestAsyncSupportsHeartbeat:
         return client
 
 
+class TestAsyncPostIncidents:
+    @pytest.mark.asyncio
+    async def test_it_should_correlate_results_with_their_input(self):
+        client = AsyncClient("https://argus.example.org/api/v2", "token")
+        client.post_incident = AsyncMock(
+            side_effect=lambda incident: Incident(pk=incident.level)
+        )
+        incidents = [Incident(level=level) for level in range(1, 6)]
+        results = [r async for r in client.post_incidents(incidents, concurrency=2)]
+        assert len(results) == 5
+        for result in results:
+            assert result.item is incidents[result.index]
+            assert result.result.pk == result.item.level
+
+    @pytest.mark.asyncio
+    async def test_when_a_post_fails_it_should_not_fail_the_batch(self):
+        client = AsyncClient("https://argus.example.org/api/v2", "token")
+        client.post_incident = AsyncMock(
+            side_effect=[Incident(pk=1), ClientError("400", None), Incident(pk=3)]
+        )
+        incidents = [Incident(), Incident(), Incident()]
+        results = [r async for r in client.post_incidents(incidents, concurrency=1)]
+        assert [r.ok for r in results] == [True, False, True]
+        assert isinstance(results[1].error, ClientError)
+
+
+class TestAsyncFanOut:
+    @pytest.mark.asyncio
+    async def test_get_events_for_many_should_pair_events_with_incidents(self):
+        client = AsyncClient("https://argus.example.org/api/v2", "token")
+        client.get_incident_events = AsyncMock(
+            side_effect=lambda incident: [Event(incident=incident)]
+        )
+        results = [r async for r in client.get_events_for_many(range(10), 3)]
+        assert sorted(r.item for r in results) == list(range(10))
+        assert all(r.result[0].incident == r.item for r in results)
+        assert all(r.elapsed is not None for r in results)
+
+    @pytest.mark.asyncio
+    async def test_get_acknowledgements_for_many_should_report_failures(self):
+        client = AsyncClient("https://argus.example.org/api/v2", "token")
+        client.get_incident_acknowledgements = AsyncMock(
+            side_effect=[[], NotFoundError("404", None)]
+        )
+        results = [r async for r in client.get_acknowledgements_for_many([1, 2], 1)]
+        assert [r.ok for r in results] == [True, False]
+
+
+class TestAsyncStreamedIncidents:
+    @pytest.mark.asyncio
+    async def test_it_should_decode_incidents_across_pages(self):
+        client = AsyncClient("https://argus.example.org/api/v2", "token")
+        serve(client.api, serve_incident_pages, httpx.AsyncClient)
+        incidents = [i async for i in client.get_incidents(stream=True)]
+        assert [incident.pk for incident in incidents] == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_when_server_responds_with_an_error_it_should_raise(self):
+        client = AsyncClient("https://argus.example.org/api/v2", "token")
+        serve(client.api, lambda request: httpx.Response(404), httpx.AsyncClient)
+        with pytest.raises(NotFoundError):
+            [i async for i in client.get_incidents(stream=True)]
+
+
+class TestAsyncReadCache:
+    @pytest.mark.asyncio
+    async def test_concurrent_get_incident_calls_should_share_one_request(self):
+        client = self._client()
+        first, second = await asyncio.gather(
+            client.get_incident(1), client.get_incident(1)
+        )
+        assert first is second
+        client.api.incidents.retrieve.assert_awaited_once_with(1)
+
+    @pytest.mark.asyncio
+    async def test_when_event_is_posted_cached_events_should_be_dropped(self):
+        client = self._client()
+        client.api.events.create = AsyncMock(return_value=fake_response({"pk": 2}))
+        await client.get_incident_events(1)
+        await client.restart_incident(1)
+        await client.get_incident_events(1)
+        assert client.api.events.list.await_count == 2
+
+    @staticmethod
+    def _client():
+        client = AsyncClient(
+            "https://argus.example.org/api/v2", "token", read_cache=AsyncReadCache()
+        )
+        client.api.incidents.retrieve = AsyncMock(
+            return_value=fake_response(incident_json(pk=1))
+        )
+        client.api.events.list = AsyncMock(return_value=fake_response([]))
+        return client
+
+
+class TestAsyncPaginatedQuery:
+    @pytest.mark.asyncio
+    async def test_when_not_prefetching_it_should_produce_pages_in_order(self):
+        method = fake_async_paginated_method(pages=3)
+        results = [
+            results async for _response, results in async_paginated_query(method)
+        ]
+        assert results == [[0], [1], [2]]
+
+    @pytest.mark.asyncio
+    async def test_when_prefetching_it_should_produce_pages_in_order(self):
+        method = fake_async_paginated_method(pages=10)
+        results = [
+            results
+            async for _response, results in async_paginated_query(method, prefetch=2)
+        ]
+        assert results == [[page] for page in range(10)]
+
+    @pytest.mark.asyncio
+    async def test_when_prefetching_it_should_reraise_fetch_errors(self):
+        method = fake_async_paginated_method(pages=3, fail_on_page=1)
+        pages = async_paginated_query(method, prefetch=2)
+        await pages.__anext__()
+        with pytest.raises(NotFoundError):
+            await pages.__anext__()
+
+    @pytest.mark.asyncio
+    async def test_when_closed_early_it_should_stop_fetching_pages(self):
+        method = fake_async_paginated_method(pages=100)
+        pages = async_paginated_query(method, prefetch=2)
+        await pages.__anext__()
+        await pages.aclose()
+        calls = method.await_count
+        await asyncio.sleep(0.01)
+        assert method.await_count == calls < 100
+
+
+def fake_async_paginated_method(pages, fail_on_page=None):
+    """Returns an async mock API method that serves `pages` pages of a cursor
+    paginated result, each one containing just the page number.
+    """
+
+    async def get_page(params=None):
+        page = int(params["cursor"][0]) if params and "cursor" in params else 0
+        if page == fail_on_page:
+            raise NotFoundError("not found", None)
+        has_next = page + 1 < pages
+        next_url = f"https://argus.example.org/?cursor={page + 1}" if has_next else None
+        return fake_response({"next": next_url, "previous": None, "results": [page]})
+
+    return AsyncMock(side_effect=get_page)
+
+
 @pytest.fixture
 def async_api_client(argus_api_url, argus_source_system_token):
     return AsyncClient(argus_api_url, argus_source_system_token)
@@ -0,0 +1,180 @@
+import asyncio
+import math
+import threading
+import time
+
+import pytest
+
+from pyargus.batch import BatchResult, LatencyStats, map_concurrently, map_threaded
+
+
+class TestMapConcurrently:
+    @pytest.mark.asyncio
+    async def test_it_should_produce_a_result_for_every_item(self):
+        results = [result async for result in map_concurrently(double, range(10), 3)]
+        assert sorted((r.index, r.item, r.result) for r in results) == [
+            (i, i, i * 2) for i in range(10)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_it_should_never_exceed_the_concurrency_limit(self):
+        in_flight = 0
+        peak = 0
+
+        async def track(item):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+
+        async for _result in map_concurrently(track, range(20), 4):
+            pass
+        assert peak == 4
+
+    @pytest.mark.asyncio
+    async def test_when_an_item_fails_it_should_report_the_error_and_continue(self):
+        async def fail_on_odd(item):
+            if item % 2:
+                raise ValueError(item)
+            return item
+
+        results = [r async for r in map_concurrently(fail_on_odd, range(4), 2)]
+        failed = sorted(r.item for r in results if not r.ok)
+        assert failed == [1, 3]
+        assert all(isinstance(r.error, ValueError) for r in results if not r.ok)
+        assert sorted(r.result for r in results if r.ok) == [0, 2]
+
+    @pytest.mark.asyncio
+    async def test_it_should_accept_async_iterables(self):
+        async def numbers():
+            for i in range(3):
+                yield i
+
+        results = [r async for r in map_concurrently(double, numbers(), 2)]
+        assert sorted(r.result for r in results) == [0, 2, 4]
+
+    @pytest.mark.asyncio
+    async def test_when_closed_early_it_should_cancel_outstanding_calls(self):
+        started = []
+        cancelled = []
+
+        async def slow(item):
+            started.append(item)
+            try:
+                await asyncio.sleep(item)
+            except asyncio.CancelledError:
+                cancelled.append(item)
+                raise
+
+        results = map_concurrently(slow, [0, 10, 10], 3)
+        await results.__anext__()
+        await results.aclose()
+        assert cancelled == [10, 10]
+
+    @pytest.mark.asyncio
+    async def test_it_should_report_the_elapsed_time_of_each_call(self):
+        async def sleep(item):
+            await asyncio.sleep(item)
+
+        results = [r async for r in map_concurrently(sleep, [0.02, 0], 2)]
+        by_item = {r.item: r for r in results}
+        assert by_item[0.02].elapsed >= 0.02
+        assert 0 <= by_item[0].elapsed < 0.02
+
+    @pytest.mark.asyncio
+    async def test_when_concurrency_is_zero_it_should_raise(self):
+        with pytest.raises(ValueError):
+            await map_concurrently(double, [], 0).__anext__()
+
+
+class TestMapThreaded:
+    def test_it_should_produce_a_result_for_every_item(self):
+        results = list(map_threaded(lambda item: item * 2, range(10), 3))
+        assert sorted((r.index, r.item, r.result) for r in results) == [
+            (i, i, i * 2) for i in range(10)
+        ]
+
+    def test_it_should_run_calls_in_parallel(self):
+        barrier = threading.Barrier(4, timeout=1)
+        results = list(map_threaded(lambda item: barrier.wait(), range(4), 4))
+        assert all(r.ok for r in results)
+
+    def test_when_an_item_fails_it_should_report_the_error_and_continue(self):
+        def fail_on_odd(item):
+            if item % 2:
+                raise ValueError(item)
+            return item
+
+        results = list(map_threaded(fail_on_odd, range(4), 2))
+        assert sorted(r.item for r in results if not r.ok) == [1, 3]
+        assert sorted(r.result for r in results if r.ok) == [0, 2]
+
+    def test_when_a_call_times_out_it_should_report_a_timeout_error(self):
+        release = threading.Event()
+        try:
+            results = list(
+                map_threaded(
+                    lambda item: release.wait() if item else item, [0, 1], 2, 0.05
+                )
+            )
+        finally:
+            release.set()
+        by_item = {r.item: r for r in results}
+        assert by_item[0].ok
+        assert isinstance(by_item[1].error, TimeoutError)
+
+    def test_it_should_report_the_elapsed_time_of_failed_calls(self):
+        def fail(item):
+            time.sleep(0.01)
+            raise ValueError(item)
+
+        (result,) = map_threaded(fail, [1], 1)
+        assert not result.ok
+        assert result.elapsed >= 0.01
+
+    def test_when_closed_early_it_should_not_start_remaining_calls(self):
+        calls = []
+
+        def slow(item):
+            calls.append(item)
+            time.sleep(0.01)
+
+        results = map_threaded(slow, range(100), 2)
+        next(results)
+        results.close()
+        time.sleep(0.05)
+        assert len(calls) < 100
+
+
+class TestLatencyStats:
+    def test_it_should_summarize_recorded_latencies(self):
+        stats = LatencyStats()
+        for elapsed in (0.4, 0.1, 0.3, 0.2):
+            stats.add(elapsed)
+        assert stats.count == 4
+        assert stats.min == 0.1
+        assert stats.max == 0.4
+        assert stats.mean == pytest.approx(0.25)
+
+    def test_percentiles_should_use_the_nearest_rank(self):
+        stats = LatencyStats()
+        for elapsed in range(1, 101):
+            stats.add(elapsed)
+        assert stats.percentile(50) == 50
+        assert stats.percentile(95) == 95
+        assert stats.percentile(0) == 1
+
+    def test_it_should_count_errors_of_recorded_results(self):
+        stats = LatencyStats()
+        stats.record(BatchResult(0, "a", elapsed=0.1))
+        stats.record(BatchResult(1, "b", error=ValueError(), elapsed=0.2))
+        assert (stats.count, stats.errors) == (2, 1)
+
+    def test_when_empty_it_should_report_nan(self):
+        assert math.isnan(LatencyStats().percentile(50))
+        assert math.isnan(LatencyStats().mean)
+
+
+async def double(item):
+    return item * 2
@@ -0,0 +1,123 @@
+"""Tests for the pyargus.cache module"""
+
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from pyargus.cache import AsyncReadCache, ReadCache
+
+
+class TestReadCache:
+    def test_when_value_is_cached_it_should_not_fetch_again(self):
+        cache = ReadCache()
+        fetch = MagicMock(return_value="value")
+        assert cache.get("key", fetch) == "value"
+        assert cache.get("key", fetch) == "value"
+        fetch.assert_called_once()
+
+    def test_when_value_has_expired_it_should_fetch_again(self):
+        cache = ReadCache(ttl=1.0)
+        fetch = MagicMock(return_value="value")
+        with patch("pyargus.cache.time.monotonic", return_value=100.0):
+            cache.get("key", fetch)
+        with patch("pyargus.cache.time.monotonic", return_value=101.0):
+            cache.get("key", fetch)
+        assert fetch.call_count == 2
+
+    def test_when_full_it_should_evict_the_least_recently_used_value(self):
+        cache = ReadCache(maxsize=2)
+        cache.get("a", lambda: 1)
+        cache.get("b", lambda: 2)
+        cache.get("a", lambda: 1)  # makes "b" the least recently used
+        cache.get("c", lambda: 3)
+        fetch = MagicMock(return_value=2)
+        cache.get("b", fetch)
+        fetch.assert_called_once()
+        assert len(cache) == 2
+
+    def test_when_fetch_fails_it_should_not_cache_the_failure(self):
+        cache = ReadCache()
+        with pytest.raises(KeyError):
+            cache.get("key", MagicMock(side_effect=KeyError))
+        assert cache.get("key", lambda: "value") == "value"
+
+    def test_when_invalidated_it_should_fetch_again(self):
+        cache = ReadCache()
+        fetch = MagicMock(return_value="value")
+        cache.get(("incident", 1), fetch)
+        cache.invalidate_incident(1)
+        cache.get(("incident", 1), fetch)
+        assert fetch.call_count == 2
+
+    def test_concurrent_reads_of_the_same_key_should_be_coalesced(self):
+        cache = ReadCache()
+        release = threading.Event()
+        fetch = MagicMock(side_effect=lambda: release.wait() and "value")
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get("key", fetch)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert results == ["value"] * 5
+        fetch.assert_called_once()
+
+    def test_when_invalidated_in_flight_it_should_not_cache_the_result(self):
+        cache = ReadCache()
+
+        def fetch():
+            cache.invalidate("key")
+            return "stale"
+
+        assert cache.get("key", fetch) == "stale"
+        assert cache.get("key", lambda: "fresh") == "fresh"
+
+
+class TestAsyncReadCache:
+    @pytest.mark.asyncio
+    async def test_concurrent_reads_of_the_same_key_should_be_coalesced(self):
+        cache = AsyncReadCache()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            return "value"
+
+        fetch = AsyncMock(side_effect=fetch)
+        results = await asyncio.gather(*(cache.get("key", fetch) for _ in range(5)))
+        assert results == ["value"] * 5
+        fetch.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_when_value_is_cached_it_should_not_fetch_again(self):
+        cache = AsyncReadCache()
+        fetch = AsyncMock(return_value="value")
+        await cache.get("key", fetch)
+        assert await cache.get("key", fetch) == "value"
+        fetch.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_when_fetch_fails_it_should_not_cache_the_failure(self):
+        cache = AsyncReadCache()
+        with pytest.raises(KeyError):
+            await cache.get("key", AsyncMock(side_effect=KeyError))
+        assert await cache.get("key", AsyncMock(return_value="value")) == "value"
+
+    @pytest.mark.asyncio
+    async def test_cancelling_one_reader_should_not_cancel_the_fetch(self):
+        cache = AsyncReadCache()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            return "value"
+
+        first = asyncio.ensure_future(cache.get("key", fetch))
+        second = asyncio.ensure_future(cache.get("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "value"
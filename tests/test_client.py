@@ -1,11 +1,20 @@
 from collections.abc import Iterable
 from unittest.mock import MagicMock
 
+import httpx
 import pytest
+from conftest import fake_response, incident_json, serve, serve_incident_pages
 from simple_rest_client.exceptions import AuthError, ClientError, NotFoundError
 
-from pyargus.client import Client
-from pyargus.models import Incident
+from pyargus.cache import ReadCache
+from pyargus.client import Client, _prefetch_pages, paginated_query
+from pyargus.models import (
+    COMPACT_MODELS,
+    CompactIncident,
+    Event,
+    Incident,
+    SourceRegistry,
+)
 from pyargus.time import now as utcnow
 
 
@@ -94,6 +103,251 @@ class TestSupportsHeartbeat:
         return client
 
 
+class TestBatchOperations:
+    def test_resolve_incidents_should_resolve_every_incident(self):
+        client = Client("https://argus.example.org/api/v2", "token")
+        client.post_incident_event = MagicMock(
+            side_effect=lambda incident, event: Event(
+                incident=incident, type=event.type
+            )
+        )
+        results = list(client.resolve_incidents([1, 2, 3], description="Stale"))
+        assert sorted(r.result.incident for r in results) == [1, 2, 3]
+        assert all(r.result.type == "END" for r in results)
+
+    def test_resolve_incidents_should_use_the_same_timestamp_for_all(self):
+        client = Client("https://argus.example.org/api/v2", "token")
+        client.post_incident_event = MagicMock(side_effect=lambda _, event: event)
+        results = list(client.resolve_incidents([1, 2, 3]))
+        assert len({r.result.timestamp for r in results}) == 1
+
+    def test_get_events_for_should_correlate_events_with_incidents(self):
+        client = Client("https://argus.example.org/api/v2", "token")
+        client.get_incident_events = MagicMock(
+            side_effect=lambda incident: [Event(incident=incident)]
+        )
+        results = list(client.get_events_for([1, 2, 3], max_workers=2))
+        assert all(r.result[0].incident == r.item for r in results)
+
+    def test_get_acknowledgements_for_should_correlate_with_incidents(self):
+        client = Client("https://argus.example.org/api/v2", "token")
+        client.get_incident_acknowledgements = MagicMock(
+            side_effect=lambda incident: [incident]
+        )
+        results = list(client.get_acknowledgements_for([1, 2, 3], max_workers=2))
+        assert sorted(r.result[0] for r in results) == [1, 2, 3]
+
+    def test_post_incident_events_should_report_failures_per_event(self):
+        client = Client("https://argus.example.org/api/v2", "token")
+        client.post_incident_event = MagicMock(
+            side_effect=[Event(pk=1), ClientError("400", None)]
+        )
+        pairs = [(1, Event(type="ACK")), (2, Event(type="ACK"))]
+        results = list(client.post_incident_events(pairs, max_workers=1))
+        assert [r.ok for r in results] == [True, False]
+
+
+class TestSourceInterning:
+    def test_incidents_of_a_query_should_share_source_objects(self):
+        client = Client("https://argus.example.org/api/v2", "token")
+        client.api.incidents.list = MagicMock(
+            return_value=fake_response([incident_json(pk=1), incident_json(pk=2)])
+        )
+        first, second = client.get_incidents()
+        assert first.source is second.source
+
+    def test_when_given_a_registry_it_should_share_sources_across_queries(self):
+        client = Client(
+            "https://argus.example.org/api/v2",
+            "token",
+            source_registry=SourceRegistry(),
+        )
+        client.api.incidents.list = MagicMock(
+            return_value=fake_response([incident_json()])
+        )
+        client.api.incidents.retrieve = MagicMock(
+            return_value=fake_response(incident_json())
+        )
+        (listed,) = client.get_incidents()
+        assert client.get_incident(4).source is listed.source
+
+
+class TestStreamedIncidents:
+    def test_it_should_decode_incidents_across_pages(self):
+        client = Client("https://argus.example.org/api/v2", "token")
+        serve(client.api, serve_incident_pages)
+        incidents = list(client.get_incidents(open=True, stream=True))
+        assert [incident.pk for incident in incidents] == [1, 2, 3]
+        assert incidents[0] == Incident.from_json(incident_json(pk=1))
+
+    def test_it_should_send_filters_and_credentials(self):
+        client = Client("https://argus.example.org/api/v2", "token")
+        requests = serve(client.api, serve_incident_pages)
+        list(client.get_incidents(open=True, stream=True))
+        assert requests[0].url.params["open"] == "true"
+        assert requests[1].url.params["cursor"] == "2"
+        assert requests[0].headers["Authorization"] == "Token token"
+
+    def test_when_server_responds_with_an_error_it_should_raise(self):
+        client = Client("https://argus.example.org/api/v2", "token")
+        serve(client.api, lambda request: httpx.Response(401))
+        with pytest.raises(AuthError):
+            list(client.get_incidents(stream=True))
+
+    def test_when_combined_with_prefetch_it_should_raise(self):
+        client = Client("https://argus.example.org/api/v2", "token")
+        with pytest.raises(ValueError):
+            list(client.get_incidents(stream=True, prefetch=2))
+
+
+class TestReadCache:
+    def test_when_cached_get_incident_should_only_request_once(self):
+        client = self._client()
+        assert client.get_incident(1) == client.get_incident(1)
+        client.api.incidents.retrieve.assert_called_once_with(1)
+
+    def test_when_cached_get_incident_events_should_only_request_once(self):
+        client = self._client()
+        client.get_incident_events(1)
+        client.get_incident_events(1)
+        client.api.events.list.assert_called_once_with(1)
+
+    def test_when_incident_is_resolved_its_cached_reads_should_be_dropped(self):
+        client = self._client()
+        client.api.events.create = MagicMock(return_value=fake_response({"pk": 2}))
+        client.get_incident(1)
+        client.get_incident_events(1)
+        client.resolve_incident(1)
+        client.get_incident(1)
+        client.get_incident_events(1)
+        assert client.api.incidents.retrieve.call_count == 2
+        assert client.api.events.list.call_count == 2
+
+    def test_when_incident_is_updated_its_cached_reads_should_be_dropped(self):
+        client = self._client()
+        client.api.incidents.update = MagicMock(
+            return_value=fake_response(incident_json(pk=1))
+        )
+        incident = client.get_incident(1)
+        client.update_incident(incident)
+        client.get_incident(1)
+        assert client.api.incidents.retrieve.call_count == 2
+
+    def test_ids_given_as_strings_should_share_the_cached_reads(self):
+        client = self._client()
+        client.api.events.create = MagicMock(return_value=fake_response({"pk": 2}))
+        client.get_incident("1")
+        client.get_incident(1)
+        assert client.api.incidents.retrieve.call_count == 1
+        client.resolve_incident(1)
+        client.get_incident("1")
+        assert client.api.incidents.retrieve.call_count == 2
+
+    @staticmethod
+    def _client():
+        client = Client(
+            "https://argus.example.org/api/v2", "token", read_cache=ReadCache()
+        )
+        client.api.incidents.retrieve = MagicMock(
+            return_value=fake_response(incident_json(pk=1))
+        )
+        client.api.events.list = MagicMock(return_value=fake_response([]))
+        return client
+
+
+class TestModelSet:
+    def test_when_compact_models_are_selected_it_should_decode_into_them(self):
+        client = Client(
+            "https://argus.example.org/api/v2", "token", model_set=COMPACT_MODELS
+        )
+        client.api.incidents.retrieve = MagicMock(
+            return_value=fake_response(incident_json())
+        )
+        assert isinstance(client.get_incident(4), CompactIncident)
+
+    def test_it_should_accept_compact_incidents_as_arguments(self):
+        client = Client("https://argus.example.org/api/v2", "token")
+        client.api.events.list = MagicMock(return_value=fake_response([]))
+        client.get_incident_events(CompactIncident(pk=42))
+        client.api.events.list.assert_called_once_with(42)
+
+
+class TestPaginatedQuery:
+    def test_when_not_prefetching_it_should_produce_pages_in_order(self):
+        method = fake_paginated_method(pages=3)
+        results = [results for _response, results in paginated_query(method)]
+        assert results == [[0], [1], [2]]
+
+    def test_when_prefetching_it_should_produce_pages_in_order(self):
+        method = fake_paginated_method(pages=10)
+        results = [
+            results for _response, results in paginated_query(method, prefetch=2)
+        ]
+        assert results == [[page] for page in range(10)]
+
+    def test_when_prefetching_it_should_follow_next_page_cursors(self):
+        method = fake_paginated_method(pages=3)
+        list(paginated_query(method, params={"open": True}, prefetch=2))
+        assert [call.kwargs["params"] for call in method.call_args_list] == [
+            {"open": True},
+            {"cursor": ["1"]},
+            {"cursor": ["2"]},
+        ]
+
+    def test_when_prefetching_a_non_paginated_result_it_should_produce_it(self):
+        method = MagicMock(return_value=fake_response([1, 2, 3]))
+        assert list(paginated_query(method, prefetch=2)) == [
+            (method.return_value, [1, 2, 3])
+        ]
+
+    def test_when_prefetching_it_should_reraise_fetch_errors(self):
+        method = fake_paginated_method(pages=3, fail_on_page=1)
+        pages = paginated_query(method, prefetch=2)
+        next(pages)
+        with pytest.raises(NotFoundError):
+            next(pages)
+
+    def test_when_closed_early_it_should_stop_fetching_pages(self):
+        method = fake_paginated_method(pages=100)
+        pages = paginated_query(method, prefetch=2)
+        next(pages)
+        pages.close()
+        assert method.call_count < 100
+
+    def test_when_prefetching_it_should_reraise_any_fetch_exception(self):
+        class Interrupted(BaseException):
+            pass
+
+        method = MagicMock(side_effect=Interrupted)
+        with pytest.raises(Interrupted):
+            list(paginated_query(method, prefetch=2))
+
+    def test_when_prefetching_it_should_reraise_errors_from_closing_the_pages(self):
+        pages = MagicMock()
+        pages.__iter__.return_value = iter([1, 2])
+        pages.close.side_effect = OSError("connection reset")
+        prefetched = _prefetch_pages(pages, 2)
+        assert [next(prefetched), next(prefetched)] == [1, 2]
+        with pytest.raises(OSError):
+            next(prefetched)
+
+
+def fake_paginated_method(pages, fail_on_page=None):
+    """Returns a mock API method that serves `pages` pages of a cursor paginated
+    result, each one containing just the page number.
+    """
+
+    def get_page(params=None):
+        page = int(params["cursor"][0]) if params and "cursor" in params else 0
+        if page == fail_on_page:
+            raise NotFoundError("not found", None)
+        has_next = page + 1 < pages
+        next_url = f"https://argus.example.org/?cursor={page + 1}" if has_next else None
+        return fake_response({"next": next_url, "previous": None, "results": [page]})
+
+    return MagicMock(side_effect=get_page)
+
+
 @pytest.fixture
 def api_client(argus_api_url, argus_source_system_token):
     return Client(argus_api_url, argus_source_system_token)
@@ -0,0 +1,119 @@
+"""Tests for the pyargus.codec module"""
+
+import json
+
+import httpx
+import pytest
+from conftest import serve
+from simple_rest_client.exceptions import NotFoundError
+
+from pyargus import api, async_api
+from pyargus.codec import OrjsonCodec, StdlibCodec, get_codec
+
+
+class TestGetCodec:
+    def test_when_given_a_name_it_should_return_that_codec(self):
+        assert get_codec("json").name == "json"
+
+    def test_when_given_an_unknown_name_it_should_raise_value_error(self):
+        with pytest.raises(ValueError):
+            get_codec("yaml")
+
+    def test_when_no_name_is_given_it_should_return_an_available_codec(self):
+        codec = get_codec()
+        assert codec.decode(codec.encode({"pk": 1})) == {"pk": 1}
+
+    def test_when_no_name_is_given_it_should_prefer_a_fast_library(self):
+        pytest.importorskip("orjson")
+        assert get_codec().name in ("msgspec", "orjson")
+
+
+@pytest.mark.parametrize("codec_class", [StdlibCodec, OrjsonCodec])
+class TestCodecs:
+    def test_it_should_encode_to_bytes(self, codec_class):
+        codec = _make_codec(codec_class)
+        assert json.loads(codec.encode({"tags": [{"tag": "a=b"}]})) == {
+            "tags": [{"tag": "a=b"}]
+        }
+
+    def test_it_should_decode_bytes(self, codec_class):
+        codec = _make_codec(codec_class)
+        assert codec.decode(b'{"pk": 1, "details_url": ""}') == {
+            "pk": 1,
+            "details_url": "",
+        }
+
+
+class TestArgusResource:
+    def test_it_should_encode_request_bodies_with_its_codec(self):
+        codec = RecordingCodec()
+        argus = _connect(codec, _echo)
+        response = argus.incidents.create(body={"description": "foo"})
+        assert codec.encoded == [{"description": "foo"}]
+        assert response.body == {"description": "foo"}
+
+    def test_it_should_decode_response_bodies_with_its_codec(self):
+        codec = RecordingCodec()
+        argus = _connect(codec, _echo)
+        argus.incidents.retrieve(1)
+        assert codec.decoded == [b'{"method": "GET"}']
+
+    def test_it_should_raise_client_errors_like_simple_rest_client(self):
+        argus = _connect(StdlibCodec(), lambda request: httpx.Response(404))
+        with pytest.raises(NotFoundError):
+            argus.incidents.retrieve(1)
+
+    def test_it_should_not_decode_empty_bodies(self):
+        argus = _connect(RecordingCodec(), lambda request: httpx.Response(204))
+        assert argus.incidents.retrieve(1).body == b""
+
+
+class TestAsyncArgusResource:
+    @pytest.mark.asyncio
+    async def test_it_should_encode_and_decode_bodies_with_its_codec(self):
+        codec = RecordingCodec()
+        argus = async_api.async_connect(
+            "http://argus.test/api/v2", "token", 2.0, json_codec=codec
+        )
+        serve(argus, _echo, httpx.AsyncClient)
+        response = await argus.incidents.create(body={"description": "foo"})
+        assert codec.encoded == [{"description": "foo"}]
+        assert response.body == {"description": "foo"}
+
+
+class RecordingCodec(StdlibCodec):
+    """A codec that keeps track of what it has encoded and decoded"""
+
+    def __init__(self):
+        self.encoded = []
+        self.decoded = []
+
+    def encode(self, value):
+        self.encoded.append(value)
+        return super().encode(value)
+
+    def decode(self, data):
+        self.decoded.append(data)
+        return super().decode(data)
+
+
+def _make_codec(codec_class):
+    try:
+        return codec_class()
+    except ImportError:
+        pytest.skip(f"{codec_class.name} is not installed")
+
+
+def _echo(request: httpx.Request) -> httpx.Response:
+    """Responds with the request body, or a description of the request"""
+    content = request.content or json.dumps({"method": request.method}).encode()
+    return httpx.Response(200, content=content, headers=_JSON)
+
+
+_JSON = {"Content-Type": "application/json"}
+
+
+def _connect(codec, handler):
+    argus = api.connect("http://argus.test/api/v2", "token", json_codec=codec)
+    serve(argus, handler)
+    return argus
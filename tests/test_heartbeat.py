@@ -0,0 +1,204 @@
+"""Tests for the pyargus.heartbeat module"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from simple_rest_client.exceptions import AuthError
+
+from pyargus import api
+from pyargus.heartbeat import (
+    AsyncHeartbeatScheduler,
+    HeartbeatScheduler,
+    async_supports_heartbeat,
+    forget_heartbeat_support,
+    supports_heartbeat,
+)
+
+
+@pytest.fixture(autouse=True)
+def forget_support():
+    forget_heartbeat_support()
+    yield
+    forget_heartbeat_support()
+
+
+class TestSupportsHeartbeat:
+    def test_it_should_probe_each_server_only_once(self):
+        first, second = fake_client(), fake_client()
+        assert supports_heartbeat(first)
+        assert supports_heartbeat(second)
+        first.supports_heartbeat.assert_called_once()
+        second.supports_heartbeat.assert_not_called()
+
+    def test_it_should_probe_different_servers_separately(self):
+        first = fake_client(url="http://a.test/api/v2/")
+        second = fake_client(url="http://b.test/api/v2/", supported=False)
+        assert supports_heartbeat(first)
+        assert not supports_heartbeat(second)
+
+    def test_when_probe_fails_it_should_not_cache_anything(self):
+        client = fake_client()
+        client.supports_heartbeat.side_effect = [AuthError("401", None), True]
+        with pytest.raises(AuthError):
+            supports_heartbeat(client)
+        assert supports_heartbeat(client)
+
+    def test_forgetting_support_should_make_it_probe_again(self):
+        client = fake_client()
+        supports_heartbeat(client)
+        forget_heartbeat_support(client.api.api_root_url)
+        supports_heartbeat(client)
+        assert client.supports_heartbeat.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_async_probe_should_share_the_cache(self):
+        client = fake_async_client()
+        assert await async_supports_heartbeat(client)
+        assert supports_heartbeat(fake_client())
+        client.supports_heartbeat.assert_awaited_once()
+
+
+class TestHeartbeatScheduler:
+    def test_it_should_send_heartbeats_repeatedly(self):
+        client = fake_client()
+        with HeartbeatScheduler([client], interval=0.01, jitter=0) as scheduler:
+            wait_for(lambda: scheduler.metrics.sent >= 3)
+        assert client.send_heartbeat.call_count >= 3
+
+    def test_it_should_drop_clients_whose_server_lacks_heartbeats(self):
+        client = fake_client(supported=False)
+        with HeartbeatScheduler([client], interval=0.01) as scheduler:
+            wait_for(lambda: scheduler.metrics.unsupported == 1)
+        client.send_heartbeat.assert_not_called()
+        assert scheduler.metrics.sources == 0
+
+    def test_when_check_support_is_off_it_should_not_probe(self):
+        client = fake_client()
+        with HeartbeatScheduler([client], interval=0.01, check_support=False) as s:
+            wait_for(lambda: s.metrics.sent >= 1)
+        client.supports_heartbeat.assert_not_called()
+
+    def test_when_previous_heartbeat_is_in_progress_it_should_skip(self):
+        release = threading.Event()
+        client = fake_client()
+        client.send_heartbeat.side_effect = lambda: release.wait(5)
+        with HeartbeatScheduler([client], interval=0.01, jitter=0) as scheduler:
+            wait_for(lambda: scheduler.metrics.skipped >= 3)
+            release.set()
+        client.send_heartbeat.assert_called_once()
+
+    def test_failed_heartbeats_should_be_counted_and_not_stop_the_schedule(self):
+        client = fake_client()
+        client.send_heartbeat.side_effect = AuthError("403", None)
+        with HeartbeatScheduler([client], interval=0.01) as scheduler:
+            wait_for(lambda: scheduler.metrics.failed >= 2)
+
+    def test_removed_clients_should_get_no_more_heartbeats(self):
+        client = fake_client()
+        with HeartbeatScheduler([client], interval=0.01) as scheduler:
+            wait_for(lambda: scheduler.metrics.sent >= 1)
+            scheduler.remove(client)
+            sent = client.send_heartbeat.call_count
+            time.sleep(0.05)
+        assert client.send_heartbeat.call_count == sent
+
+    def test_clients_added_while_running_should_get_heartbeats(self):
+        client = fake_client()
+        with HeartbeatScheduler(interval=10) as scheduler:
+            time.sleep(0.01)
+            scheduler.add(client)
+            wait_for(lambda: scheduler.metrics.sent == 1)
+
+    def test_intervals_should_vary_by_at_most_the_jitter(self):
+        scheduler = HeartbeatScheduler(interval=10, jitter=0.2)
+        with patch("pyargus.heartbeat.random.uniform", side_effect=min):
+            assert scheduler._next_interval() == 8.0
+        with patch("pyargus.heartbeat.random.uniform", side_effect=max):
+            assert scheduler._next_interval() == 12.0
+
+    def test_when_jitter_is_out_of_range_it_should_raise(self):
+        with pytest.raises(ValueError):
+            HeartbeatScheduler(jitter=1)
+
+    def test_for_tokens_should_share_a_single_connection_pool(self):
+        scheduler = HeartbeatScheduler.for_tokens(
+            "http://argus.test/api/v2", ["foo", "bar"]
+        )
+        foo, bar = scheduler.clients
+        assert foo.api.sources.client is bar.api.sources.client
+        assert foo.api.sources.headers["Authorization"] == "Token foo"
+        assert bar.api.sources.headers["Authorization"] == "Token bar"
+        scheduler.close()
+        assert scheduler._transport._client is None
+
+    def test_for_tokens_should_not_close_a_given_transport(self):
+        transport = MagicMock(spec=api.TransportConfig)
+        HeartbeatScheduler.for_tokens(
+            "http://argus.test/api/v2", ["foo"], transport=transport
+        ).close()
+        transport.close.assert_not_called()
+
+
+class TestAsyncHeartbeatScheduler:
+    @pytest.mark.asyncio
+    async def test_it_should_send_heartbeats_repeatedly(self):
+        client = fake_async_client()
+        async with AsyncHeartbeatScheduler([client], interval=0.01) as scheduler:
+            await async_wait_for(lambda: scheduler.metrics.sent >= 3)
+
+    @pytest.mark.asyncio
+    async def test_it_should_drop_clients_whose_server_lacks_heartbeats(self):
+        client = fake_async_client(supported=False)
+        async with AsyncHeartbeatScheduler([client], interval=0.01) as scheduler:
+            await async_wait_for(lambda: scheduler.metrics.unsupported == 1)
+        client.send_heartbeat.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_when_previous_heartbeat_is_in_progress_it_should_skip(self):
+        release = asyncio.Event()
+        client = fake_async_client()
+        client.send_heartbeat.side_effect = release.wait
+        async with AsyncHeartbeatScheduler([client], interval=0.01) as scheduler:
+            await async_wait_for(lambda: scheduler.metrics.skipped >= 3)
+            release.set()
+        client.send_heartbeat.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_clients_added_while_running_should_get_heartbeats(self):
+        client = fake_async_client()
+        async with AsyncHeartbeatScheduler(interval=10) as scheduler:
+            await asyncio.sleep(0.01)
+            scheduler.add(client)
+            await async_wait_for(lambda: scheduler.metrics.sent == 1)
+
+
+def fake_client(url="http://argus.test/api/v2/", supported=True):
+    client = MagicMock()
+    client.api.api_root_url = url
+    client.supports_heartbeat.return_value = supported
+    return client
+
+
+def fake_async_client(url="http://argus.test/api/v2/", supported=True):
+    client = MagicMock()
+    client.api.api_root_url = url
+    client.supports_heartbeat = AsyncMock(return_value=supported)
+    client.send_heartbeat = AsyncMock()
+    return client
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+async def async_wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.001)
@@ -0,0 +1,71 @@
+"""Tests for the pyargus.index module"""
+
+import pytest
+from conftest import incident_json
+
+from pyargus.index import IncidentIndex
+from pyargus.mirror import ADDED, CLOSED, IncidentChange
+from pyargus.models import Incident
+
+
+def incident(pk, tags=None, **overrides) -> Incident:
+    tags = tags or {"host": f"host-{pk}"}
+    overrides["tags"] = [{"tag": f"{key}={value}"} for key, value in tags.items()]
+    return Incident.from_json(incident_json(pk=pk, **overrides))
+
+
+@pytest.fixture
+def index():
+    return IncidentIndex(
+        [
+            incident(1, {"host": "a", "port": "1"}, level=1, open=True, acked=False),
+            incident(2, {"host": "a", "port": "2"}, level=3, open=True, acked=True),
+            incident(3, {"host": "b"}, level=5, open=False, acked=False),
+        ]
+    )
+
+
+def pks(incidents):
+    return [incident.pk for incident in incidents]
+
+
+class TestIncidentIndex:
+    def test_when_querying_by_tag_it_should_return_matching_incidents(self, index):
+        assert pks(index.query(tags={"host": "a"})) == [1, 2]
+
+    def test_when_querying_by_several_tags_all_should_match(self, index):
+        assert pks(index.query(tags={"host": "a", "port": "2"})) == [2]
+
+    def test_when_querying_by_source_name_it_should_match(self, index):
+        name = index.get(1).source.name
+        assert pks(index.query(source=name)) == [1, 2, 3]
+        assert index.query(source="no-such-source") == []
+
+    def test_when_querying_by_source_object_it_should_match_its_pk(self, index):
+        assert pks(index.query(source=index.get(1).source)) == [1, 2, 3]
+
+    def test_when_querying_by_max_level_it_should_include_lower_levels(self, index):
+        assert pks(index.query(max_level=3)) == [1, 2]
+
+    def test_compound_queries_should_intersect_all_criteria(self, index):
+        assert pks(index.query(tags={"host": "a"}, open=True, acked=False)) == [1]
+        assert index.query(tags={"host": "b"}, open=True) == []
+
+    def test_when_querying_without_criteria_it_should_return_everything(self, index):
+        assert pks(index.query()) == [1, 2, 3]
+
+    def test_when_an_incident_is_replaced_its_old_keys_should_be_dropped(self, index):
+        index.add(incident(1, {"host": "c"}, level=1, open=True, acked=True))
+        assert pks(index.query(tags={"host": "a"})) == [2]
+        assert pks(index.query(tags={"host": "c"}, acked=True)) == [1]
+        assert len(index) == 3
+
+    def test_when_an_incident_is_removed_it_should_not_match(self, index):
+        index.remove(2)
+        assert pks(index.query(tags={"host": "a"})) == [1]
+        assert 2 not in index
+
+    def test_it_should_follow_mirror_changes(self, index):
+        index.apply_change(IncidentChange(ADDED, incident(4, {"host": "a"})))
+        index.apply_change(IncidentChange(CLOSED, index.get(1)))
+        assert pks(index.query(tags={"host": "a"})) == [2, 4]
@@ -0,0 +1,235 @@
+"""Tests for the pyargus.instrumentation module"""
+
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from conftest import incident_json, serve
+from simple_rest_client.exceptions import ClientConnectionError, NotFoundError
+
+from pyargus import api, async_api, models
+from pyargus.async_client import AsyncClient
+from pyargus.client import Client, streamed_query
+from pyargus.instrumentation import (
+    CompositeObserver,
+    MetricsCollector,
+    ObservedModel,
+    OpenTelemetryObserver,
+    RequestInfo,
+    observe_models,
+)
+
+
+class TestMetricsCollector:
+    def test_it_should_count_requests_by_endpoint_and_status(self):
+        collector = MetricsCollector()
+        collector.request_finished(request_info(status_code=200))
+        collector.request_finished(request_info(status_code=200))
+        collector.request_finished(request_info(status_code=None))
+        metrics = collector.render()
+        assert (
+            'argus_client_requests_total{resource="incidents",action="list",'
+            'method="GET",status="200"} 2'
+        ) in metrics
+        assert 'status="error"} 1' in metrics
+
+    def test_it_should_render_a_cumulative_duration_histogram(self):
+        collector = MetricsCollector(buckets=(0.1, 1.0))
+        for elapsed in (0.05, 0.5, 5.0):
+            collector.request_finished(request_info(elapsed=elapsed))
+        lines = collector.render().splitlines()
+        name = "argus_client_request_duration_seconds"
+        labels = 'resource="incidents",action="list"'
+        assert f'{name}_bucket{{{labels},le="0.1"}} 1' in lines
+        assert f'{name}_bucket{{{labels},le="1.0"}} 2' in lines
+        assert f'{name}_bucket{{{labels},le="+Inf"}} 3' in lines
+        assert f"{name}_count{{{labels}}} 3" in lines
+        assert f"{name}_sum{{{labels}}} 5.55" in lines
+
+    def test_it_should_sum_bytes_and_decode_times(self):
+        collector = MetricsCollector()
+        collector.request_finished(request_info(response_bytes=100, decode_time=0.5))
+        collector.request_finished(request_info(response_bytes=50, decode_time=0.25))
+        metrics = collector.render()
+        labels = '{resource="incidents",action="list"}'
+        assert f"argus_client_response_bytes_total{labels} 150" in metrics
+        assert f"argus_client_json_decode_seconds_total{labels} 0.75" in metrics
+
+    def test_it_should_count_decoded_models(self):
+        collector = MetricsCollector()
+        collector.model_decoded(models.Incident, 0.001)
+        collector.model_decoded(models.Incident, 0.001)
+        metrics = collector.render()
+        assert 'argus_client_models_decoded_total{model="Incident"} 2' in metrics
+
+    def test_clear_should_reset_all_metrics(self):
+        collector = MetricsCollector()
+        collector.request_finished(request_info())
+        collector.clear()
+        assert "incidents" not in collector.render()
+
+
+class TestCompositeObserver:
+    def test_it_should_pass_measurements_to_all_observers(self):
+        first, second = MagicMock(), MagicMock()
+        observer = CompositeObserver(first, second)
+        info = request_info()
+        observer.request_finished(info)
+        observer.model_decoded(models.Event, 0.1)
+        for child in (first, second):
+            child.request_finished.assert_called_once_with(info)
+            child.model_decoded.assert_called_once_with(models.Event, 0.1)
+
+
+class TestOpenTelemetryObserver:
+    def test_it_should_record_a_span_per_request(self):
+        tracer = MagicMock()
+        observer = OpenTelemetryObserver(tracer)
+        observer.request_finished(request_info(started=10.0, elapsed=0.5))
+        name = tracer.start_span.call_args[0][0]
+        kwargs = tracer.start_span.call_args[1]
+        assert name == "GET incidents.list"
+        assert kwargs["start_time"] == 10_000_000_000
+        assert kwargs["attributes"]["http.response.status_code"] == 200
+        tracer.start_span.return_value.end.assert_called_once_with(
+            end_time=10_500_000_000
+        )
+
+    def test_when_request_failed_it_should_record_the_exception(self):
+        tracer = MagicMock()
+        error = ClientConnectionError("boom")
+        OpenTelemetryObserver(tracer).request_finished(
+            request_info(status_code=None, error=error)
+        )
+        span = tracer.start_span.return_value
+        span.record_exception.assert_called_once_with(error)
+
+
+class TestObservedModel:
+    def test_from_json_should_report_the_decoding_time(self):
+        observer = MagicMock()
+        model = ObservedModel(models.Incident, observer)
+        incident = model.from_json(incident_json())
+        assert type(incident) is models.Incident
+        observer.model_decoded.assert_called_once()
+        assert observer.model_decoded.call_args[0][0] is models.Incident
+
+    def test_it_should_otherwise_behave_like_the_model_class(self):
+        model = ObservedModel(models.Event, MagicMock())
+        assert model.__name__ == "Event"
+        assert isinstance(model(type="ACK"), models.Event)
+
+    def test_observe_models_should_leave_source_systems_alone(self):
+        model_set = observe_models(models.DEFAULT_MODELS, MagicMock())
+        assert model_set.source_system is models.SourceSystem
+        assert isinstance(model_set.incident, ObservedModel)
+
+
+class TestObservedResources:
+    def test_it_should_report_successful_requests(self):
+        observer = MagicMock()
+        argus = connect(observer, lambda request: httpx.Response(200, json=[1, 2]))
+        argus.events.list(1)
+        info = observer.request_finished.call_args[0][0]
+        assert (info.resource, info.action, info.method) == ("events", "list", "GET")
+        assert info.status_code == 200
+        assert info.response_bytes == len(b"[1,2]")
+        assert info.elapsed > 0
+        assert info.decode_time > 0
+        assert info.error is None
+
+    def test_it_should_report_the_size_of_request_bodies(self):
+        observer = MagicMock()
+        argus = connect(observer, lambda request: httpx.Response(201, json={}))
+        argus.events.create(1, body={"type": "ACK"})
+        info = observer.request_finished.call_args[0][0]
+        assert info.request_bytes == len(
+            argus.events.json_codec.encode({"type": "ACK"})
+        )
+
+    def test_it_should_report_error_responses(self):
+        observer = MagicMock()
+        argus = connect(observer, lambda request: httpx.Response(404, json={}))
+        with pytest.raises(NotFoundError):
+            argus.incidents.retrieve(1)
+        info = observer.request_finished.call_args[0][0]
+        assert info.status_code == 404
+        assert isinstance(info.error, NotFoundError)
+
+    def test_it_should_report_connection_errors(self):
+        def refuse(request):
+            raise httpx.ConnectError("refused")
+
+        observer = MagicMock()
+        argus = connect(observer, refuse)
+        with pytest.raises(ClientConnectionError):
+            argus.incidents.retrieve(1)
+        info = observer.request_finished.call_args[0][0]
+        assert info.status_code is None
+        assert isinstance(info.error, ClientConnectionError)
+
+    def test_it_should_report_streamed_requests(self):
+        observer = MagicMock()
+        page = {"next": None, "results": [1, 2]}
+        argus = connect(observer, lambda request: httpx.Response(200, json=page))
+        assert list(streamed_query(argus.incidents, "list")) == [1, 2]
+        info = observer.request_finished.call_args[0][0]
+        assert (info.resource, info.action, info.status_code) == (
+            "incidents",
+            "list",
+            200,
+        )
+        assert info.response_bytes == len(httpx.Response(200, json=page).content)
+        assert info.decode_time > 0
+        assert info.error is None
+
+    @pytest.mark.asyncio
+    async def test_it_should_report_async_requests(self):
+        observer = MagicMock()
+        argus = async_api.async_connect(
+            "http://argus.test/api/v2", "token", observer=observer
+        )
+        serve(argus, lambda request: httpx.Response(200, json=[]), httpx.AsyncClient)
+        await argus.events.list(1)
+        info = observer.request_finished.call_args[0][0]
+        assert info.status_code == 200
+
+
+class TestObservedClients:
+    def test_client_should_report_decoded_models(self):
+        observer = MagicMock()
+        client = Client("http://argus.test/api/v2", "token", observer=observer)
+        serve(client.api, lambda request: httpx.Response(200, json=incident_json()))
+        assert isinstance(client.get_incident(1), models.Incident)
+        observer.request_finished.assert_called_once()
+        observer.model_decoded.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_async_client_should_report_decoded_models(self):
+        observer = MagicMock()
+        client = AsyncClient("http://argus.test/api/v2", "token", observer=observer)
+        serve(
+            client.api,
+            lambda request: httpx.Response(200, json=incident_json()),
+            httpx.AsyncClient,
+        )
+        assert isinstance(await client.get_incident(1), models.Incident)
+        observer.model_decoded.assert_called_once()
+
+
+def request_info(**overrides) -> RequestInfo:
+    attributes = dict(
+        resource="incidents",
+        action="list",
+        method="GET",
+        url="http://argus.test/api/v2/incidents/",
+        status_code=200,
+    )
+    attributes.update(overrides)
+    return RequestInfo(**attributes)
+
+
+def connect(observer, handler):
+    argus = api.connect("http://argus.test/api/v2", "token", observer=observer)
+    serve(argus, handler)
+    return argus
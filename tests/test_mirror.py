@@ -0,0 +1,212 @@
+"""Tests for the pyargus.mirror module"""
+
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from conftest import incident_json
+from simple_rest_client.exceptions import NotFoundError
+
+from pyargus.mirror import (
+    ADDED,
+    CLOSED,
+    DEFAULT_FULL_SYNC_INTERVAL,
+    UPDATED,
+    AsyncIncidentMirror,
+    IncidentChange,
+    IncidentMirror,
+)
+from pyargus.models import Incident
+from pyargus.store import IncidentStore
+
+
+def incident(pk, **overrides) -> Incident:
+    overrides.setdefault("open", True)
+    return Incident.from_json(incident_json(pk=pk, **overrides))
+
+
+class TestIncidentMirror:
+    def test_when_first_synced_it_should_fetch_all_open_incidents(self):
+        client = fake_client([[incident(1), incident(2)]])
+        mirror = IncidentMirror(client, source__id__in=3)
+        changes = mirror.sync()
+        client.get_incidents.assert_called_once_with(source__id__in=3, open=True)
+        assert [change.kind for change in changes] == [ADDED, ADDED]
+        assert 1 in mirror and 2 in mirror
+
+    def test_when_synced_again_it_should_only_fetch_the_delta(self):
+        client = fake_client([[incident(1)], [incident(2)], []])
+        mirror = IncidentMirror(client)
+        mirror.sync()
+        mirror.sync()
+        opened, closed = client.get_incidents.call_args_list[1:]
+        assert opened.kwargs["open"] is True
+        assert "start_time__gte" in opened.kwargs
+        assert closed.kwargs["open"] is False
+        assert "end_time__gte" in closed.kwargs
+        assert len(mirror) == 2
+
+    def test_when_an_incident_is_closed_it_should_be_removed(self):
+        closed = incident(1, open=False)
+        client = fake_client([[incident(1)], [], [closed]])
+        mirror = IncidentMirror(client)
+        mirror.sync()
+        assert mirror.sync() == [IncidentChange(CLOSED, closed)]
+        assert 1 not in mirror
+
+    def test_when_fully_resynced_it_should_close_missing_incidents(self):
+        client = fake_client([[incident(1), incident(2)], [incident(2)]])
+        mirror = IncidentMirror(client)
+        mirror.sync()
+        changes = mirror.sync(full=True)
+        assert [(change.kind, change.incident.pk) for change in changes] == [
+            (CLOSED, 1)
+        ]
+
+    def test_when_a_full_sync_is_due_it_should_pick_up_reopened_incidents(self):
+        reopened = incident(2, start_time="2020-01-01T00:00:00+00:00")
+        client = fake_client([[incident(1)], [incident(1), reopened]])
+        mirror = IncidentMirror(client)
+        mirror.sync()
+        with patch("pyargus.mirror.utcnow") as utcnow:
+            utcnow.return_value = mirror.last_synced + DEFAULT_FULL_SYNC_INTERVAL
+            changes = mirror.sync()
+        client.get_incidents.assert_called_with(open=True)
+        assert changes == [IncidentChange(ADDED, reopened)]
+        assert mirror.last_full_synced == mirror.last_synced
+
+    def test_when_no_full_sync_is_due_it_should_only_fetch_the_delta(self):
+        client = fake_client([[incident(1)], [], []])
+        mirror = IncidentMirror(client, full_sync_interval=timedelta(hours=1))
+        mirror.sync()
+        mirror.sync()
+        assert "start_time__gte" in client.get_incidents.call_args_list[1].kwargs
+
+    def test_when_full_syncs_are_turned_off_it_should_only_fetch_the_delta(self):
+        client = fake_client([[incident(1)], [], []])
+        mirror = IncidentMirror(client, full_sync_interval=None)
+        mirror.sync()
+        with patch("pyargus.mirror.utcnow") as utcnow:
+            utcnow.return_value = mirror.last_synced + timedelta(days=30)
+            mirror.sync()
+        assert "start_time__gte" in client.get_incidents.call_args_list[1].kwargs
+
+    def test_when_an_incident_has_changed_it_should_report_an_update(self):
+        client = fake_client([[incident(1)], [incident(1, level=1)], []])
+        mirror = IncidentMirror(client)
+        mirror.sync()
+        assert [change.kind for change in mirror.sync()] == [UPDATED]
+        assert mirror.get(1).level == 1
+
+    def test_when_nothing_has_changed_it_should_report_nothing(self):
+        client = fake_client([[incident(1)], [incident(1)], []])
+        mirror = IncidentMirror(client)
+        mirror.sync()
+        assert mirror.sync() == []
+
+    def test_subscribers_should_be_notified_of_changes(self):
+        callback = MagicMock()
+        mirror = IncidentMirror(fake_client([[incident(1)]]))
+        mirror.subscribe(callback)
+        mirror.sync()
+        callback.assert_called_once_with(IncidentChange(ADDED, incident(1)))
+
+    def test_unsubscribed_callbacks_should_not_be_notified(self):
+        callback = MagicMock()
+        mirror = IncidentMirror(fake_client([[incident(1)]]))
+        mirror.subscribe(callback)
+        mirror.unsubscribe(callback)
+        mirror.sync()
+        callback.assert_not_called()
+
+    def test_when_refreshing_it_should_update_from_get_incident(self):
+        client = fake_client([[incident(1)]])
+        client.get_incident.return_value = incident(1, acked=True)
+        mirror = IncidentMirror(client)
+        mirror.sync()
+        assert [change.kind for change in mirror.refresh(1)] == [UPDATED]
+        assert mirror.get(1).acked
+
+    def test_when_a_refreshed_incident_is_gone_it_should_be_closed(self):
+        client = fake_client([[incident(1)]])
+        client.get_incident.side_effect = NotFoundError("gone", MagicMock())
+        mirror = IncidentMirror(client)
+        mirror.sync()
+        assert [change.kind for change in mirror.refresh(1)] == [CLOSED]
+        assert len(mirror) == 0
+
+
+class TestPersistentIncidentMirror:
+    def test_when_synced_it_should_write_changes_to_the_store(self):
+        closed = incident(1, open=False)
+        with IncidentStore(":memory:") as store:
+            mirror = IncidentMirror(
+                fake_client([[incident(1), incident(2)], [], [closed]]), store=store
+            )
+            mirror.sync()
+            mirror.sync()
+            assert [i.pk for i in store.incidents(open=True)] == [2]
+            assert store.get_incident(1) == closed
+            assert store.last_synced == mirror.last_synced
+
+    def test_when_warmed_up_from_a_store_it_should_only_fetch_the_delta(self):
+        with IncidentStore(":memory:") as store:
+            IncidentMirror(fake_client([[incident(1)]]), store=store).sync()
+            client = fake_client([[incident(2)], []])
+            mirror = IncidentMirror(client, store=store)
+            assert 1 in mirror
+            mirror.sync()
+            assert "start_time__gte" in client.get_incidents.call_args_list[0].kwargs
+            assert len(mirror) == 2
+
+    def test_when_an_incident_leaves_the_mirror_it_should_leave_the_store(self):
+        with IncidentStore(":memory:") as store:
+            client = fake_client([[incident(1)], []])
+            mirror = IncidentMirror(client, store=store)
+            mirror.sync()
+            mirror.sync(full=True)
+            assert 1 not in store
+
+
+class TestAsyncIncidentMirror:
+    @pytest.mark.asyncio
+    async def test_when_synced_twice_it_should_fetch_all_then_the_delta(self):
+        closed = incident(1, open=False)
+        client = fake_async_client([[incident(1)], [incident(2)], [closed]])
+        mirror = AsyncIncidentMirror(client)
+        await mirror.sync()
+        changes = await mirror.sync()
+        assert [(change.kind, change.incident.pk) for change in changes] == [
+            (ADDED, 2),
+            (CLOSED, 1),
+        ]
+        assert list(mirror) == [incident(2)]
+
+    @pytest.mark.asyncio
+    async def test_when_refreshing_it_should_update_from_get_incident(self):
+        client = fake_async_client([[incident(1)]])
+        client.get_incident = AsyncMock(return_value=incident(1, open=False))
+        mirror = AsyncIncidentMirror(client)
+        await mirror.sync()
+        assert [change.kind for change in await mirror.refresh(1)] == [CLOSED]
+
+
+def fake_client(listings: list) -> MagicMock:
+    """Returns a fake Client that serves each listing from consecutive calls to
+    get_incidents()
+    """
+    client = MagicMock()
+    client.get_incidents.side_effect = [iter(listing) for listing in listings]
+    return client
+
+
+def fake_async_client(listings: list) -> MagicMock:
+    """Async version of fake_client()"""
+
+    async def serve(listing):
+        for item in listing:
+            yield item
+
+    client = MagicMock()
+    client.get_incidents.side_effect = [serve(listing) for listing in listings]
+    return client
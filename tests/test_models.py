@@ -0,0 +1,259 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from conftest import event_json, incident_json
+
+from pyargus.models import (
+    STATELESS,
+    Acknowledgement,
+    CompactAcknowledgement,
+    CompactEvent,
+    CompactIncident,
+    CompactSourceSystem,
+    Event,
+    ExpiringToken,
+    Incident,
+    LazyIncident,
+    SourceRegistry,
+    SourceSystem,
+)
+from pyargus.time import LOCAL_INFINITY
+
+
+class TestIncidentFromJson:
+    def test_it_should_decode_all_attributes(self):
+        incident = Incident.from_json(incident_json())
+        assert incident == Incident(
+            pk=4,
+            start_time=datetime(
+                2021, 4, 4, 16, 37, 43, 293726, tzinfo=timezone(timedelta(hours=2))
+            ),
+            end_time=LOCAL_INFINITY,
+            source=SourceSystem(
+                pk=2, name="testnav", type="nav", user=3, base_url="http://localhost/"
+            ),
+            source_incident_id="202430",
+            details_url="http://localhost/search/event/202430",
+            description="uninett-gsw2 BGP session is DOWN",
+            level=5,
+            ticket_url="",
+            tags={"host": "uninett-gsw2.uninett.no", "url": "http://x/?a=b"},
+            stateful=True,
+            open=True,
+            acked=False,
+            metadata={},
+        )
+
+    def test_when_end_time_is_null_it_should_be_stateless(self):
+        incident = Incident.from_json(incident_json(end_time=None))
+        assert incident.end_time is STATELESS
+
+    def test_when_end_time_is_a_timestamp_it_should_be_parsed(self):
+        incident = Incident.from_json(incident_json(end_time="2021-04-05T10:00:00Z"))
+        assert incident.end_time == datetime(2021, 4, 5, 10, tzinfo=timezone.utc)
+
+    def test_it_should_ignore_unknown_attributes(self):
+        incident = Incident.from_json(incident_json(search_text="foo"))
+        assert not hasattr(incident, "search_text")
+
+    def test_it_should_not_modify_its_input(self):
+        data = incident_json()
+        Incident.from_json(data)
+        assert data == incident_json()
+
+
+class TestEventFromJson:
+    def test_it_should_decode_all_attributes(self):
+        event = Event.from_json(event_json())
+        assert event == Event(
+            pk=10,
+            actor="testnav",
+            description="The demolition was cancelled",
+            incident=8,
+            received=datetime(2021, 4, 22, 9, 47, 11, 978438, tzinfo=timezone.utc),
+            timestamp=datetime(2021, 4, 22, 9, 47, 11, 946076, tzinfo=timezone.utc),
+            type="END",
+        )
+
+    def test_when_actor_is_missing_it_should_be_none(self):
+        data = event_json()
+        del data["actor"]
+        assert Event.from_json(data).actor is None
+
+
+class TestAcknowledgementFromJson:
+    def test_it_should_decode_all_attributes(self):
+        ack = Acknowledgement.from_json(
+            {"pk": 1, "event": event_json(), "expiration": None}
+        )
+        assert ack == Acknowledgement(
+            pk=1, event=Event.from_json(event_json()), expiration=None
+        )
+
+
+class TestExpiringTokenFromJson:
+    def test_it_should_decode_the_token_and_its_expiration(self):
+        token = ExpiringToken.from_json(
+            {"token": "6f2b0e1c9a", "expiration": "2024-03-01T12:00:00+00:00"}
+        )
+        assert token == ExpiringToken(
+            expiration=datetime(2024, 3, 1, 12, tzinfo=timezone.utc), token="6f2b0e1c9a"
+        )
+
+
+class TestSourceRegistry:
+    def test_incidents_from_the_same_source_should_share_a_source_object(self):
+        sources = SourceRegistry()
+        first = Incident.from_json(incident_json(pk=1), sources)
+        second = Incident.from_json(incident_json(pk=2), sources)
+        assert first.source is second.source
+
+    def test_interned_incident_should_equal_a_regular_incident(self):
+        sources = SourceRegistry()
+        assert Incident.from_json(incident_json(), sources) == Incident.from_json(
+            incident_json()
+        )
+
+    def test_when_a_source_has_changed_it_should_be_decoded_anew(self):
+        sources = SourceRegistry()
+        first = Incident.from_json(incident_json(), sources)
+        renamed = incident_json()
+        renamed["source"]["name"] = "renamed"
+        second = Incident.from_json(renamed, sources)
+        assert second.source.name == "renamed"
+        assert first.source.name == "testnav"
+        assert sources.get(2) is second.source
+
+    def test_it_should_look_up_sources_by_name(self):
+        sources = SourceRegistry()
+        incident = Incident.from_json(incident_json(), sources)
+        assert sources.by_name("testnav") is incident.source
+        assert sources.by_name("unknown") is None
+
+    def test_when_a_source_is_renamed_its_old_name_should_be_forgotten(self):
+        sources = SourceRegistry()
+        Incident.from_json(incident_json(), sources)
+        renamed = incident_json()
+        renamed["source"]["name"] = "renamed"
+        incident = Incident.from_json(renamed, sources)
+        assert sources.by_name("testnav") is None
+        assert sources.by_name("renamed") is incident.source
+
+    def test_names_should_stay_consistent_when_shared_by_threads(self):
+        sources = SourceRegistry()
+
+        def decode(i):
+            data = incident_json()
+            pk, name = i % 4, f"{i % 4}-{i % 7}"
+            data["source"] = {**data["source"], "pk": pk, "name": name}
+            return Incident.from_json(data, sources)
+
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(decode, range(2000)))
+        assert len(sources._names) == len(sources)
+        assert all(sources.by_name(source.name) is source for source in sources)
+
+    def test_it_should_decode_into_the_given_source_class(self):
+        sources = SourceRegistry(CompactSourceSystem)
+        incident = CompactIncident.from_json(incident_json(), sources)
+        assert isinstance(incident.source, CompactSourceSystem)
+        assert list(sources) == [incident.source]
+
+
+class TestCompactModels:
+    def test_compact_incident_should_not_have_an_instance_dict(self):
+        incident = CompactIncident.from_json(incident_json())
+        assert not hasattr(incident, "__dict__")
+
+    def test_compact_incident_should_decode_the_same_attributes(self):
+        regular = Incident.from_json(incident_json())
+        compact = CompactIncident.from_json(incident_json())
+        assert repr(compact) == "Compact" + repr(regular).replace(
+            "source=SourceSystem", "source=CompactSourceSystem"
+        )
+
+    def test_compact_incident_should_decode_a_compact_source(self):
+        compact = CompactIncident.from_json(incident_json())
+        assert isinstance(compact.source, CompactSourceSystem)
+
+    def test_compact_incident_should_serialize_like_a_regular_incident(self):
+        regular = Incident.from_json(incident_json())
+        compact = CompactIncident.from_json(incident_json())
+        assert compact.to_json() == regular.to_json()
+
+    def test_compact_event_should_serialize_like_a_regular_event(self):
+        regular = Event.from_json(event_json())
+        compact = CompactEvent.from_json(event_json())
+        assert compact.to_json() == regular.to_json()
+
+    def test_compact_acknowledgement_should_decode_a_compact_event(self):
+        ack = CompactAcknowledgement.from_json(
+            {"pk": 1, "event": event_json(), "expiration": None}
+        )
+        assert isinstance(ack.event, CompactEvent)
+
+    def test_compact_model_should_use_regular_defaults(self):
+        assert CompactIncident() == CompactIncident(pk=None, tags=None)
+
+
+class TestLazyIncident:
+    def test_it_should_have_the_attributes_of_a_decoded_incident(self):
+        lazy = LazyIncident.from_json(incident_json())
+        assert lazy.to_incident() == Incident.from_json(incident_json())
+
+    def test_it_should_compare_equal_to_a_decoded_incident(self):
+        lazy = LazyIncident.from_json(incident_json())
+        assert lazy == Incident.from_json(incident_json())
+        assert Incident.from_json(incident_json()) == lazy
+        assert lazy != Incident.from_json(incident_json(level=1))
+
+    def test_it_should_compare_equal_to_a_compact_incident(self):
+        lazy = LazyIncident.from_json(incident_json())
+        assert lazy == CompactIncident.from_json(incident_json())
+        assert CompactIncident.from_json(incident_json()) == lazy
+        assert lazy != CompactIncident.from_json(incident_json(level=1))
+
+    def test_it_should_not_compare_equal_to_other_models(self):
+        assert LazyIncident.from_json({"pk": 1}) != SourceSystem(pk=1)
+
+    def test_it_should_decode_its_source_into_the_given_class(self):
+        lazy = LazyIncident.from_json(incident_json(), source_class=CompactSourceSystem)
+        assert isinstance(lazy.source, CompactSourceSystem)
+
+    def test_it_should_only_decode_accessed_attributes(self):
+        lazy = LazyIncident.from_json(incident_json(start_time="not a timestamp"))
+        assert (lazy.pk, lazy.level, lazy.open) == (4, 5, True)
+
+    def test_it_should_decode_each_attribute_only_once(self):
+        lazy = LazyIncident.from_json(incident_json())
+        assert lazy.source is lazy.source
+        assert lazy.tags is lazy.tags
+
+    def test_it_should_serialize_like_a_decoded_incident(self):
+        lazy = LazyIncident.from_json(incident_json(end_time=None))
+        assert (
+            lazy.to_json() == Incident.from_json(incident_json(end_time=None)).to_json()
+        )
+
+    def test_assigned_attributes_should_be_serialized(self):
+        lazy = LazyIncident.from_json(incident_json())
+        lazy.level = 1
+        lazy.tags = {"host": "gw1"}
+        assert lazy.to_json()["level"] == 1
+        assert lazy.to_json()["tags"] == [{"tag": "host=gw1"}]
+
+    def test_missing_attributes_should_default_like_a_decoded_incident(self):
+        assert LazyIncident.from_json({"pk": 1}) == Incident(pk=1)
+
+    def test_it_should_intern_its_source_in_the_given_registry(self):
+        sources = SourceRegistry()
+        first = LazyIncident.from_json(incident_json(pk=1), sources)
+        second = LazyIncident.from_json(incident_json(pk=2), sources)
+        assert first.source is second.source
+
+    def test_it_should_decode_into_the_given_model(self):
+        lazy = LazyIncident.from_json(incident_json())
+        assert isinstance(lazy.to_incident(CompactIncident), CompactIncident)
+
+    def test_it_should_not_have_an_instance_dict(self):
+        assert not hasattr(LazyIncident.from_json(incident_json()), "__dict__")
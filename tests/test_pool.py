@@ -0,0 +1,157 @@
+"""Tests for the pyargus.pool module"""
+
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from conftest import (
+    authorizations,
+    expiring_token,
+    incident_json,
+    serve,
+    serve_incident_pages,
+)
+
+from pyargus import api, models
+from pyargus.async_client import AsyncClient
+from pyargus.client import Client
+from pyargus.pool import AsyncClientPool, ClientPool
+from pyargus.resilience import RetryPolicy
+from pyargus.tokens import AsyncTokenManager, TokenManager
+
+URL = "http://argus.test/api/v2"
+
+
+class TestClientPool:
+    def test_clients_should_authenticate_with_their_own_tokens(self):
+        pool = ClientPool(URL)
+        requests = serve(pool.api)
+        pool.client("foo").send_heartbeat()
+        pool.client("bar").send_heartbeat()
+        assert authorizations(requests) == ["Token foo", "Token bar"]
+
+    def test_clients_should_share_the_connections_of_the_pool(self):
+        pool = ClientPool(URL)
+        foo, bar = pool.client("foo"), pool.client("bar")
+        assert foo.api.incidents.client is bar.api.incidents.client
+
+    def test_it_should_hand_out_a_single_client_per_token(self):
+        pool = ClientPool(URL)
+        assert pool.client("foo") is pool["foo"]
+        assert len(pool) == 1 and "foo" in pool
+
+    def test_discarded_tokens_should_get_new_clients(self):
+        pool = ClientPool(URL)
+        client = pool.client("foo")
+        pool.discard("foo")
+        assert pool.client("foo") is not client
+
+    def test_clients_should_have_the_full_client_api(self):
+        pool = ClientPool(URL)
+        serve(pool.api, lambda request: httpx.Response(200, json=incident_json()))
+        client = pool.client("foo")
+        assert isinstance(client, Client)
+        assert isinstance(client.get_incident(1), models.Incident)
+
+    def test_explicit_headers_should_not_override_the_token(self):
+        pool = ClientPool(URL)
+        requests = serve(pool.api)
+        pool.client("foo").api.sources.heartbeat(
+            headers={"Authorization": "Token bar", "X-Extra": "1"}
+        )
+        assert authorizations(requests) == ["Token foo"]
+        assert requests[0].headers["X-Extra"] == "1"
+
+    def test_streamed_queries_should_authenticate_with_the_token(self):
+        pool = ClientPool(URL)
+        requests = serve(pool.api, serve_incident_pages)
+        incidents = list(pool.client("foo").get_incidents(stream=True))
+        assert [incident.pk for incident in incidents] == [1, 2, 3]
+        assert authorizations(requests) == ["Token foo", "Token foo"]
+
+    def test_replacing_the_token_should_affect_subsequent_requests(self):
+        pool = ClientPool(URL)
+        requests = serve(pool.api)
+        client = pool.client("foo")
+        client.api.headers["Authorization"] = "Token new"
+        client.send_heartbeat()
+        assert authorizations(requests) == ["Token new"]
+
+    def test_duplicate_lookups_should_authenticate_with_the_token(self):
+        responses = iter(
+            [
+                httpx.Response(502, json={}),
+                httpx.Response(200, json={"results": []}),
+                httpx.Response(201, json={}),
+            ]
+        )
+        pool = ClientPool(URL, retry_policy=RetryPolicy(backoff=0))
+        requests = serve(pool.api, lambda request: next(responses))
+        pool.client("foo").api.incidents.create(body={"source_incident_id": "1"})
+        assert [request.method for request in requests] == ["POST", "GET", "POST"]
+        assert authorizations(requests) == ["Token foo"] * 3
+
+    def test_when_transport_is_shared_close_should_leave_it_open(self):
+        transport = MagicMock(spec=api.TransportConfig)
+        pool = ClientPool(URL, transport=transport)
+        pool.api = MagicMock()
+        pool.close()
+        pool.api.close_client.assert_not_called()
+
+    def test_closing_a_client_should_leave_the_pool_connections_open(self):
+        pool = ClientPool(URL)
+        pool.client("foo").api.close_client()
+        assert not pool.api.incidents.client.is_closed
+
+    @pytest.mark.parametrize("retry_policy", [None, RetryPolicy(max_attempts=1)])
+    def test_when_token_was_swapped_in_flight_it_should_retry_with_the_new_one(
+        self, retry_policy
+    ):
+        pool = ClientPool(URL, retry_policy=retry_policy)
+        client = pool.client("old")
+        client.refresh_token = MagicMock(return_value=expiring_token("new", days=30))
+        manager = TokenManager(client)
+
+        def respond(request):
+            if request.headers["Authorization"] == "Token old":
+                manager.refresh()
+                return httpx.Response(401, json={"detail": "Invalid token."})
+            return httpx.Response(200, json=incident_json())
+
+        requests = serve(pool.api, respond)
+        assert client.get_incident(1).pk == 4
+        assert authorizations(requests) == ["Token old", "Token new"]
+
+
+class TestAsyncClientPool:
+    @pytest.mark.asyncio
+    async def test_clients_should_authenticate_with_their_own_tokens(self):
+        pool = AsyncClientPool(URL)
+        requests = serve(
+            pool.api,
+            lambda request: httpx.Response(200, json=incident_json()),
+            httpx.AsyncClient,
+        )
+        foo = pool.client("foo")
+        assert isinstance(foo, AsyncClient)
+        assert isinstance(await foo.get_incident(1), models.Incident)
+        await pool.client("bar").get_incident(1)
+        assert authorizations(requests) == ["Token foo", "Token bar"]
+
+    @pytest.mark.asyncio
+    async def test_when_token_was_swapped_in_flight_it_should_retry_with_the_new_one(
+        self,
+    ):
+        pool = AsyncClientPool(URL)
+        client = pool.client("old")
+        manager = AsyncTokenManager(client, expiring_token("old", days=30))
+
+        def respond(request):
+            if request.headers["Authorization"] == "Token old":
+                manager._install(expiring_token("new", days=30))
+                return httpx.Response(401, json={"detail": "Invalid token."})
+            return httpx.Response(200, json=incident_json())
+
+        requests = serve(pool.api, respond, httpx.AsyncClient)
+        assert (await client.get_incident(1)).pk == 4
+        assert authorizations(requests) == ["Token old", "Token new"]
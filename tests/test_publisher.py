@@ -0,0 +1,284 @@
+"""Tests for the pyargus.publisher module"""
+
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from simple_rest_client.exceptions import ClientError, ServerError
+
+from pyargus.models import Event, Incident
+from pyargus.publisher import (
+    DROP,
+    SPILL,
+    AsyncEventPublisher,
+    EventPublisher,
+    _Job,
+    _SpillFile,
+)
+
+
+class TestEventPublisher:
+    def test_it_should_publish_submitted_items_in_the_background(self):
+        client = MagicMock()
+        with EventPublisher(client, workers=2) as publisher:
+            assert publisher.post_incident(Incident(description="foo"))
+            assert publisher.post_incident_event(1, Event(type="ACK"))
+            assert publisher.flush(timeout=5)
+        client.post_incident.assert_called_once_with(Incident(description="foo"))
+        client.post_incident_event.assert_called_once_with(1, Event(type="ACK"))
+        assert publisher.metrics.published == 2
+
+    def test_resolve_incident_should_timestamp_the_resolution_on_submit(self):
+        client = MagicMock()
+        with EventPublisher(client) as publisher:
+            publisher.resolve_incident(Incident(pk=3), description="gone")
+        pk, event = client.post_incident_event.call_args.args
+        assert pk == 3
+        assert (event.type, event.description) == ("END", "gone")
+        assert event.timestamp is not None
+
+    def test_when_server_fails_it_should_retry(self):
+        client = MagicMock()
+        client.post_incident_event.side_effect = [ServerError("500", None), None]
+        with EventPublisher(client, backoff=0) as publisher:
+            publisher.post_incident_event(1, Event(type="ACK"))
+        assert client.post_incident_event.call_count == 2
+        assert (publisher.metrics.retried, publisher.metrics.published) == (1, 1)
+
+    def test_when_request_is_rejected_it_should_not_retry(self):
+        client = MagicMock()
+        client.post_incident_event.side_effect = ClientError("400", None)
+        on_error = MagicMock()
+        with EventPublisher(client, backoff=0, on_error=on_error) as publisher:
+            publisher.post_incident_event(1, Event(type="ACK"))
+        client.post_incident_event.assert_called_once()
+        assert publisher.metrics.failed == 1
+        on_error.assert_called_once()
+
+    def test_when_on_error_fails_the_workers_should_keep_publishing(self):
+        client = MagicMock()
+        client.post_incident_event.side_effect = [ClientError("400", None), None]
+        on_error = MagicMock(side_effect=RuntimeError("oops"))
+        with EventPublisher(client, workers=1, on_error=on_error) as publisher:
+            publisher.post_incident_event(1, Event(type="ACK"))
+            publisher.post_incident_event(2, Event(type="ACK"))
+            assert publisher.flush(timeout=5)
+        assert (publisher.metrics.failed, publisher.metrics.published) == (1, 1)
+
+    def test_when_all_workers_have_died_flush_should_give_up(self):
+        publisher = EventPublisher(MagicMock(), workers=1)
+        publisher.start()
+        publisher._stopping.set()  # makes the worker exit, as if it had crashed
+        publisher._threads[0].join(5)
+        publisher.post_incident_event(1, Event(type="ACK"))
+        assert not publisher.flush()
+
+    def test_when_queue_is_full_and_policy_is_drop_it_should_drop(self):
+        publisher = EventPublisher(MagicMock(), maxsize=1, overflow=DROP)
+        assert publisher.post_incident_event(1, Event(type="ACK"))
+        assert not publisher.post_incident_event(2, Event(type="ACK"))
+        assert publisher.metrics.dropped == 1
+        assert publisher.metrics.queued == 1
+
+    def test_when_queue_is_full_and_policy_is_block_it_should_time_out(self):
+        publisher = EventPublisher(MagicMock(), maxsize=1, block_timeout=0.01)
+        publisher.post_incident_event(1, Event(type="ACK"))
+        assert not publisher.post_incident_event(2, Event(type="ACK"))
+        assert publisher.metrics.dropped == 1
+
+    def test_when_queue_is_full_and_policy_is_spill_it_should_spill_to_disk(
+        self, tmp_path
+    ):
+        client = MagicMock()
+        spill_path = str(tmp_path / "spill.jsonl")
+        publisher = EventPublisher(
+            client, workers=1, maxsize=1, overflow=SPILL, spill_path=spill_path
+        )
+        timestamp = datetime(2021, 4, 5, 10, tzinfo=timezone.utc)
+        for pk in range(1, 4):
+            publisher.post_incident_event(pk, Event(type="ACK", timestamp=timestamp))
+        assert (publisher.metrics.queued, publisher.metrics.spilled) == (1, 2)
+
+        publisher.start()
+        publisher.close()
+        published = [call.args for call in client.post_incident_event.call_args_list]
+        assert published == [
+            (pk, Event(type="ACK", timestamp=timestamp)) for pk in range(1, 4)
+        ]
+
+    def test_spilled_items_should_survive_a_restart(self, tmp_path):
+        spill_path = str(tmp_path / "spill.jsonl")
+        publisher = EventPublisher(
+            MagicMock(), maxsize=1, overflow=SPILL, spill_path=spill_path
+        )
+        publisher.post_incident(Incident(description="first", tags={"a": "b"}))
+        publisher.post_incident(Incident(description="second", tags={"a": "b"}))
+        publisher.close()  # never started, so everything is spilled
+
+        client = MagicMock()
+        with EventPublisher(client, workers=1, overflow=SPILL, spill_path=spill_path):
+            pass
+        posted = [call.args[0] for call in client.post_incident.call_args_list]
+        assert [i.description for i in posted] == ["first", "second"]
+        assert posted[0].tags == {"a": "b"}
+
+    def test_when_close_times_out_queued_items_should_be_spilled(self, tmp_path):
+        spill_path = str(tmp_path / "spill.jsonl")
+        client = MagicMock()
+        client.post_incident_event.side_effect = lambda *args: time.sleep(0.2)
+        publisher = EventPublisher(client, workers=1, spill_path=spill_path)
+        publisher.start()
+        for pk in range(3):
+            publisher.post_incident_event(pk, ack(pk).event)
+        publisher.close(timeout=0.05)
+        assert (publisher.metrics.dropped, publisher.metrics.published) == (0, 1)
+        assert _SpillFile(spill_path).take(5) == [ack(1), ack(2)]
+
+    def test_when_closed_it_should_refuse_new_items(self):
+        publisher = EventPublisher(MagicMock())
+        publisher.start()
+        publisher.close()
+        with pytest.raises(RuntimeError):
+            publisher.post_incident_event(1, Event(type="ACK"))
+
+    def test_slow_publishing_should_not_block_submitters(self):
+        release = threading.Event()
+        client = MagicMock()
+        client.post_incident_event.side_effect = lambda *args: release.wait()
+        with EventPublisher(client, workers=1, maxsize=10) as publisher:
+            for pk in range(5):
+                assert publisher.post_incident_event(pk, Event(type="ACK"))
+            release.set()
+        assert publisher.metrics.published == 5
+
+
+class TestSpillFile:
+    def test_taking_jobs_should_not_rewrite_the_file(self, tmp_path):
+        spill = _SpillFile(str(tmp_path / "spill.jsonl"))
+        for pk in range(3):
+            spill.append(ack(pk))
+        inode = os.stat(spill.path).st_ino
+        assert spill.take(2) == [ack(0), ack(1)]
+        assert os.stat(spill.path).st_ino == inode
+        assert len(spill) == 1
+
+    def test_a_reopened_file_should_resume_where_taking_left_off(self, tmp_path):
+        spill = _SpillFile(str(tmp_path / "spill.jsonl"))
+        for pk in range(3):
+            spill.append(ack(pk))
+        spill.take(1)
+        reopened = _SpillFile(spill.path)
+        assert len(reopened) == 2
+        assert reopened.take(5) == [ack(1), ack(2)]
+
+    def test_when_read_to_the_end_it_should_be_emptied(self, tmp_path):
+        spill = _SpillFile(str(tmp_path / "spill.jsonl"))
+        spill.append(ack(1))
+        spill.take(1)
+        assert os.path.getsize(spill.path) == 0
+        spill.append(ack(2))
+        assert spill.take(1) == [ack(2)]
+
+    def test_prepended_jobs_should_be_taken_first(self, tmp_path):
+        spill = _SpillFile(str(tmp_path / "spill.jsonl"))
+        for pk in range(3):
+            spill.append(ack(pk))
+        spill.take(1)
+        spill.prepend([ack(0)])
+        assert spill.take(5) == [ack(0), ack(1), ack(2)]
+
+    def test_corrupt_lines_should_be_skipped(self, tmp_path):
+        spill_path = tmp_path / "spill.jsonl"
+        spill_path.write_text('{"incident": 1, "event": \n')
+        spill = _SpillFile(str(spill_path))
+        spill.append(ack(1))
+        assert spill.take(5) == [ack(1)]
+
+
+class TestAsyncEventPublisher:
+    @pytest.mark.asyncio
+    async def test_it_should_publish_submitted_items_in_the_background(self):
+        client = MagicMock()
+        client.post_incident_event = AsyncMock()
+        async with AsyncEventPublisher(client, workers=2) as publisher:
+            for pk in range(3):
+                await publisher.post_incident_event(pk, Event(type="ACK"))
+        assert client.post_incident_event.await_count == 3
+        assert publisher.metrics.published == 3
+
+    @pytest.mark.asyncio
+    async def test_when_server_fails_it_should_retry(self):
+        client = MagicMock()
+        client.post_incident = AsyncMock(side_effect=[ServerError("503", None), None])
+        async with AsyncEventPublisher(client, backoff=0) as publisher:
+            await publisher.post_incident(Incident())
+        assert (publisher.metrics.retried, publisher.metrics.published) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_when_queue_is_full_and_policy_is_drop_it_should_drop(self):
+        client = MagicMock()
+        client.post_incident_event = AsyncMock(side_effect=asyncio.sleep)
+        publisher = AsyncEventPublisher(client, workers=1, maxsize=1, overflow=DROP)
+        publisher.start()
+        results = [
+            await publisher.post_incident_event(pk, Event(type="ACK"))
+            for pk in range(3)
+        ]
+        assert results == [True, False, False]
+        await publisher.aclose()
+        assert publisher.metrics.dropped == 2
+
+    @pytest.mark.asyncio
+    async def test_when_on_error_fails_the_workers_should_keep_publishing(self):
+        client = MagicMock()
+        client.post_incident_event = AsyncMock(
+            side_effect=[ClientError("400", None), None]
+        )
+        on_error = MagicMock(side_effect=RuntimeError("oops"))
+        async with AsyncEventPublisher(client, workers=1, on_error=on_error) as pub:
+            await pub.post_incident_event(1, Event(type="ACK"))
+            await pub.post_incident_event(2, Event(type="ACK"))
+            assert await pub.flush(timeout=5)
+        assert (pub.metrics.failed, pub.metrics.published) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_when_all_workers_have_died_flush_should_give_up(self):
+        publisher = AsyncEventPublisher(MagicMock(), workers=1)
+        publisher.start()
+        publisher._tasks[0].cancel()
+        await asyncio.gather(*publisher._tasks, return_exceptions=True)
+        await publisher.post_incident_event(1, Event(type="ACK"))
+        assert not await publisher.flush()
+
+    @pytest.mark.asyncio
+    async def test_when_aclose_times_out_unpublished_items_should_be_spilled(
+        self, tmp_path
+    ):
+        spill_path = str(tmp_path / "spill.jsonl")
+
+        async def publish_slowly(*args):
+            await asyncio.sleep(5)
+
+        client = MagicMock()
+        client.post_incident_event = AsyncMock(side_effect=publish_slowly)
+        publisher = AsyncEventPublisher(client, workers=1, spill_path=spill_path)
+        publisher.start()
+        for pk in range(3):
+            await publisher.post_incident_event(pk, ack(pk).event)
+        await publisher.aclose(timeout=0.05)
+        assert (publisher.metrics.dropped, publisher.metrics.spilled) == (0, 3)
+        assert _SpillFile(spill_path).take(5) == [ack(0), ack(1), ack(2)]
+
+    @pytest.mark.asyncio
+    async def test_when_not_started_it_should_refuse_items(self):
+        with pytest.raises(RuntimeError):
+            await AsyncEventPublisher(MagicMock()).post_incident(Incident())
+
+
+def ack(pk: int) -> _Job:
+    timestamp = datetime(2021, 4, 5, 10, tzinfo=timezone.utc)
+    return _Job(pk, Event(type="ACK", timestamp=timestamp))
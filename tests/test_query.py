@@ -0,0 +1,165 @@
+"""Tests for the pyargus.query module"""
+
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from conftest import incident_json, serve, serve_incident_pages
+
+from pyargus.async_client import AsyncClient
+from pyargus.client import Client
+from pyargus.models import COMPACT_MODELS, CompactSourceSystem, Incident, LazyIncident
+from pyargus.query import IncidentQuery
+
+URL = "https://argus.example.org/api/v2"
+
+
+class TestIncidentQuery:
+    def test_when_empty_it_should_have_no_params(self):
+        assert IncidentQuery().to_params() == {}
+
+    def test_it_should_map_filters_to_argus_params(self):
+        since = datetime(2024, 3, 1, 12, tzinfo=timezone.utc)
+        query = IncidentQuery(
+            open=True,
+            acked=False,
+            stateful=True,
+            max_level=2,
+            source_ids=[3, 5],
+            source_types=("nav",),
+            tags={"host": "gw1", "interface": "xe-0/0/1"},
+            started_after=since,
+            page_size=500,
+        )
+        assert query.to_params() == {
+            "open": True,
+            "acked": False,
+            "stateful": True,
+            "level__lte": 2,
+            "source__id__in": "3,5",
+            "source__type__in": "nav",
+            "tags": "host=gw1,interface=xe-0/0/1",
+            "start_time__gte": "2024-03-01T12:00:00+00:00",
+            "page_size": 500,
+        }
+
+    def test_when_filter_is_not_a_bool_it_should_raise(self):
+        with pytest.raises(TypeError):
+            IncidentQuery(open="yes")
+
+    def test_when_time_is_not_a_datetime_it_should_raise(self):
+        with pytest.raises(TypeError):
+            IncidentQuery(started_after="2024-03-01")
+
+    @pytest.mark.parametrize("level", [0, 6])
+    def test_when_level_is_out_of_range_it_should_raise(self, level):
+        with pytest.raises(ValueError):
+            IncidentQuery(max_level=level)
+
+    def test_when_page_size_is_not_positive_it_should_raise(self):
+        with pytest.raises(ValueError):
+            IncidentQuery(page_size=0)
+
+    def test_when_field_is_unknown_it_should_raise(self):
+        with pytest.raises(ValueError):
+            IncidentQuery(fields=("pk", "severity"))
+
+    def test_when_tag_cannot_be_expressed_as_a_filter_it_should_raise(self):
+        with pytest.raises(ValueError):
+            IncidentQuery(tags={"host": "gw1,gw2"})
+
+    def test_filter_should_return_a_changed_copy(self):
+        query = IncidentQuery(open=True)
+        changed = query.filter(max_level=3)
+        assert changed == IncidentQuery(open=True, max_level=3)
+        assert query.max_level is None
+
+    def test_equal_queries_should_hash_equally(self):
+        first = IncidentQuery(tags={"host": "gw1"}, source_ids=[1])
+        second = IncidentQuery(tags={"host": "gw1"}, source_ids=(1,))
+        assert hash(first) == hash(second)
+
+    def test_lazy_decoder_should_decode_sources_of_the_model_set(self):
+        decode = IncidentQuery(lazy=True).get_decoder(COMPACT_MODELS)
+        assert isinstance(decode(incident_json()).source, CompactSourceSystem)
+
+    def test_project_should_keep_only_the_queried_fields(self):
+        query = IncidentQuery(fields=("pk", "level"))
+        assert query.project(incident_json(pk=1)) == {"pk": 1, "level": 5}
+
+
+class TestQueriedIncidents:
+    def test_it_should_send_the_query_params(self):
+        client = Client(URL, "token")
+        requests = serve(client.api, serve_incident_pages)
+        list(client.get_incidents(IncidentQuery(open=True, page_size=2)))
+        assert requests[0].url.params["open"] == "true"
+        assert requests[0].url.params["page_size"] == "2"
+
+    def test_keyword_filters_should_override_the_query(self):
+        client = Client(URL, "token")
+        requests = serve(client.api, serve_incident_pages)
+        list(client.get_incidents(IncidentQuery(open=True), open=False))
+        assert requests[0].url.params["open"] == "false"
+
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_it_should_only_decode_the_projected_fields(self, stream):
+        client = Client(URL, "token")
+        serve(client.api, serve_incident_pages)
+        query = IncidentQuery(fields=("pk", "level"))
+        incidents = list(client.get_incidents(query, stream=stream))
+        assert incidents[0] == Incident(pk=1, level=5)
+        assert [incident.pk for incident in incidents] == [1, 2, 3]
+
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_when_lazy_it_should_list_lazy_incidents(self, stream):
+        client = Client(URL, "token")
+        serve(client.api, serve_incident_pages)
+        incidents = list(client.get_incidents(IncidentQuery(lazy=True), stream=stream))
+        assert all(isinstance(incident, LazyIncident) for incident in incidents)
+        assert incidents[0] == Incident.from_json(incident_json(pk=1))
+        assert incidents[0].source is incidents[2].source
+
+    @pytest.mark.parametrize(
+        "method, path",
+        [
+            ("get_open_incidents", "/api/v2/incidents/open/"),
+            ("get_open_unacked_incidents", "/api/v2/incidents/open+unacked/"),
+        ],
+    )
+    def test_open_incidents_should_be_listed_by_their_endpoints(self, method, path):
+        client = Client(URL, "token")
+        requests = serve(client.api, serve_incident_pages)
+        incidents = list(getattr(client, method)(IncidentQuery(max_level=3)))
+        assert [incident.pk for incident in incidents] == [1, 2, 3]
+        assert requests[0].url.path == path
+        assert requests[0].url.params["level__lte"] == "3"
+
+
+class TestAsyncQueriedIncidents:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("stream", [False, True])
+    async def test_it_should_only_decode_the_projected_fields(self, stream):
+        client = AsyncClient(URL, "token")
+        requests = serve(client.api, serve_incident_pages, httpx.AsyncClient)
+        query = IncidentQuery(open=True, fields=("pk", "level"))
+        incidents = [i async for i in client.get_incidents(query, stream=stream)]
+        assert incidents[0] == Incident(pk=1, level=5)
+        assert requests[0].url.params["open"] == "true"
+
+    @pytest.mark.asyncio
+    async def test_when_lazy_it_should_list_lazy_incidents(self):
+        client = AsyncClient(URL, "token")
+        serve(client.api, serve_incident_pages, httpx.AsyncClient)
+        query = IncidentQuery(lazy=True, fields=("pk", "level"))
+        incidents = [i async for i in client.get_incidents(query)]
+        assert isinstance(incidents[0], LazyIncident)
+        assert incidents[0] == Incident(pk=1, level=5)
+
+    @pytest.mark.asyncio
+    async def test_open_unacked_incidents_should_be_listed_by_their_endpoint(self):
+        client = AsyncClient(URL, "token")
+        requests = serve(client.api, serve_incident_pages, httpx.AsyncClient)
+        incidents = [i async for i in client.get_open_unacked_incidents()]
+        assert len(incidents) == 3
+        assert requests[0].url.path == "/api/v2/incidents/open+unacked/"
@@ -0,0 +1,163 @@
+"""Tests for the pyargus.ratelimit module"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from conftest import serve
+
+from pyargus import api, async_api
+from pyargus.ratelimit import FileTokenBucket, RateLimiter, TokenBucket
+
+
+class TestTokenBucket:
+    def test_it_should_allow_a_burst_without_waiting(self):
+        with patch("pyargus.ratelimit.time.monotonic", return_value=100.0):
+            bucket = TokenBucket(rate=2, burst=3)
+            assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+
+    def test_when_empty_it_should_queue_reservations(self):
+        with patch("pyargus.ratelimit.time.monotonic", return_value=100.0):
+            bucket = TokenBucket(rate=2, burst=1)
+            assert [bucket.reserve() for _ in range(3)] == [0, 0.5, 1.0]
+
+    def test_it_should_refill_at_the_given_rate(self):
+        with patch("pyargus.ratelimit.time.monotonic") as monotonic:
+            monotonic.return_value = 100.0
+            bucket = TokenBucket(rate=2, burst=1)
+            bucket.reserve()
+            monotonic.return_value = 100.5
+            assert bucket.reserve() == 0
+
+    def test_it_should_not_accumulate_more_than_a_burst(self):
+        with patch("pyargus.ratelimit.time.monotonic") as monotonic:
+            monotonic.return_value = 100.0
+            bucket = TokenBucket(rate=1, burst=2)
+            monotonic.return_value = 1000.0
+            assert [bucket.reserve() for _ in range(3)] == [0, 0, 1.0]
+
+    def test_when_rate_is_not_positive_it_should_raise(self):
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)
+
+    def test_when_rate_is_below_one_it_should_default_to_a_burst_of_one(self):
+        with patch("pyargus.ratelimit.time.monotonic", return_value=100.0):
+            bucket = TokenBucket(rate=0.5)
+            assert bucket.burst == 1
+            assert [bucket.reserve() for _ in range(2)] == [0, 2.0]
+
+
+class TestFileTokenBucket:
+    def test_buckets_sharing_a_file_should_share_tokens(self, tmp_path):
+        path = str(tmp_path / "bucket")
+        with patch("pyargus.ratelimit.time.time", return_value=100.0):
+            first = FileTokenBucket(path, rate=1, burst=2)
+            second = FileTokenBucket(path, rate=1, burst=2)
+            try:
+                assert first.reserve() == 0
+                assert second.reserve() == 0
+                assert first.reserve() == 1.0
+            finally:
+                first.close()
+                second.close()
+
+    def test_state_should_survive_reopening(self, tmp_path):
+        path = str(tmp_path / "bucket")
+        with patch("pyargus.ratelimit.time.time", return_value=100.0):
+            bucket = FileTokenBucket(path, rate=1, burst=1)
+            bucket.reserve()
+            bucket.close()
+            bucket = FileTokenBucket(path, rate=1, burst=1)
+            assert bucket.reserve() == 1.0
+            bucket.close()
+
+
+class TestRateLimiter:
+    def test_reads_and_writes_should_use_separate_buckets(self):
+        read, write = TokenBucket(1), TokenBucket(1)
+        limiter = RateLimiter(read=read, write=write)
+        assert limiter.get_buckets("incidents", "list", "GET") == [read]
+        assert limiter.get_buckets("incidents", "create", "POST") == [write]
+
+    def test_endpoint_buckets_should_apply_in_addition(self):
+        write, heartbeat = TokenBucket(1), TokenBucket(1)
+        limiter = RateLimiter(write=write, endpoints={"sources.heartbeat": heartbeat})
+        assert limiter.get_buckets("sources", "heartbeat", "POST") == [
+            write,
+            heartbeat,
+        ]
+        assert limiter.get_buckets("sources", "create", "POST") == [write]
+
+    def test_the_most_specific_endpoint_should_take_precedence(self):
+        incidents, create = TokenBucket(1), TokenBucket(1)
+        limiter = RateLimiter(
+            endpoints={"incidents": incidents, "incidents.create": create}
+        )
+        assert limiter.get_buckets("incidents", "create", "POST") == [create]
+        assert limiter.get_buckets("incidents", "list", "GET") == [incidents]
+
+    def test_reserve_should_return_the_longest_wait(self):
+        fast, slow = MagicMock(), MagicMock()
+        fast.reserve.return_value = 0.1
+        slow.reserve.return_value = 2.0
+        limiter = RateLimiter(read=fast, endpoints={"incidents": slow})
+        assert limiter.reserve("incidents", "list", "GET") == 2.0
+
+    def test_when_nothing_is_limited_it_should_not_wait(self):
+        assert RateLimiter().reserve("incidents", "list", "GET") == 0
+
+    def test_acquire_should_sleep_until_the_request_may_be_made(self):
+        limiter = RateLimiter(read=TokenBucket(rate=1, burst=1))
+        with patch("pyargus.ratelimit.time.sleep") as sleep:
+            limiter.acquire("incidents", "list", "GET")
+            limiter.acquire("incidents", "list", "GET")
+        sleep.assert_called_once()
+        assert sleep.call_args[0][0] == pytest.approx(1.0, abs=0.1)
+
+    @pytest.mark.asyncio
+    async def test_async_acquire_should_reserve_file_tokens_off_the_event_loop(
+        self, tmp_path
+    ):
+        bucket = FileTokenBucket(str(tmp_path / "bucket"), rate=1)
+        limiter = RateLimiter(read=bucket)
+        try:
+            with patch("pyargus.ratelimit.asyncio.to_thread") as to_thread:
+                to_thread.return_value = 0.0
+                await limiter.async_acquire("incidents", "list", "GET")
+            to_thread.assert_called_once_with(
+                limiter.reserve, "incidents", "list", "GET"
+            )
+        finally:
+            bucket.close()
+
+    @pytest.mark.asyncio
+    async def test_async_acquire_should_reserve_memory_tokens_in_place(self):
+        limiter = RateLimiter(read=TokenBucket(rate=1))
+        with patch("pyargus.ratelimit.asyncio.to_thread") as to_thread:
+            await limiter.async_acquire("incidents", "list", "GET")
+        to_thread.assert_not_called()
+
+
+class TestRateLimitedResources:
+    def test_requests_should_be_throttled_by_the_limiter(self):
+        limiter = MagicMock(spec=RateLimiter)
+        argus = api.connect("http://argus.test/api/v2", "token", rate_limiter=limiter)
+        serve(argus)
+        argus.incidents.retrieve(1)
+        argus.events.create(1, body={})
+        assert [call.args for call in limiter.acquire.call_args_list] == [
+            ("incidents", "retrieve", "GET"),
+            ("events", "create", "POST"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_async_requests_should_be_throttled_by_the_limiter(self):
+        limiter = MagicMock(spec=RateLimiter)
+        limiter.async_acquire = AsyncMock()
+        argus = async_api.async_connect(
+            "http://argus.test/api/v2", "token", rate_limiter=limiter
+        )
+        serve(argus, client_class=httpx.AsyncClient)
+        await argus.incidents.retrieve(1)
+        limiter.async_acquire.assert_awaited_once_with("incidents", "retrieve", "GET")
+        limiter.acquire.assert_not_called()
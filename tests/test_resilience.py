@@ -0,0 +1,314 @@
+"""Tests for the pyargus.resilience module"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+from conftest import serve
+from simple_rest_client.exceptions import (
+    ClientConnectionError,
+    ClientError,
+    NotFoundError,
+    ServerError,
+)
+
+from pyargus import api, async_api
+from pyargus.async_client import async_streamed_query
+from pyargus.client import streamed_query
+from pyargus.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    parse_retry_after,
+)
+
+NO_WAIT = RetryPolicy(backoff=0)
+
+
+class TestRetryPolicy:
+    def test_when_server_fails_it_should_be_retryable(self):
+        assert RetryPolicy().is_retryable(ServerError("503", fake_response(503)))
+
+    def test_when_rate_limited_it_should_be_retryable(self):
+        assert RetryPolicy().is_retryable(ClientError("429", fake_response(429)))
+
+    def test_when_request_is_bad_it_should_not_be_retryable(self):
+        assert not RetryPolicy().is_retryable(ClientError("400", fake_response(400)))
+        assert not RetryPolicy().is_retryable(NotFoundError("404", fake_response(404)))
+
+    def test_when_circuit_is_open_it_should_not_be_retryable(self):
+        assert not RetryPolicy().is_retryable(CircuitOpenError("open"))
+
+    def test_delays_should_grow_exponentially_up_to_the_maximum(self):
+        policy = RetryPolicy(backoff=1, max_backoff=3, jitter=False)
+        error = ServerError("503", fake_response(503))
+        assert [policy.get_delay(attempt, error) for attempt in (1, 2, 3)] == [1, 2, 3]
+
+    def test_jittered_delays_should_not_exceed_the_computed_delay(self):
+        policy = RetryPolicy(backoff=1)
+        error = ServerError("503", fake_response(503))
+        assert all(0 <= policy.get_delay(2, error) <= 2 for _ in range(100))
+
+    def test_when_server_sends_retry_after_it_should_be_honored(self):
+        policy = RetryPolicy(backoff=1)
+        error = ServerError("503", fake_response(503, {"Retry-After": "7"}))
+        assert policy.get_delay(1, error) == 7
+
+    def test_retry_after_should_accept_http_dates(self):
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+        assert parse_retry_after("garbage") is None
+
+
+class TestCircuitBreaker:
+    def test_when_failures_reach_the_threshold_it_should_open(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record_failure()
+        breaker.before_request()
+        breaker.record_failure()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request()
+
+    def test_a_success_should_reset_the_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_after_recovery_time_it_should_let_a_single_trial_through(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_time=10)
+        with patch("pyargus.resilience.time.monotonic", return_value=100):
+            breaker.record_failure()
+        with patch("pyargus.resilience.time.monotonic", return_value=110):
+            breaker.before_request()
+            assert breaker.state == CircuitBreaker.HALF_OPEN
+            with pytest.raises(CircuitOpenError):
+                breaker.before_request()
+
+    def test_when_trial_fails_it_should_open_again(self):
+        breaker = CircuitBreaker(failure_threshold=3, recovery_time=0)
+        for _ in range(3):
+            breaker.record_failure()
+        breaker.before_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_when_trial_is_abandoned_the_next_request_should_be_the_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+        breaker.record_failure()
+        assert breaker.before_request()
+        breaker.abandon_trial()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.before_request()
+
+    def test_client_errors_should_not_count_as_failures(self):
+        breaker = CircuitBreaker(failure_threshold=1)
+        breaker.record(NotFoundError("404", fake_response(404)))
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+class TestResilientResources:
+    def test_when_a_read_fails_it_should_be_retried(self):
+        server = FakeServer([503, 200])
+        argus = connect(server, retry_policy=NO_WAIT)
+        assert argus.incidents.retrieve(1).status_code == 200
+        assert server.calls == 2
+
+    def test_when_retries_are_exhausted_it_should_raise(self):
+        server = FakeServer([503, 503, 503, 200])
+        argus = connect(server, retry_policy=NO_WAIT)
+        with pytest.raises(ServerError):
+            argus.incidents.retrieve(1)
+        assert server.calls == 3
+
+    def test_when_a_post_without_dedupe_fails_it_should_not_be_retried(self):
+        server = FakeServer([502, 201])
+        argus = connect(server, retry_policy=NO_WAIT)
+        with pytest.raises(ServerError):
+            argus.events.create(1, body={"type": "ACK"})
+        assert server.calls == 1
+
+    def test_when_a_post_was_never_sent_it_should_be_retried(self):
+        server = FakeServer([httpx.ConnectError("refused"), 201])
+        argus = connect(server, retry_policy=NO_WAIT)
+        assert argus.events.create(1, body={"type": "ACK"}).status_code == 201
+
+    def test_when_a_failed_incident_post_took_effect_it_should_not_repost(self):
+        server = FakeServer([502, {"results": [{"pk": 8}]}])
+        argus = connect(server, retry_policy=NO_WAIT)
+        response = argus.incidents.create(body={"source_incident_id": "42"})
+        assert response.body == {"pk": 8}
+        assert [r.method for r in server.requests] == ["POST", "GET"]
+        assert server.requests[1].url.params["source_incident_id"] == "42"
+
+    def test_when_a_failed_incident_post_did_not_take_effect_it_should_repost(self):
+        server = FakeServer([502, {"results": []}, 201])
+        argus = connect(server, retry_policy=NO_WAIT)
+        response = argus.incidents.create(body={"source_incident_id": "42"})
+        assert response.status_code == 201
+        assert [r.method for r in server.requests] == ["POST", "GET", "POST"]
+
+    def test_when_circuit_is_open_it_should_not_make_requests(self):
+        server = FakeServer([503, 200])
+        argus = connect(server, circuit_breaker=CircuitBreaker(failure_threshold=1))
+        with pytest.raises(ServerError):
+            argus.incidents.retrieve(1)
+        with pytest.raises(ClientConnectionError):
+            argus.events.list(1)
+        assert server.calls == 1
+
+    def test_when_trial_is_interrupted_the_circuit_should_not_stay_half_open(self):
+        server = FakeServer([503, KeyboardInterrupt(), 200])
+        breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+        argus = connect(server, circuit_breaker=breaker)
+        with pytest.raises(ServerError):
+            argus.incidents.retrieve(1)
+        with pytest.raises(KeyboardInterrupt):
+            argus.incidents.retrieve(1)
+        assert breaker.state == CircuitBreaker.OPEN
+        assert argus.incidents.retrieve(1).status_code == 200
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+class TestResilientStreaming:
+    def test_when_a_streamed_page_fails_it_should_be_retried(self):
+        server = FakeServer([503, {"next": None, "results": [1, 2]}])
+        argus = connect(server, retry_policy=NO_WAIT)
+        assert list(streamed_query(argus.incidents, "list")) == [1, 2]
+        assert server.calls == 2
+
+    def test_when_a_streamed_page_fails_midway_it_should_not_be_retried(self):
+        def fail_midway(request):
+            body = httpx.ByteStream(b'{"next": null, "results": [1, 2')
+            return httpx.Response(200, stream=FailingStream(body))
+
+        argus = api.connect("http://argus.test/api/v2", "token", retry_policy=NO_WAIT)
+        requests = serve(argus, fail_midway)
+        records = streamed_query(argus.incidents, "list")
+        assert next(records) == 1
+        with pytest.raises(ClientConnectionError):
+            next(records)
+        assert len(requests) == 1
+
+    def test_when_circuit_is_open_streamed_pages_should_not_be_requested(self):
+        server = FakeServer([503, 200])
+        argus = connect(server, circuit_breaker=CircuitBreaker(failure_threshold=1))
+        with pytest.raises(ServerError):
+            list(streamed_query(argus.incidents, "list"))
+        with pytest.raises(CircuitOpenError):
+            list(streamed_query(argus.incidents, "list"))
+        assert server.calls == 1
+
+    def test_when_a_streamed_trial_is_closed_early_the_circuit_should_close(self):
+        server = FakeServer([{"next": None, "results": [1, 2]}])
+        breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+        breaker.record_failure()
+        argus = connect(server, circuit_breaker=breaker)
+        records = streamed_query(argus.incidents, "list")
+        assert next(records) == 1
+        records.close()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_when_an_async_streamed_page_fails_it_should_be_retried(self):
+        server = FakeServer([503, {"next": None, "results": [1, 2]}])
+        argus = async_api.async_connect(
+            "http://argus.test/api/v2", "token", retry_policy=NO_WAIT
+        )
+        serve(argus, server, httpx.AsyncClient)
+        records = async_streamed_query(argus.incidents, "list")
+        assert [record async for record in records] == [1, 2]
+        assert server.calls == 2
+
+
+class TestAsyncResilientResources:
+    @pytest.mark.asyncio
+    async def test_when_a_read_fails_it_should_be_retried(self):
+        server = FakeServer([503, 200])
+        argus = async_api.async_connect(
+            "http://argus.test/api/v2", "token", retry_policy=NO_WAIT
+        )
+        serve(argus, server, httpx.AsyncClient)
+        assert (await argus.incidents.retrieve(1)).status_code == 200
+        assert server.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_when_a_failed_incident_post_took_effect_it_should_not_repost(
+        self,
+    ):
+        server = FakeServer([502, {"results": [{"pk": 8}]}])
+        argus = async_api.async_connect(
+            "http://argus.test/api/v2", "token", retry_policy=NO_WAIT
+        )
+        serve(argus, server, httpx.AsyncClient)
+        response = await argus.incidents.create(body={"source_incident_id": "42"})
+        assert response.body == {"pk": 8}
+
+    @pytest.mark.asyncio
+    async def test_when_trial_is_cancelled_the_circuit_should_not_stay_half_open(
+        self,
+    ):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+        breaker.record_failure()
+        started = asyncio.Event()
+
+        async def hang(request):
+            started.set()
+            await asyncio.sleep(60)
+
+        argus = async_api.async_connect(
+            "http://argus.test/api/v2", "token", circuit_breaker=breaker
+        )
+        serve(argus, hang, httpx.AsyncClient)
+        trial = asyncio.ensure_future(argus.incidents.retrieve(1))
+        await started.wait()
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.before_request()
+
+
+class FakeServer:
+    """An httpx mock transport handler that answers requests with a scripted
+    sequence of status codes, JSON bodies or exceptions
+    """
+
+    def __init__(self, script: list):
+        self.script = list(script)
+        self.requests = []
+
+    @property
+    def calls(self) -> int:
+        return len(self.requests)
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        answer = self.script.pop(0)
+        if isinstance(answer, BaseException):
+            raise answer
+        if isinstance(answer, int):
+            return httpx.Response(answer, json={})
+        return httpx.Response(200, json=answer)
+
+
+class FailingStream(httpx.SyncByteStream):
+    """A response body stream that breaks down after producing `stream`"""
+
+    def __init__(self, stream: httpx.SyncByteStream):
+        self.stream = stream
+
+    def __iter__(self):
+        yield from self.stream
+        raise httpx.ReadError("connection reset")
+
+
+def fake_response(status_code: int, headers=None):
+    return MagicMock(status_code=status_code, headers=headers or {})
+
+
+def connect(server: FakeServer, **kwargs):
+    argus = api.connect("http://argus.test/api/v2", "token", **kwargs)
+    serve(argus, server)
+    return argus
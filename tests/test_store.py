@@ -0,0 +1,96 @@
+"""Tests for the pyargus.store module"""
+
+from datetime import datetime, timezone
+
+import pytest
+from conftest import event_json, incident_json
+
+from pyargus.models import (
+    COMPACT_MODELS,
+    STATELESS,
+    Acknowledgement,
+    CompactIncident,
+    Event,
+    Incident,
+)
+from pyargus.store import IncidentStore
+
+
+@pytest.fixture
+def store():
+    with IncidentStore(":memory:") as store:
+        yield store
+
+
+class TestIncidentStore:
+    def test_stored_incidents_should_round_trip_through_from_json(self, store):
+        incident = Incident.from_json(incident_json(pk=1))
+        store.put_incidents([incident])
+        assert store.get_incident(1) == incident
+
+    def test_stateless_incidents_should_stay_stateless(self, store):
+        store.put_incidents([Incident.from_json(incident_json(pk=1, end_time=None))])
+        assert store.get_incident(1).end_time is STATELESS
+
+    def test_closed_incidents_should_keep_their_end_time(self, store):
+        closed = Incident.from_json(
+            incident_json(pk=1, end_time="2021-04-05T10:00:00+00:00", open=False)
+        )
+        store.put_incidents([closed])
+        assert store.get_incident(1).end_time == datetime(
+            2021, 4, 5, 10, tzinfo=timezone.utc
+        )
+
+    def test_when_incident_is_stored_again_it_should_be_replaced(self, store):
+        store.put_incidents([Incident.from_json(incident_json(pk=1))])
+        store.put_incidents([Incident.from_json(incident_json(pk=1, level=1))])
+        assert len(store) == 1
+        assert store.get_incident(1).level == 1
+
+    def test_it_should_filter_incidents_by_open_state(self, store):
+        store.put_incidents(
+            Incident.from_json(incident_json(pk=pk, open=bool(pk % 2)))
+            for pk in range(1, 5)
+        )
+        assert [incident.pk for incident in store.incidents(open=True)] == [1, 3]
+        assert [incident.pk for incident in store.incidents()] == [1, 2, 3, 4]
+
+    def test_incidents_from_the_same_source_should_share_source_objects(self, store):
+        store.put_incidents(
+            Incident.from_json(incident_json(pk=pk)) for pk in range(1, 3)
+        )
+        first, second = store.incidents()
+        assert first.source is second.source
+
+    def test_deleting_incidents_should_delete_their_events(self, store):
+        store.put_incidents([Incident.from_json(incident_json(pk=8))])
+        store.put_events([Event.from_json(event_json())])
+        store.delete_incidents([8])
+        assert 8 not in store
+        assert store.events_for(8) == []
+
+    def test_stored_events_should_round_trip_through_from_json(self, store):
+        event = Event.from_json(event_json())
+        store.put_events([event])
+        assert store.events_for(event.incident) == [event]
+
+    def test_stored_acknowledgements_should_round_trip_through_from_json(self, store):
+        acknowledgement = Acknowledgement.from_json(
+            {"pk": 1, "event": event_json(), "expiration": None}
+        )
+        store.put_acknowledgements([acknowledgement])
+        assert store.acknowledgements_for(acknowledgement.event.incident) == [
+            acknowledgement
+        ]
+
+    def test_last_synced_should_persist(self, tmp_path):
+        synced = datetime(2021, 4, 5, 10, tzinfo=timezone.utc)
+        with IncidentStore(str(tmp_path / "store.sqlite")) as store:
+            store.last_synced = synced
+        with IncidentStore(str(tmp_path / "store.sqlite")) as store:
+            assert store.last_synced == synced
+
+    def test_when_compact_models_are_selected_it_should_decode_into_them(self):
+        with IncidentStore(":memory:", model_set=COMPACT_MODELS) as store:
+            store.put_incidents([Incident.from_json(incident_json(pk=1))])
+            assert isinstance(store.get_incident(1), CompactIncident)
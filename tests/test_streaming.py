@@ -0,0 +1,71 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from pyargus.streaming import PageParser
+
+
+class TestPageParser:
+    @pytest.mark.parametrize("chunk_size", [1, 3, 16, 1 << 20])
+    def test_it_should_produce_every_result_regardless_of_chunking(self, chunk_size):
+        results = [{"pk": pk, "description": 'Ø ☃ ]}, "{['} for pk in range(20)]
+        page = {"next": "https://x/?cursor=a", "previous": None, "results": results}
+        assert feed_in_chunks(PageParser(), encode(page), chunk_size) == results
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 1 << 20])
+    def test_it_should_collect_the_other_page_members(self, chunk_size):
+        page = {"results": [1, 2], "next": "https://x/?cursor=a", "count": 12345}
+        parser = PageParser()
+        feed_in_chunks(parser, encode(page), chunk_size)
+        assert parser.members == {"next": "https://x/?cursor=a", "count": 12345}
+
+    @pytest.mark.parametrize("chunk_size", [1, 2])
+    def test_it_should_handle_escapes_split_across_pieces(self, chunk_size):
+        results = [{"description": 'a\\"}]\\\\', "pk": 1}, {"pk": 2}]
+        page = {"results": results, "next": None}
+        assert feed_in_chunks(PageParser(), encode(page), chunk_size) == results
+
+    def test_it_should_only_decode_a_piecemeal_element_once_it_is_complete(self):
+        element = {"pk": 1, "tags": [{"tag": f"key{i}=value"} for i in range(1000)]}
+        parser = PageParser()
+        decode = parser._decoder.raw_decode
+        with patch.object(parser._decoder, "raw_decode", side_effect=decode) as mock:
+            assert feed_in_chunks(parser, encode([element]), 16) == [element]
+        assert mock.call_count <= 2
+
+    def test_it_should_produce_results_before_the_page_is_complete(self):
+        parser = PageParser()
+        assert parser.feed(b'{"next": null, "results": [{"pk": 1}, {"pk"') == [
+            {"pk": 1}
+        ]
+
+    def test_it_should_parse_empty_pages(self):
+        parser = PageParser()
+        assert feed_in_chunks(parser, b'{"next": null, "results": []}', 1) == []
+        assert parser.members == {"next": None}
+
+    def test_it_should_parse_non_paginated_results(self):
+        assert feed_in_chunks(PageParser(), b"[1, 2, 3]", 1) == [1, 2, 3]
+
+    def test_when_the_page_is_truncated_it_should_raise(self):
+        parser = PageParser()
+        parser.feed(b'{"next": null, "results": [{"pk": 1}')
+        with pytest.raises(ValueError):
+            parser.close()
+
+    def test_when_results_is_not_an_array_it_should_raise(self):
+        with pytest.raises(ValueError):
+            PageParser().feed(b'{"results": {"pk": 1}}')
+
+
+def encode(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def feed_in_chunks(parser, data: bytes, chunk_size: int) -> list:
+    results = []
+    for start in range(0, len(data), chunk_size):
+        results.extend(parser.feed(data[start : start + chunk_size]))
+    results.extend(parser.close())
+    return results
@@ -0,0 +1,73 @@
+"""Tests for the pyargus.time module"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from iso8601 import ParseError, parse_date
+
+from pyargus.time import parse_timestamp, parse_timestamps
+
+
+class TestParseTimestamp:
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "2021-04-04T16:37:43.293726+02:00",
+            "2021-04-04T16:37:43.293+02:00",
+            "2021-04-04T16:37:43-05:30",
+            "2021-04-04T16:37:43.293726Z",
+            "2021-04-04T16:37:43Z",
+        ],
+    )
+    def test_when_given_an_argus_timestamp_it_should_match_iso8601(self, value):
+        assert parse_timestamp(value) == parse_date(value)
+        assert parse_timestamp(value).utcoffset() == parse_date(value).utcoffset()
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "2021-04-04T16:37:43.293726+02:00",
+            "2021-04-04T16:37:43.293+00:00",
+            "2021-04-04T16:37:43-05:30",
+            "2021-04-04T16:37:43.293726Z",
+        ],
+    )
+    def test_it_should_name_the_timezone_like_iso8601(self, value):
+        assert repr(parse_timestamp(value)) == repr(parse_date(value))
+        assert parse_timestamp(value).tzname() == parse_date(value).tzname()
+
+    @pytest.mark.parametrize(
+        "value",
+        ["2021-04-04T16:37:43.2937+02:00", "2021-04-04 16:37:43", "20210404T163743Z"],
+    )
+    def test_when_given_another_iso8601_format_it_should_fall_back(self, value):
+        assert parse_timestamp(value) == parse_date(value)
+
+    def test_when_timestamp_has_a_z_suffix_it_should_be_utc(self):
+        assert parse_timestamp("2021-04-04T16:37:43Z") == datetime(
+            2021, 4, 4, 16, 37, 43, tzinfo=timezone.utc
+        )
+
+    def test_when_given_garbage_it_should_raise_parse_error(self):
+        with pytest.raises(ParseError):
+            parse_timestamp("yesterday")
+
+    def test_when_given_the_same_value_twice_it_should_return_the_cached_result(self):
+        value = "2021-04-04T16:37:43.293726+02:00"
+        assert parse_timestamp(value) is parse_timestamp(value)
+
+
+class TestParseTimestamps:
+    def test_it_should_parse_every_value_in_order(self):
+        result = parse_timestamps(["2021-04-04T16:37:43+02:00", "2021-04-05T10:00:00Z"])
+        assert result == [
+            datetime(2021, 4, 4, 16, 37, 43, tzinfo=timezone(timedelta(hours=2))),
+            datetime(2021, 4, 5, 10, tzinfo=timezone.utc),
+        ]
+
+    def test_it_should_pass_through_empty_values(self):
+        assert parse_timestamps([None, "", "2021-04-05T10:00:00Z"])[:2] == [None, ""]
+
+    def test_it_should_share_results_of_equal_values(self):
+        first, second = parse_timestamps(["2021-04-05T10:00:00Z"] * 2)
+        assert first is second
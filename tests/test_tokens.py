@@ -0,0 +1,270 @@
+"""Tests for the pyargus.tokens module"""
+
+import asyncio
+import os
+import stat
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+from conftest import (
+    authorizations,
+    expiring_token,
+    incident_json,
+    serve,
+    serve_incident_pages,
+)
+from simple_rest_client.exceptions import AuthError
+
+from pyargus import api
+from pyargus.async_client import AsyncClient
+from pyargus.client import Client
+from pyargus.resilience import RetryPolicy
+from pyargus.tokens import AsyncTokenManager, FileTokenStore, TokenManager
+
+URL = "http://argus.test/api/v2"
+
+
+class TestFileTokenStore:
+    def test_when_nothing_is_stored_it_should_load_none(self, tmp_path):
+        assert FileTokenStore(str(tmp_path / "token.json")).load() is None
+
+    def test_it_should_load_the_saved_token(self, tmp_path):
+        store = FileTokenStore(str(tmp_path / "token.json"))
+        token = expiring_token("foo", days=7)
+        store.save(token)
+        assert store.load() == token
+
+    def test_it_should_replace_the_saved_token(self, tmp_path):
+        store = FileTokenStore(str(tmp_path / "token.json"))
+        store.save(expiring_token("foo", days=7))
+        store.save(expiring_token("bar", days=14))
+        assert store.load().token == "bar"
+        assert os.listdir(tmp_path) == ["token.json"]
+
+    def test_it_should_only_be_readable_by_its_owner(self, tmp_path):
+        store = FileTokenStore(str(tmp_path / "token.json"))
+        store.save(expiring_token("foo", days=7))
+        assert stat.S_IMODE(os.stat(store.path).st_mode) == 0o600
+
+
+class TestTokenManager:
+    def test_when_token_is_given_it_should_be_installed_on_the_client(self):
+        client = Client(URL, "old")
+        TokenManager(client, expiring_token("foo", days=7))
+        assert client.api.headers["Authorization"] == "Token foo"
+
+    def test_when_no_token_is_given_it_should_load_it_from_the_store(self):
+        client = Client(URL, "old")
+        store = MagicMock()
+        store.load.return_value = expiring_token("foo", days=7)
+        manager = TokenManager(client, store=store)
+        assert manager.token.token == "foo"
+        assert client.api.headers["Authorization"] == "Token foo"
+        store.save.assert_not_called()
+
+    def test_it_should_be_due_a_refresh_margin_before_expiration(self):
+        manager = TokenManager(
+            Client(URL, "old"), expiring_token("foo", days=7), refresh_margin=86400
+        )
+        assert 5 * 86400 < manager.seconds_until_refresh() <= 6 * 86400
+
+    def test_when_expiration_is_unknown_it_should_be_due_at_once(self):
+        assert TokenManager(Client(URL, "old")).seconds_until_refresh() == 0
+
+    def test_refresh_should_swap_the_token_of_the_live_client(self):
+        client = serve_refreshes(Client(URL, "old"))
+        resources = api.get_resources(client.api)
+        manager = TokenManager(client)
+        token = manager.refresh()
+        assert token.token == "new"
+        assert manager.token == token
+        assert all(
+            resource.headers["Authorization"] == "Token new" for resource in resources
+        )
+        assert client.get_incident(1).pk == 4
+
+    def test_refresh_should_save_and_announce_the_new_token(self):
+        store, on_refresh = MagicMock(), MagicMock()
+        store.load.return_value = None
+        manager = TokenManager(
+            serve_refreshes(Client(URL, "old")), store=store, on_refresh=on_refresh
+        )
+        token = manager.refresh()
+        store.save.assert_called_once_with(token)
+        on_refresh.assert_called_once_with(token)
+
+    def test_when_store_fails_refresh_should_still_swap_the_token(self):
+        store = MagicMock()
+        store.load.return_value = None
+        store.save.side_effect = OSError("disk full")
+        client = serve_refreshes(Client(URL, "old"))
+        TokenManager(client, store=store).refresh()
+        assert client.api.headers["Authorization"] == "Token new"
+
+    def test_when_on_refresh_fails_refresh_should_still_succeed(self):
+        client = serve_refreshes(Client(URL, "old"))
+        manager = TokenManager(client, on_refresh=MagicMock(side_effect=ValueError))
+        assert manager.refresh() is manager.token
+        assert client.api.headers["Authorization"] == "Token new"
+
+    def test_it_should_refresh_due_tokens_in_the_background(self):
+        refreshed = threading.Event()
+        client = serve_refreshes(Client(URL, "old"))
+        manager = TokenManager(
+            client,
+            expiring_token("old", days=0.5),
+            on_refresh=lambda _: refreshed.set(),
+        )
+        with manager:
+            assert refreshed.wait(5)
+        assert client.api.headers["Authorization"] == "Token new"
+
+    def test_when_refresh_fails_it_should_retry(self):
+        refreshed = threading.Event()
+        client = MagicMock()
+        client.refresh_token.side_effect = [
+            AuthError("401", None),
+            expiring_token("new", days=30),
+        ]
+        manager = TokenManager(
+            client, retry_interval=0.01, on_refresh=lambda _: refreshed.set()
+        )
+        with manager:
+            assert refreshed.wait(5)
+        assert client.refresh_token.call_count == 2
+
+    def test_close_should_stop_the_background_thread(self):
+        manager = TokenManager(Client(URL, "old"), expiring_token("foo", days=7))
+        manager.start()
+        manager.close()
+        assert manager._thread is None
+
+
+class TestReauthorization:
+    def test_when_token_was_swapped_in_flight_it_should_retry_with_the_new_one(self):
+        client = Client(URL, "old")
+        requests = serve_rejecting_old_token(client, httpx.Client)
+        assert client.get_incident(1).pk == 4
+        assert authorizations(requests) == ["Token old", "Token new"]
+
+    def test_when_token_was_not_swapped_it_should_not_retry(self):
+        client = Client(URL, "old")
+        requests = serve_rejecting_old_token(client, httpx.Client, swap=False)
+        with pytest.raises(AuthError):
+            client.get_incident(1)
+        assert len(requests) == 1
+
+    def test_it_should_also_retry_guarded_requests(self):
+        client = Client(URL, "old", retry_policy=RetryPolicy(max_attempts=1))
+        requests = serve_rejecting_old_token(client, httpx.Client)
+        assert client.get_incident(1).pk == 4
+        assert authorizations(requests) == ["Token old", "Token new"]
+
+    @pytest.mark.asyncio
+    async def test_async_requests_should_retry_with_the_new_token(self):
+        client = AsyncClient(URL, "old")
+        requests = serve_rejecting_old_token(client, httpx.AsyncClient)
+        assert (await client.get_incident(1)).pk == 4
+        assert authorizations(requests) == ["Token old", "Token new"]
+
+    def test_streamed_queries_should_retry_with_the_new_token(self):
+        client = Client(URL, "old")
+        requests = serve_rejecting_old_token(
+            client, httpx.Client, respond=serve_incident_pages
+        )
+        incidents = list(client.get_incidents(stream=True))
+        assert [incident.pk for incident in incidents] == [1, 2, 3]
+        assert authorizations(requests) == ["Token old", "Token new", "Token new"]
+
+    def test_when_token_was_not_swapped_streamed_queries_should_not_retry(self):
+        client = Client(URL, "old")
+        requests = serve_rejecting_old_token(
+            client, httpx.Client, swap=False, respond=serve_incident_pages
+        )
+        with pytest.raises(AuthError):
+            list(client.get_incidents(stream=True))
+        assert len(requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_async_streamed_queries_should_retry_with_the_new_token(self):
+        client = AsyncClient(URL, "old")
+        requests = serve_rejecting_old_token(
+            client, httpx.AsyncClient, respond=serve_incident_pages
+        )
+        incidents = [i async for i in client.get_incidents(stream=True)]
+        assert [incident.pk for incident in incidents] == [1, 2, 3]
+        assert authorizations(requests) == ["Token old", "Token new", "Token new"]
+
+
+class TestAsyncTokenManager:
+    @pytest.mark.asyncio
+    async def test_refresh_should_swap_the_token_of_the_live_client(self):
+        client = AsyncClient(URL, "old")
+        client.refresh_token = AsyncMock(return_value=expiring_token("new", days=30))
+        token = await AsyncTokenManager(client).refresh()
+        assert token.token == "new"
+        assert client.api.incidents.headers["Authorization"] == "Token new"
+
+    @pytest.mark.asyncio
+    async def test_it_should_refresh_due_tokens_in_the_background(self):
+        refreshed = asyncio.Event()
+        client = MagicMock()
+        client.refresh_token = AsyncMock(return_value=expiring_token("new", days=30))
+        manager = AsyncTokenManager(client, on_refresh=lambda _: refreshed.set())
+        async with manager:
+            await asyncio.wait_for(refreshed.wait(), 5)
+        assert manager.token.token == "new"
+
+    @pytest.mark.asyncio
+    async def test_when_refresh_fails_it_should_retry(self):
+        refreshed = asyncio.Event()
+        client = MagicMock()
+        client.refresh_token = AsyncMock(
+            side_effect=[AuthError("401", None), expiring_token("new", days=30)]
+        )
+        manager = AsyncTokenManager(
+            client, retry_interval=0.01, on_refresh=lambda _: refreshed.set()
+        )
+        async with manager:
+            await asyncio.wait_for(refreshed.wait(), 5)
+        assert client.refresh_token.await_count == 2
+
+
+def serve_refreshes(client):
+    """Makes a client's resources serve token refreshes, and incidents to the
+    refreshed token only
+    """
+
+    def respond(request):
+        if request.url.path.endswith("/auth/token/login/"):
+            expiration = datetime.now(timezone.utc) + timedelta(days=30)
+            return httpx.Response(
+                200, json={"token": "new", "expiration": expiration.isoformat()}
+            )
+        if request.headers["Authorization"] != "Token new":
+            return httpx.Response(401, json={"detail": "Invalid token."})
+        return httpx.Response(200, json=incident_json())
+
+    serve(client.api, respond)
+    return client
+
+
+def serve_rejecting_old_token(client, client_class, swap=True, respond=None):
+    """Makes a client's resources reject the old token, swapping in the new one while
+    the first request is in flight, and serve other requests using `respond`,
+    returning the list of requests received.
+    """
+
+    def handle(request):
+        if request.headers["Authorization"] == "Token old":
+            if swap:
+                client.api.headers["Authorization"] = "Token new"
+            return httpx.Response(401, json={"detail": "Invalid token."})
+        if respond is not None:
+            return respond(request)
+        return httpx.Response(200, json=incident_json())
+
+    return serve(client.api, handle, client_class)